@@ -0,0 +1,76 @@
+# benchmarks/bench_normalize.py
+# Compares per-offer Python processing (the previous render_results_table
+# loop) with the columnar normalizer in core/normalize.py. The default sizes
+# start at RANKING_PAGE_SIZE, the number of offers a task result carries.
+#
+#   python -m benchmarks.bench_normalize --offers 50 --offers 1000
+
+import argparse
+import pickle
+import timeit
+from datetime import datetime
+
+import pandas as pd
+
+from benchmarks.offers import make_offers
+from core import config
+from core.normalize import from_columns, normalize_offers, to_columns, to_display
+
+
+def rowwise(offers: list) -> pd.DataFrame:
+    """Per-offer processing equivalent to the previous display loop."""
+    rows = []
+    for i, offer in enumerate(offers):
+        segments = offer["itineraries"][0]["segments"]
+        route = [seg.get("departure", {}).get("iataCode", "N/A") for seg in segments]
+        route.append(segments[-1].get("arrival", {}).get("iataCode", "N/A"))
+        dep = datetime.fromisoformat(segments[0]["departure"]["at"].replace("Z", "+00:00"))
+        arr = datetime.fromisoformat(segments[-1]["arrival"]["at"].replace("Z", "+00:00"))
+        duration = offer["itineraries"][0].get("duration", "N/A")
+        fare = offer["travelerPricings"][0]["fareDetailsBySegment"][0]
+        bags = fare.get("includedCheckedBags", {})
+        if "quantity" in bags:
+            bags_display = f"{bags['quantity']} pc(s)"
+        elif "weight" in bags:
+            bags_display = f"{bags['weight']} {bags['weightUnit']}"
+        else:
+            bags_display = "0 pc(s)"
+        rows.append({
+            "Offer ID": offer.get("id", f"N/A_{i+1}"),
+            "Route": " → ".join(route),
+            "Departure": dep.strftime("%Y-%m-%d %H:%M"),
+            "Arrival": arr.strftime("%Y-%m-%d %H:%M"),
+            "Duration": duration.replace("PT", "").replace("H", "H ").strip(),
+            "Stops": len(segments) - 1,
+            "Airline(s)": ", ".join(offer.get("validatingAirlineCodes", [])),
+            "Cabin": fare.get("cabin", "N/A").replace("_", " ").title(),
+            "Checked Bags": bags_display,
+            "Price": f"{offer['price']['grandTotal']} {offer['price']['currency']}",
+        })
+    return pd.DataFrame(rows)
+
+
+def best_ms(fn, repeat: int) -> float:
+    return min(timeit.repeat(fn, number=repeat, repeat=3)) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--offers", type=int, action="append", help="offers per batch (repeatable)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for count in args.offers or [config.RANKING_PAGE_SIZE, 250, 1000, 5000]:
+        offers = make_offers(count)
+        columns = to_columns(normalize_offers(offers))
+        # st.cache_data hands every rerun an unpickled copy of the cached frame
+        cached = pickle.dumps(to_display(from_columns(columns)))
+        print(f"{count} offers:")
+        print(f"  row-wise loop (previous UI, every rerun)   {best_ms(lambda: rowwise(offers), args.repeat):9.2f} ms")
+        print(f"  normalize_offers (worker, once)            {best_ms(lambda: normalize_offers(offers), args.repeat):9.2f} ms")
+        print(f"  from_columns + to_display (UI, per task)   {best_ms(lambda: to_display(from_columns(columns)), args.repeat):9.2f} ms")
+        print(f"  cached display frame (UI, per rerun)       {best_ms(lambda: pickle.loads(cached), args.repeat):9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
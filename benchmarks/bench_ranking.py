@@ -0,0 +1,42 @@
+# benchmarks/bench_ranking.py
+# Cost of ranking a search page with core/ranking.py, next to the work the
+# search stage already does for the same page (normalization) and a typical
+# Amadeus search round trip.
+#
+#   python -m benchmarks.bench_ranking --offers 50 --offers 250
+
+import argparse
+import timeit
+
+from benchmarks.offers import make_offers
+from core.normalize import normalize_offers
+from core.ranking import rank_offers
+
+# Typical Flight Offers Search latency for a 250-offer page, for scale
+AMADEUS_SEARCH_MS = 1500
+
+
+def best_ms(fn, repeat: int) -> float:
+    return min(timeit.repeat(fn, number=repeat, repeat=5)) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offer ranking latency")
+    parser.add_argument("--offers", type=int, action="append", help="offers per page (repeatable)")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    options = {"preferred_carriers": ["LH", "LX"], "avoided_carriers": ["XX"]}
+    for count in args.offers or [50, 250]:
+        offers = make_offers(count)
+        df = normalize_offers(offers)
+        rank_ms = best_ms(lambda: rank_offers(df, options=options), args.repeat)
+        normalize_ms = best_ms(lambda: normalize_offers(offers), args.repeat)
+        print(f"{count} offers:")
+        print(f"  rank_offers                 {rank_ms:8.2f} ms")
+        print(f"  normalize_offers (existing) {normalize_ms:8.2f} ms")
+        print(f"  share of a {AMADEUS_SEARCH_MS} ms search   {rank_ms / AMADEUS_SEARCH_MS:8.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# benchmarks/bench_result_format.py
+# Compares the task result payload before and after slim projections:
+# bytes stored in Redis and encode/decode time.
+#
+#   python -m benchmarks.bench_result_format --offers 5 --offers 50 --offers 250
+
+import argparse
+import json
+import timeit
+
+from benchmarks.offers import make_offers
+from core.serialization import packb, unpackb
+from worker.compact import project_offer, project_order
+from worker.offer_store import content_hash
+
+
+def make_order(offer: dict) -> dict:
+    return {
+        "type": "flight-order",
+        "id": "eJzTd9f3NjIJdzUGAAp%2fAiY=",
+        "queuingOfficeId": "NCE4D31SB",
+        "associatedRecords": [{"reference": "7U8JKT", "creationDate": "2026-10-17T00:00:00.000", "originSystemCode": "GDS", "flightOfferId": offer["id"]}],
+        "flightOffers": [offer],
+        "travelers": [{"id": "1", "dateOfBirth": "1982-01-16", "name": {"firstName": "JORGE", "lastName": "GONZALES"}}],
+        "ticketingAgreement": {"option": "DELAY_TO_CANCEL", "delay": "6D"},
+    }
+
+
+def current_result(offers: list) -> dict:
+    return {"status": "held", "offers": offers, "hold_details": make_order(offers[0])}
+
+
+def slim_result(offers: list) -> dict:
+    order = make_order(offers[0])
+    return {
+        "status": "held",
+        "offers": [project_offer(offer, content_hash(offer)) for offer in offers],
+        "hold_details": project_order(order, content_hash(order)),
+    }
+
+
+def measure(label: str, encode, decode, payload, repeat: int):
+    encoded = encode(payload)
+    encode_ms = min(timeit.repeat(lambda: encode(payload), number=repeat, repeat=3)) / repeat * 1000
+    decode_ms = min(timeit.repeat(lambda: decode(encoded), number=repeat, repeat=3)) / repeat * 1000
+    print(f"  {label:<28} {len(encoded):>10,} B  encode {encode_ms:8.3f} ms  decode {decode_ms:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--offers", type=int, action="append", help="offers per result (repeatable)")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    json_encode = lambda obj: json.dumps(obj).encode("utf-8")
+    json_decode = lambda data: json.loads(data)
+
+    for count in args.offers or [5, 250]:
+        offers = make_offers(count)
+        print(f"{count} offers:")
+        measure("json, full offers (today)", json_encode, json_decode, current_result(offers), args.repeat)
+        measure("json, slim projection", json_encode, json_decode, slim_result(offers), args.repeat)
+        measure("msgpack+zstd, slim", packb, unpackb, slim_result(offers), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
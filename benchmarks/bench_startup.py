@@ -0,0 +1,84 @@
+# benchmarks/bench_startup.py
+# Worker cold start: import time and memory of the worker module graph in a
+# fresh interpreter, and the memory a prefork child adds on top of its parent.
+# The "legacy" scenario imports streamlit and pandas up front, as every
+# worker did when core/config.py read st.secrets and worker/tasks.py
+# imported the normalizer at module level.
+#
+#   python -m benchmarks.bench_startup --runs 5
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SCENARIOS = {
+    "worker (pricing/holds/maintenance)": [],
+    "worker + preload (search/batch)": ["core.normalize"],
+    "legacy (streamlit + pandas)": ["streamlit", "core.normalize"],
+}
+
+# Runs in the child interpreter: imports, then forks once and measures the
+# child's private memory after it touches the imported modules.
+PROBE = r"""
+import importlib, json, os, resource, sys, time
+started = time.perf_counter()
+for module in sys.argv[1:]:
+    importlib.import_module(module)
+import celery_worker
+elapsed = time.perf_counter() - started
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def private_mb(pid):
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as handle:
+            fields = dict(line.split(":", 1) for line in handle if ":" in line)
+        return sum(int(fields[k].split()[0]) for k in ("Private_Clean", "Private_Dirty")) / 1024
+    except OSError:
+        return None
+
+read, write = os.pipe()
+pid = os.fork()
+if pid == 0:
+    import gc; gc.collect()
+    os.write(write, json.dumps(private_mb(os.getpid())).encode())
+    os._exit(0)
+os.waitpid(pid, 0)
+child = json.loads(os.read(read, 64))
+print(json.dumps({"seconds": elapsed, "rss_mb": rss, "child_private_mb": child}))
+"""
+
+
+def run_probe(modules: list) -> dict:
+    env = dict(os.environ)
+    # Enough configuration to import the worker without a secrets file
+    env.setdefault("AMADEUS_CLIENT_ID", "bench")
+    env.setdefault("AMADEUS_CLIENT_SECRET", "bench")
+    env.setdefault("AMADEUS_ENVIRONMENT", "test")
+    env.setdefault("REDIS_URL", "redis://localhost:6379/0")
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, *modules], env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker import time and memory")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'scenario':<38} {'import s':>9} {'rss MB':>8} {'child MB':>9}")
+    for name, modules in SCENARIOS.items():
+        samples = [run_probe(modules) for _ in range(args.runs)]
+        child = [s["child_private_mb"] for s in samples if s["child_private_mb"] is not None]
+        print(
+            f"{name:<38} {statistics.median(s['seconds'] for s in samples):>9.3f} "
+            f"{statistics.median(s['rss_mb'] for s in samples):>8.1f} "
+            f"{(statistics.median(child) if child else float('nan')):>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+# benchmarks/fake_amadeus.py
+# Offline stand-in for the Amadeus self-service APIs used by the worker:
+# OAuth token, flight-offers search, pricing and flight-orders.
+# Latency, error rate and per-endpoint rate limits (HTTP 429 with
+# Retry-After) are configurable; responses are synthetic or replayed from
+# recorded fixtures. Point the app at it with `[amadeus] base_url`.
+#
+#   python -m benchmarks.fake_amadeus --port 8080 --latency 0.15 --error-rate 0.01 --rate-limit 10
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.offers import make_offers
+
+ENDPOINTS = {
+    ("POST", "/v1/security/oauth2/token"): "token",
+    ("GET", "/v2/shopping/flight-offers"): "flight_offers_search",
+    ("POST", "/v1/shopping/flight-offers/pricing"): "pricing",
+    ("POST", "/v1/booking/flight-orders"): "flight_orders",
+}
+ORDER_PATH = re.compile(r"^/v1/booking/flight-orders/(?P<order_id>[^/]+)$")
+
+
+class FakeAmadeusState:
+    """Counters, rate-limit buckets and created orders shared by all handler threads."""
+
+    def __init__(self, latency, jitter, error_rate, rate_limit, fixtures_dir=None, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.fixtures = self._load_fixtures(fixtures_dir)
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.statuses = {}
+        self.buckets = {}  # endpoint -> (tokens, last refill)
+        self.orders = {}
+
+    @staticmethod
+    def _load_fixtures(fixtures_dir):
+        """Loads <endpoint>.json files recorded from the real API, if any."""
+        fixtures = {}
+        if fixtures_dir:
+            for path in Path(fixtures_dir).glob("*.json"):
+                fixtures[path.stem] = json.loads(path.read_text())
+        return fixtures
+
+    def record(self, endpoint: str, status: int):
+        with self.lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+            key = f"{endpoint}:{status}"
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    def take_token(self, endpoint: str):
+        """Returns None if the call is allowed, else the Retry-After in seconds."""
+        if not self.rate_limit or endpoint == "token":
+            return None
+        with self.lock:
+            now = time.monotonic()
+            tokens, last = self.buckets.get(endpoint, (self.rate_limit, now))
+            tokens = min(self.rate_limit, tokens + (now - last) * self.rate_limit)
+            if tokens < 1:
+                self.buckets[endpoint] = (tokens, now)
+                return (1 - tokens) / self.rate_limit
+            self.buckets[endpoint] = (tokens - 1, now)
+            return None
+
+    def delay(self):
+        if self.latency or self.jitter:
+            time.sleep(max(0.0, self.random.gauss(self.latency, self.jitter)))
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"calls": dict(self.calls), "statuses": dict(self.statuses), "orders": len(self.orders)}
+
+    def reset(self):
+        with self.lock:
+            self.calls.clear()
+            self.statuses.clear()
+            self.orders.clear()
+
+
+def make_handler(state: FakeAmadeusState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, payload, headers=None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/vnd.amadeus+json")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            if self.headers.get("Content-Type", "").startswith("application/x-www-form-urlencoded"):
+                return {k: v[0] for k, v in parse_qs(raw.decode()).items()}
+            return json.loads(raw) if raw else {}
+
+        def _error(self, endpoint, status, title, headers=None):
+            state.record(endpoint, status)
+            self._send(status, {"errors": [{"status": status, "code": 0, "title": title}]}, headers)
+
+        def _handle(self, method: str):
+            url = urlparse(self.path)
+            if url.path == "/__stats":
+                return self._send(200, state.stats())
+            if url.path == "/__reset" and method == "POST":
+                state.reset()
+                return self._send(200, {"ok": True})
+
+            order_match = ORDER_PATH.match(url.path) if method == "GET" else None
+            endpoint = "flight_orders_get" if order_match else ENDPOINTS.get((method, url.path))
+            if endpoint is None:
+                return self._error("unknown", 404, "NOT FOUND")
+            body = self._body()
+
+            retry_after = state.take_token(endpoint)
+            if retry_after is not None:
+                return self._error(endpoint, 429, "Too many requests", {"Retry-After": f"{retry_after:.2f}"})
+            state.delay()
+            if endpoint != "token" and state.random.random() < state.error_rate:
+                return self._error(endpoint, 500, "INTERNAL ERROR")
+
+            if endpoint == "token":
+                payload = {"type": "amadeusOAuth2Token", "access_token": uuid.uuid4().hex,
+                           "expires_in": 1799, "state": "approved"}
+            elif endpoint == "flight_offers_search":
+                payload = self._search(parse_qs(url.query))
+            elif endpoint == "pricing":
+                offers = body.get("data", {}).get("flightOffers", [])
+                payload = state.fixtures.get("pricing") or {
+                    "data": {"type": "flight-offers-pricing", "flightOffers": offers}
+                }
+            elif endpoint == "flight_orders":
+                payload = self._create_order(body)
+            else:
+                order = state.orders.get(order_match.group("order_id"))
+                if order is None:
+                    return self._error(endpoint, 404, "ORDER NOT FOUND")
+                payload = {"data": order}
+
+            state.record(endpoint, 200 if endpoint != "flight_orders" else 201)
+            self._send(200 if endpoint != "flight_orders" else 201, payload)
+
+        def _search(self, query: dict) -> dict:
+            if "flight_offers_search" in state.fixtures:
+                return state.fixtures["flight_offers_search"]
+            params = {k: v[0] for k, v in query.items()}
+            # Same route/date -> same offers, across runs and processes
+            seed = zlib.crc32("|".join([params.get("originLocationCode", ""),
+                                        params.get("destinationLocationCode", ""),
+                                        params.get("departureDate", "")]).encode())
+            offers = make_offers(
+                int(params.get("max", 5)),
+                seed=seed,
+                origin=params.get("originLocationCode", "JFK"),
+                destination=params.get("destinationLocationCode", "KTM"),
+                departure_date=params.get("departureDate", "2026-11-20"),
+            )
+            return {"meta": {"count": len(offers)}, "data": offers}
+
+        def _create_order(self, body: dict) -> dict:
+            if "flight_orders" in state.fixtures:
+                return state.fixtures["flight_orders"]
+            order_id = uuid.uuid4().hex
+            order = {
+                "type": "flight-order",
+                "id": order_id,
+                "associatedRecords": [{"reference": order_id[:6].upper(), "originSystemCode": "GDS"}],
+                "flightOffers": body.get("data", {}).get("flightOffers", []),
+                "travelers": body.get("data", {}).get("travelers", []),
+                "ticketingAgreement": body.get("data", {}).get("ticketingAgreement", {}),
+            }
+            with state.lock:
+                state.orders[order_id] = order
+            return {"data": order}
+
+        def do_GET(self):
+            self._handle("GET")
+
+        def do_POST(self):
+            self._handle("POST")
+
+    return Handler
+
+
+def serve(host="127.0.0.1", port=8080, **state_kwargs) -> ThreadingHTTPServer:
+    """Starts the fake server on a background thread and returns it."""
+    server = ThreadingHTTPServer((host, port), make_handler(FakeAmadeusState(**state_kwargs)))
+    threading.Thread(target=server.serve_forever, name="fake-amadeus", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Amadeus stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.15, help="mean response latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.05, help="latency standard deviation (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls failing with 500")
+    parser.add_argument("--rate-limit", type=float, default=10, help="requests/s per endpoint, 0 = unlimited")
+    parser.add_argument("--fixtures", help="directory of recorded <endpoint>.json responses to replay")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = serve(
+        args.host, args.port,
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        rate_limit=args.rate_limit, fixtures_dir=args.fixtures, seed=args.seed,
+    )
+    print(f"Fake Amadeus listening on http://{args.host}:{args.port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
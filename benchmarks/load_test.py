@@ -0,0 +1,120 @@
+# benchmarks/load_test.py
+# End-to-end load test: drives N concurrent searches through Celery and
+# reports latency percentiles, throughput and Amadeus calls per search.
+#
+# Needs a Redis (docker compose up redis), workers started with
+# `[amadeus] base_url` pointing at the fake server, and the fake server:
+#
+#   python -m benchmarks.fake_amadeus --port 8080 &
+#   python run.py            # or start the celery workers directly
+#   python -m benchmarks.load_test --searches 500 --concurrency 50 --fake-url http://127.0.0.1:8080
+
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+ROUTES = [("JFK", "LHR"), ("JFK", "KTM"), ("LAX", "NRT"), ("CDG", "DXB"), ("SFO", "SIN"), ("BOS", "FRA")]
+
+
+def make_searches(count: int, unique_ratio: float, seed: int = 0) -> list:
+    """Builds search payloads; unique_ratio controls how many are distinct."""
+    rng = random.Random(seed)
+    distinct = max(1, int(count * unique_ratio))
+    pool = []
+    for i in range(distinct):
+        origin, destination = ROUTES[i % len(ROUTES)]
+        pool.append({
+            "from_location": origin,
+            "to_location": destination,
+            "departure_date": (date(2026, 11, 1) + timedelta(days=i // len(ROUTES))).isoformat(),
+            "num_passengers": 1,
+            "seat_class": "ECONOMY",
+        })
+    return [pool[i] if i < distinct else rng.choice(pool) for i in range(count)]
+
+
+def fake_stats(fake_url: str) -> dict:
+    with urllib.request.urlopen(f"{fake_url}/__stats") as response:
+        return json.loads(response.read())
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_one(submit, search: dict, timeout: float):
+    started = time.perf_counter()
+    result = submit(search)
+    output = result.get(timeout=timeout, propagate=False)
+    status = output.get("status") if isinstance(output, dict) else result.state
+    return time.perf_counter() - started, status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Celery end-to-end load test")
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20, help="searches in flight at once")
+    parser.add_argument("--unique-ratio", type=float, default=0.5, help="fraction of distinct searches")
+    parser.add_argument("--mode", choices=["pipeline", "single"], default="pipeline",
+                        help="chained stage tasks or the single search_and_hold_flight task")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--fake-url", help="fake Amadeus server, for API-call counts")
+    args = parser.parse_args()
+
+    from worker.tasks import search_and_hold_flight, submit_search_and_hold
+    submit = submit_search_and_hold if args.mode == "pipeline" else search_and_hold_flight.delay
+
+    searches = make_searches(args.searches, args.unique_ratio)
+    before = fake_stats(args.fake_url) if args.fake_url else None
+
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+
+    def worker(search):
+        try:
+            latency, status = run_one(submit, search, args.timeout)
+        except Exception as ex:
+            latency, status = None, type(ex).__name__
+        with lock:
+            if latency is not None:
+                latencies.append(latency)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(worker, searches))
+    elapsed = time.perf_counter() - started
+
+    print(f"searches      {args.searches} ({args.mode}, concurrency {args.concurrency}, "
+          f"unique {args.unique_ratio:.0%})")
+    print(f"elapsed       {elapsed:.2f} s")
+    print(f"throughput    {args.searches / elapsed:.2f} searches/s")
+    if latencies:
+        print(f"latency p50   {percentile(latencies, 50) * 1000:.0f} ms")
+        print(f"latency p95   {percentile(latencies, 95) * 1000:.0f} ms")
+        print(f"latency p99   {percentile(latencies, 99) * 1000:.0f} ms")
+        print(f"latency mean  {statistics.mean(latencies) * 1000:.0f} ms")
+    print(f"outcomes      {statuses}")
+
+    if before is not None:
+        after = fake_stats(args.fake_url)
+        for endpoint, calls in sorted(after["calls"].items()):
+            delta = calls - before["calls"].get(endpoint, 0)
+            print(f"api calls     {endpoint:<22} {delta:>6}  ({delta / args.searches:.3f}/search)")
+        throttled = sum(v for k, v in after["statuses"].items() if k.endswith(":429")) - \
+            sum(v for k, v in before["statuses"].items() if k.endswith(":429"))
+        print(f"429 responses {throttled}")
+
+
+if __name__ == "__main__":
+    main()
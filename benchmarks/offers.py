@@ -0,0 +1,82 @@
+# benchmarks/offers.py
+# Synthetic Amadeus flight offers shaped like Flight Offers Search responses,
+# for benchmarks that should not depend on the live API.
+
+import random
+from datetime import datetime, timedelta
+
+CARRIERS = ["BA", "AF", "LH", "KL", "QR", "EK", "TK", "UA", "DL", "AA"]
+HUBS = ["LHR", "CDG", "FRA", "AMS", "DOH", "DXB", "IST", "EWR", "ATL", "DFW"]
+
+
+def make_offer(index: int, origin="JFK", destination="KTM", departure_date="2026-11-20", rng=None) -> dict:
+    rng = rng or random.Random(index)
+    carrier = rng.choice(CARRIERS)
+    stops = rng.choice([0, 1, 1, 2])
+    airports = [origin] + rng.sample(HUBS, stops) + [destination]
+    departure = datetime.fromisoformat(departure_date) + timedelta(minutes=rng.randrange(0, 24 * 60, 5))
+
+    segments = []
+    for leg, (from_code, to_code) in enumerate(zip(airports, airports[1:]), start=1):
+        arrival = departure + timedelta(minutes=rng.randrange(90, 720, 5))
+        segments.append({
+            "departure": {"iataCode": from_code, "terminal": "1", "at": departure.isoformat()},
+            "arrival": {"iataCode": to_code, "terminal": "2", "at": arrival.isoformat()},
+            "carrierCode": carrier,
+            "number": str(rng.randrange(10, 9999)),
+            "aircraft": {"code": rng.choice(["359", "77W", "388", "32N"])},
+            "operating": {"carrierCode": carrier},
+            "duration": f"PT{(arrival - departure).seconds // 3600}H{(arrival - departure).seconds % 3600 // 60}M",
+            "id": str(leg),
+            "numberOfStops": 0,
+            "blacklistedInEU": False,
+        })
+        departure = arrival + timedelta(minutes=rng.randrange(60, 300, 5))
+
+    total = datetime.fromisoformat(segments[-1]["arrival"]["at"]) - datetime.fromisoformat(segments[0]["departure"]["at"])
+    hours, minutes = divmod(int(total.total_seconds()) // 60, 60)
+    base = rng.randrange(300, 3000)
+    grand_total = f"{base * 1.18:.2f}"
+    bags = rng.choice([{"quantity": rng.choice([0, 1, 2])}, {"weight": 23, "weightUnit": "KG"}, {}])
+
+    return {
+        "type": "flight-offer",
+        "id": str(index + 1),
+        "source": "GDS",
+        "instantTicketingRequired": False,
+        "nonHomogeneous": False,
+        "oneWay": False,
+        "lastTicketingDate": departure_date,
+        "numberOfBookableSeats": rng.randrange(1, 9),
+        "itineraries": [{"duration": f"PT{hours}H{minutes}M", "segments": segments}],
+        "price": {
+            "currency": "USD",
+            "total": grand_total,
+            "base": f"{base:.2f}",
+            "fees": [{"amount": "0.00", "type": "SUPPLIER"}, {"amount": "0.00", "type": "TICKETING"}],
+            "grandTotal": grand_total,
+        },
+        "pricingOptions": {"fareType": ["PUBLISHED"], "includedCheckedBagsOnly": True},
+        "validatingAirlineCodes": [carrier],
+        "travelerPricings": [{
+            "travelerId": "1",
+            "fareOption": "STANDARD",
+            "travelerType": "ADULT",
+            "price": {"currency": "USD", "total": grand_total, "base": f"{base:.2f}"},
+            "fareDetailsBySegment": [
+                {
+                    "segmentId": segment["id"],
+                    "cabin": "ECONOMY",
+                    "fareBasis": "KLX8C2B" + segment["id"],
+                    "class": "K",
+                    "includedCheckedBags": bags,
+                }
+                for segment in segments
+            ],
+        }],
+    }
+
+
+def make_offers(count: int, seed: int = 0, **kwargs) -> list:
+    rng = random.Random(seed)
+    return [make_offer(i, rng=rng, **kwargs) for i in range(count)]
@@ -1,8 +1,16 @@
-from celery import Celery
+from celery import Celery, signals
+import importlib
 import os
 import ssl
 
 from core import config
+from core.serialization import SERIALIZER_NAME, register_serializer
+
+register_serializer()
+
+# SSL options only for rediss:// URLs; Celery rejects them for plain redis://
+# (e.g. the local Redis from docker-compose.yml)
+_use_ssl = config.REDIS_URL.startswith("rediss://")
 
 celery = Celery(
     "worker",
@@ -10,10 +18,10 @@ celery = Celery(
     backend=config.REDIS_URL,
     broker_use_ssl={
         'ssl_cert_reqs': ssl.CERT_NONE,  # or CERT_OPTIONAL / CERT_REQUIRED as needed
-    },
+    } if _use_ssl else None,
     redis_backend_use_ssl={
         'ssl_cert_reqs': ssl.CERT_NONE,  # adjust for production
-    }
+    } if _use_ssl else None,
 )
 
 # celery = Celery(
@@ -25,8 +33,109 @@ celery = Celery(
 celery.conf.update(
     task_track_started=True,
     result_expires=3600,
+    # Results hold slim offer projections (see worker/compact.py), packed compactly
+    result_serializer=SERIALIZER_NAME,
+    result_accept_content=["json", SERIALIZER_NAME],
 )
 
+# Route each pipeline stage to its own queue. Start one worker per queue with
+# stage_worker_command() so every stage gets its own concurrency and prefetch.
+PIPELINE_TASKS = {
+    "search": "worker.search_offers",
+    "pricing": "worker.price_offer",
+    "holds": "worker.hold_offer",
+}
+# Background upkeep never shares a queue with interactive work
+MAINTENANCE_TASKS = [
+    "worker.refresh_search_cache", "worker.refresh_holds", "worker.schedule_fare_watches",
+    "worker.flush_search_history", "worker.compact_search_history", "worker.beat_heartbeat",
+]
+BATCH_TASKS = ["worker.run_fare_watch"]
+celery.conf.task_routes = {
+    **{task_name: {"queue": queue} for queue, task_name in PIPELINE_TASKS.items()},
+    **{task_name: {"queue": "maintenance"} for task_name in MAINTENANCE_TASKS},
+    **{task_name: {"queue": "batch"} for task_name in BATCH_TASKS},
+}
+celery.conf.task_annotations = {
+    task_name: {"rate_limit": config.PIPELINE_QUEUES[queue]["rate_limit"]}
+    for queue, task_name in PIPELINE_TASKS.items()
+    if config.PIPELINE_QUEUES[queue]["rate_limit"]
+}
+# Dedicated workers for the default, stage and background queues (see stage_worker_command)
+WORKER_QUEUES = {"celery": config.DEFAULT_QUEUE, **config.PIPELINE_QUEUES, **config.BACKGROUND_QUEUES}
+if config.AUTOSCALE_ENABLED:
+    # Resizes pools from queue depth and queue wait, not just reserved tasks
+    celery.conf.worker_autoscaler = "worker.autoscale:QueueDepthAutoscaler"
+
+# Periodic status refresh and expiry events for active holds (worker/holds.py),
+# fare-watch searches (worker/fare_watch.py) and search history writes
+# (worker/history.py; the maintenance worker needs HISTORY_DIR on its disk).
+# Needs one `celery -A celery_worker beat` process; run.py starts it.
+celery.conf.beat_schedule = {
+    "refresh-holds": {"task": "worker.refresh_holds", "schedule": config.HOLD_REFRESH_TICK},
+    "schedule-fare-watches": {"task": "worker.schedule_fare_watches", "schedule": config.FARE_WATCH_TICK},
+    "flush-search-history": {"task": "worker.flush_search_history", "schedule": config.HISTORY_FLUSH_INTERVAL},
+    "compact-search-history": {"task": "worker.compact_search_history", "schedule": config.HISTORY_COMPACT_INTERVAL},
+    # Readiness of beat itself (see probe_beat in run.py)
+    "beat-heartbeat": {
+        "task": "worker.beat_heartbeat", "schedule": config.BEAT_HEARTBEAT_INTERVAL,
+        "options": {"expires": config.BEAT_HEARTBEAT_INTERVAL},
+    },
+}
+
+
+# Heavy modules needed only by some queues. Imported once in the worker's
+# main process before the pool forks, so prefork children share the pages;
+# workers for other queues never load them.
+PRELOAD_MODULES = {
+    "search": ["core.normalize", "core.ranking"],
+    "batch": ["core.normalize", "core.ranking"],
+    "celery": ["core.normalize", "core.ranking"],
+}
+
+
+@signals.worker_init.connect
+def _preload_modules(sender=None, **kwargs):
+    queues = sender.app.amqp.queues.consume_from if sender is not None else {}
+    for queue in queues:
+        for module in PRELOAD_MODULES.get(queue, []):
+            importlib.import_module(module)
+
+
+def worker_pool(queue: str) -> str:
+    """Returns the Celery pool for a queue's workers (see PIPELINE_QUEUES in core/config.py)."""
+    pool = WORKER_QUEUES[queue].get("pool")
+    if pool:
+        return pool
+    if config.AMADEUS_TRANSPORT == "async" and queue in config.PIPELINE_QUEUES:
+        return "threads"
+    return "prefork"
+
+
+def stage_worker_command(queue: str, node: str = None) -> list:
+    """
+    Returns the celery CLI command for a worker dedicated to one queue.
+    node names the worker (default "<queue>"); it must be unique per host.
+    """
+    settings = WORKER_QUEUES[queue]
+    pool = worker_pool(queue)
+    if pool in ("threads", "gevent"):
+        # These pools cannot grow or shrink, so they are never autoscaled
+        pool_size = f"--concurrency={settings.get('threads', settings['concurrency'])}"
+    elif config.AUTOSCALE_ENABLED:
+        pool_size = f"--autoscale={settings['max_concurrency']},{settings['min_concurrency']}"
+    else:
+        pool_size = f"--concurrency={settings['concurrency']}"
+    return [
+        "celery", "-A", "celery_worker", "worker",
+        "--loglevel=info",
+        "-Q", queue,
+        "-n", f"{node or queue}@%h",
+        f"--pool={pool}",
+        pool_size,
+        f"--prefetch-multiplier={settings['prefetch']}",
+    ]
+
 
 # Import tasks module here to register tasks
 import worker.tasks  # <-- THIS IS IMPORTANT
\ No newline at end of file
@@ -0,0 +1,242 @@
+# core/airports.py
+# Bundled IATA airport/city index for local validation and autocomplete.
+# core/data/airports.dat holds fixed-width records sorted by code, followed
+# by a sorted table of search terms (city and name words). The file is
+# memory-mapped, so every process on a host shares the same pages, and
+# lookups are binary searches over the mapping: no parsing at startup.
+#
+# Rebuild from the airportsdata package's CSV files with:
+#   python -m core.airports build path/to/airports.csv path/to/iata_macs.csv
+
+import csv
+import mmap
+import os
+import sys
+import unicodedata
+from difflib import get_close_matches
+from typing import List, NamedTuple, Optional
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "data", "airports.dat")
+
+HEADER_SIZE = 64
+CITY_WIDTH = 36
+NAME_WIDTH = 68
+RECORD_WIDTH = 3 + 1 + 2 + CITY_WIDTH + NAME_WIDTH + 1  # code, kind, country, city, name, newline
+TERM_WIDTH = 20
+TERM_RECORD_WIDTH = TERM_WIDTH + 5 + 1  # term, record number, newline
+
+AIRPORT = "A"
+CITY = "C"  # metropolitan area code covering several airports (e.g. NYC, LON)
+
+
+class Airport(NamedTuple):
+    code: str
+    kind: str
+    country: str
+    city: str
+    name: str
+
+    @property
+    def label(self) -> str:
+        return f"{self.code} – {self.name}, {self.city} ({self.country})"
+
+
+def _fold(text: str) -> str:
+    """Lowercases and strips accents so "São Paulo" matches "sao p"."""
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().lower()
+
+
+def _fixed(text: str, width: int) -> bytes:
+    data = text.encode("utf-8")[:width]
+    return data.decode("utf-8", "ignore").encode("utf-8").ljust(width)
+
+
+class AirportIndex:
+    """Read-only view over a memory-mapped airports.dat."""
+
+    def __init__(self, path: str = DATA_PATH):
+        with open(path, "rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        header = self._map[:HEADER_SIZE].split()
+        self.count, self.term_count = int(header[2]), int(header[3])
+        self._terms_offset = HEADER_SIZE + self.count * RECORD_WIDTH
+
+    def __len__(self):
+        return self.count
+
+    def _code_at(self, i: int) -> bytes:
+        offset = HEADER_SIZE + i * RECORD_WIDTH
+        return self._map[offset:offset + 3]
+
+    def _record(self, i: int) -> Airport:
+        offset = HEADER_SIZE + i * RECORD_WIDTH
+        raw = self._map[offset:offset + RECORD_WIDTH - 1]
+        city_end = 6 + CITY_WIDTH
+        return Airport(
+            code=raw[0:3].decode(),
+            kind=raw[3:4].decode(),
+            country=raw[4:6].decode(),
+            city=raw[6:city_end].decode("utf-8", "ignore").rstrip(),
+            name=raw[city_end:].decode("utf-8", "ignore").rstrip(),
+        )
+
+    def _term_at(self, i: int):
+        offset = self._terms_offset + i * TERM_RECORD_WIDTH
+        raw = self._map[offset:offset + TERM_RECORD_WIDTH - 1]
+        return raw[:TERM_WIDTH].rstrip(), int(raw[TERM_WIDTH:])
+
+    @staticmethod
+    def _lower_bound(key: bytes, size: int, key_at) -> int:
+        lo, hi = 0, size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def lookup(self, code: str) -> Optional[Airport]:
+        """Returns the airport or city for an exact IATA code, or None."""
+        key = code.strip().upper().encode("ascii", "ignore")
+        if len(key) != 3:
+            return None
+        i = self._lower_bound(key, self.count, self._code_at)
+        if i < self.count and self._code_at(i) == key:
+            return self._record(i)
+        return None
+
+    def is_valid(self, code: str) -> bool:
+        return self.lookup(code) is not None
+
+    def _codes_with_prefix(self, prefix: bytes, limit: int) -> List[int]:
+        i = self._lower_bound(prefix, self.count, self._code_at)
+        found = []
+        while i < self.count and len(found) < limit and self._code_at(i).startswith(prefix):
+            found.append(i)
+            i += 1
+        return found
+
+    def _terms_with_prefix(self, prefix: bytes, limit: int) -> List[int]:
+        i = self._lower_bound(prefix, self.term_count, lambda j: self._term_at(j)[0])
+        found = []
+        while i < self.term_count and len(found) < limit:
+            term, record = self._term_at(i)
+            if not term.startswith(prefix):
+                break
+            if record not in found:
+                found.append(record)
+            i += 1
+        return found
+
+    def autocomplete(self, query: str, limit: int = 10) -> List[Airport]:
+        """
+        Suggests airports for a partial code, city or airport name.
+        Code matches come first, then city/name matches.
+        """
+        query = query.strip()
+        if not query:
+            return []
+        records = []
+        if len(query) <= 3 and query.isalpha():
+            records += self._codes_with_prefix(query.upper().encode("ascii", "ignore"), limit)
+        airports = [self._record(i) for i in records]
+        folded = _fold(query)
+        matches = [
+            self._record(i)
+            for i in self._terms_with_prefix(folded.encode("ascii")[:TERM_WIDTH], limit * 5)
+            if i not in records
+        ]
+        # Airports in a matching city before ones that only match by name,
+        # and a metropolitan code ahead of its airports
+        matches.sort(key=lambda a: (not _fold(a.city).startswith(folded), a.kind != CITY))
+        return (airports + matches)[:limit]
+
+    def suggest(self, code: str, limit: int = 5) -> List[Airport]:
+        """Returns airports whose codes are one typo away from code."""
+        code = code.strip().upper()
+        if len(code) != 3 or not code.isalpha():
+            return self.fuzzy(code, limit)
+        alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+        candidates = [code[:i] + c + code[i + 1:] for i in range(3) for c in alphabet if c != code[i]]
+        candidates += [code[1] + code[0] + code[2], code[0] + code[2] + code[1]]
+        found = []
+        for candidate in candidates:
+            airport = self.lookup(candidate)
+            if airport and airport not in found:
+                found.append(airport)
+        return found[:limit]
+
+    def fuzzy(self, text: str, limit: int = 5) -> List[Airport]:
+        """Fuzzy match on city/name words that start with the same letter."""
+        folded = _fold(text.strip())
+        if not folded:
+            return []
+        first = folded[0].encode("ascii")
+        start = self._lower_bound(first, self.term_count, lambda j: self._term_at(j)[0])
+        end = self._lower_bound(bytes([first[0] + 1]), self.term_count, lambda j: self._term_at(j)[0])
+        terms = {}
+        for i in range(start, end):
+            term, record = self._term_at(i)
+            terms.setdefault(term.decode(), record)
+        matches = get_close_matches(folded[:TERM_WIDTH], list(terms), n=limit, cutoff=0.7)
+        return [self._record(terms[match]) for match in matches]
+
+
+_index = None
+
+
+def get_airport_index() -> AirportIndex:
+    """Returns the process-wide index, mapping the data file on first use."""
+    global _index
+    if _index is None:
+        _index = AirportIndex()
+    return _index
+
+
+def build(airports_csv: str, macs_csv: str, out_path: str = DATA_PATH):
+    """Writes airports.dat from airportsdata's airports.csv and iata_macs.csv."""
+    entries = {}
+    with open(airports_csv, newline="", encoding="utf-8") as handle:
+        for row in csv.DictReader(handle):
+            code = row["iata"].strip().upper()
+            if len(code) == 3 and code.isalpha():
+                entries[code] = Airport(code, AIRPORT, row["country"], row["city"] or row["name"], row["name"])
+    with open(macs_csv, newline="", encoding="utf-8") as handle:
+        for row in csv.DictReader(handle):
+            code = row["City Code"].strip().upper()
+            if code not in entries:
+                entries[code] = Airport(code, CITY, row["Country"], row["City Name"], f"{row['City Name']} (all airports)")
+
+    airports = sorted(entries.values())
+    terms = set()
+    for i, airport in enumerate(airports):
+        words = set(_fold(airport.city).split()) | set(_fold(airport.name).split())
+        words.add(_fold(airport.city))  # full city name, so "new y" finds New York
+        for word in words:
+            word = "".join(ch for ch in word if ch.isalnum() or ch == " ").strip()
+            if len(word) >= 2:
+                terms.add((word.encode("ascii")[:TERM_WIDTH], i))
+
+    with open(out_path, "wb") as out:
+        header = f"AIRPORTS 1 {len(airports)} {len(terms)}".encode("ascii")
+        out.write(header.ljust(HEADER_SIZE - 1) + b"\n")
+        for airport in airports:
+            out.write(
+                airport.code.encode("ascii")
+                + airport.kind.encode("ascii")
+                + airport.country.encode("ascii")[:2].ljust(2)
+                + _fixed(airport.city, CITY_WIDTH)
+                + _fixed(airport.name, NAME_WIDTH)
+                + b"\n"
+            )
+        for term, record in sorted(terms):
+            out.write(term.ljust(TERM_WIDTH) + f"{record:05d}".encode("ascii") + b"\n")
+    return len(airports), len(terms)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 4 and sys.argv[1] == "build":
+        print("Wrote %d airports, %d search terms" % build(sys.argv[2], sys.argv[3]))
+    else:
+        print(__doc__ or "usage: python -m core.airports build airports.csv iata_macs.csv")
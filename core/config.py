@@ -1,7 +1,201 @@
-import streamlit as st
+# core/config.py
+# Application settings. Read through core/secrets.py rather than st.secrets,
+# so Celery workers never import streamlit.
 
-AMADEUS_CLIENT_ID = st.secrets["amadeus"]["client_id"]
-AMADEUS_CLIENT_SECRET = st.secrets["amadeus"]["client_secret"]
-AMADEUS_ENVIRONMENT = st.secrets["amadeus"]["environment"]
+from core.secrets import load_secrets
 
-REDIS_URL = st.secrets["redis"]["url"]
+_secrets = load_secrets()
+
+AMADEUS_CLIENT_ID = _secrets["amadeus"]["client_id"]
+AMADEUS_CLIENT_SECRET = _secrets["amadeus"]["client_secret"]
+AMADEUS_ENVIRONMENT = _secrets["amadeus"]["environment"]
+# Overrides the API host, e.g. "http://localhost:8080" for benchmarks/fake_amadeus.py
+AMADEUS_BASE_URL = _secrets["amadeus"].get("base_url")
+# "sync" uses the amadeus SDK client; "async" uses worker/transport.py
+AMADEUS_TRANSPORT = _secrets["amadeus"].get("transport", "sync")
+TRANSPORT_MAX_CONNECTIONS = int(_secrets["amadeus"].get("max_connections", 100))
+TRANSPORT_TIMEOUT = float(_secrets["amadeus"].get("timeout", 30))
+# Seconds before expiry at which the shared OAuth token is refreshed (worker/auth.py)
+TOKEN_REFRESH_MARGIN = int(_secrets["amadeus"].get("token_refresh_margin", 120))
+
+REDIS_URL = _secrets["redis"]["url"]
+# Connections shared by all sessions for task result events (see streamlit_app/events.py)
+RESULT_SUBSCRIBER_MAX_CONNECTIONS = int(_secrets["redis"].get("subscriber_max_connections", 4))
+
+# Flight search cache (see worker/cache.py). Entries are fresh for
+# SEARCH_CACHE_TTL seconds, then served stale for up to SEARCH_CACHE_STALE_TTL
+# more seconds while a background refresh runs.
+_cache = _secrets.get("cache", {})
+SEARCH_CACHE_TTL = int(_cache.get("search_ttl", 300))
+SEARCH_CACHE_STALE_TTL = int(_cache.get("search_stale_ttl", 600))
+SEARCH_CACHE_MAX_ENTRIES = int(_cache.get("search_max_entries", 5000))
+# Priced offers are reused for this long (seconds); 0 disables the pricing cache
+PRICING_CACHE_TTL = int(_cache.get("pricing_ttl", 30))
+# Full offer/order bodies referenced from task results (see worker/offer_store.py).
+# Should outlive result_expires so results never point at expired bodies.
+OFFER_STORE_TTL = int(_cache.get("offer_store_ttl", 7200))
+
+# Offer ranking (see core/ranking.py). Searches fetch up to SEARCH_MAX_OFFERS
+# offers (Amadeus allows 250), the best-scored one becomes the hold candidate
+# and results carry the top RANKING_PAGE_SIZE. Weights are relative.
+_ranking = _secrets.get("ranking", {})
+SEARCH_MAX_OFFERS = max(1, min(250, int(_ranking.get("search_max_offers", 50))))
+# Largest search result the cache stores; by default room for a full page of
+# SEARCH_MAX_OFFERS offers at up to 8 KB each (a multi-segment offer's JSON)
+SEARCH_CACHE_MAX_ENTRY_BYTES = int(_cache.get("search_max_entry_bytes", max(512 * 1024, SEARCH_MAX_OFFERS * 8 * 1024)))
+RANKING_PAGE_SIZE = int(_ranking.get("page_size", 50))
+RANKING_WEIGHTS = {
+    "price": 1.0, "duration": 0.4, "stops": 0.3, "carrier": 0.2, "baggage": 0.2,
+    **_ranking.get("weights", {}),
+}
+RANKING_OPTIONS = {
+    # Validating carrier codes, e.g. ["LH", "LX"]
+    "preferred_carriers": list(_ranking.get("preferred_carriers", [])),
+    "avoided_carriers": list(_ranking.get("avoided_carriers", [])),
+}
+
+# Single-flight coalescing of identical searches (see worker/singleflight.py)
+_singleflight = _secrets.get("singleflight", {})
+SINGLEFLIGHT_LOCK_TIMEOUT = int(_singleflight.get("lock_timeout", 30))
+SINGLEFLIGHT_RESULT_TTL = int(_singleflight.get("result_ttl", 10))
+
+# Idempotent flight-order creation (see worker/idempotency.py). A created
+# order is returned to retries of the same submission for HOLD_IDEMPOTENCY_TTL
+# seconds; HOLD_CLAIM_TIMEOUT must cover the rate-limit wait plus the call.
+_holds = _secrets.get("holds", {})
+HOLD_IDEMPOTENCY_TTL = int(_holds.get("idempotency_ttl", 24 * 3600))
+HOLD_CLAIM_TIMEOUT = int(_holds.get("claim_timeout", 90))
+# Hold expiry tracking (see worker/holds.py). Every HOLD_REFRESH_TICK seconds
+# celery beat re-checks up to HOLD_REFRESH_BATCH holds, nearest expiry first.
+# Near-expiry events fire at each HOLD_EXPIRY_WARNINGS threshold (seconds left).
+HOLD_REFRESH_TICK = float(_holds.get("refresh_tick", 60))
+HOLD_REFRESH_BATCH = int(_holds.get("refresh_batch", 50))
+HOLD_REFRESH_INTERVAL = float(_holds.get("refresh_interval", 6 * 3600))
+HOLD_EXPIRY_WARNINGS = [int(s) for s in _holds.get("expiry_warnings", [24 * 3600, 3600])]
+# Used when an order has no ticketing agreement delay or date
+HOLD_DEFAULT_LIFETIME = int(_holds.get("default_lifetime", 6 * 24 * 3600))
+
+# Fare watches (see worker/fare_watch.py). Each watched search runs once per
+# interval however many subscribers it has; beat dispatches due searches every
+# FARE_WATCH_TICK seconds, at most FARE_WATCH_SEARCHES_PER_HOUR per hour.
+_fare_watch = _secrets.get("fare_watch", {})
+FARE_WATCH_INTERVAL = float(_fare_watch.get("interval", 3600))
+FARE_WATCH_MIN_INTERVAL = float(_fare_watch.get("min_interval", 900))
+FARE_WATCH_TICK = float(_fare_watch.get("tick", 30))
+FARE_WATCH_SEARCHES_PER_HOUR = int(_fare_watch.get("searches_per_hour", 1200))
+FARE_WATCH_HISTORY = int(_fare_watch.get("history", 500))  # diffs kept per watch
+
+# Search history for analytics (see worker/history.py). Tasks buffer records
+# in Redis; beat writes them to day-partitioned Parquet under HISTORY_DIR.
+_history = _secrets.get("history", {})
+HISTORY_ENABLED = bool(_history.get("enabled", True))
+HISTORY_DIR = _history.get("dir", "data/history")
+HISTORY_FLUSH_INTERVAL = float(_history.get("flush_interval", 60))
+HISTORY_FLUSH_BATCH = int(_history.get("flush_batch", 5000))  # buffered records per file write
+HISTORY_BUFFER_MAX = int(_history.get("buffer_max", 200000))
+HISTORY_COMPACT_INTERVAL = float(_history.get("compact_interval", 3600))
+HISTORY_COMPACT_MIN_FILES = int(_history.get("compact_min_files", 8))
+
+# Bulk JSONL search runs (see worker/batch.py). At most BATCH_MAX_IN_FLIGHT
+# searches are queued, running or waiting to be written at any time; they
+# are submitted as Celery groups of BATCH_CHUNK_SIZE on the "batch" queue.
+_batch = _secrets.get("batch", {})
+BATCH_CHUNK_SIZE = int(_batch.get("chunk_size", 100))
+BATCH_MAX_IN_FLIGHT = int(_batch.get("max_in_flight", 1000))
+BATCH_POLL_INTERVAL = float(_batch.get("poll_interval", 0.5))
+BATCH_CHECKPOINT_INTERVAL = float(_batch.get("checkpoint_interval", 10))
+
+# Task retries (see worker/retry.py). Backoff is exponential with full jitter:
+# up to RETRY_BACKOFF_BASE * 2**n seconds, capped at RETRY_BACKOFF_MAX.
+_retry = _secrets.get("retry", {})
+TASK_MAX_RETRIES = int(_retry.get("max_retries", 3))
+EMPTY_RESULT_RETRIES = int(_retry.get("empty_result_retries", 0))
+RETRY_BACKOFF_BASE = float(_retry.get("backoff_base", 2))
+RETRY_BACKOFF_MAX = float(_retry.get("backoff_max", 60))
+
+# Per-endpoint Amadeus rate limits as [requests_per_second, burst] (see worker/ratelimit.py)
+_rate_limits = _secrets.get("rate_limits", {})
+RATE_LIMITS = {
+    "flight_offers_search": tuple(_rate_limits.get("flight_offers_search", (10, 10))),
+    "pricing": tuple(_rate_limits.get("pricing", (10, 10))),
+    "flight_orders": tuple(_rate_limits.get("flight_orders", (5, 5))),
+    "flight_orders_get": tuple(_rate_limits.get("flight_orders_get", (2, 2))),
+}
+RATE_LIMIT_MAX_WAIT = float(_rate_limits.get("max_wait", 30))
+
+# Search -> price -> hold pipeline queues (see celery_worker.py). Each stage
+# runs on its own queue so its workers can be sized independently. "pool" is
+# the Celery pool of the queue's workers: None picks "threads" with the async
+# transport (its requests then overlap within one process, "threads" tasks
+# per worker) and "prefork" otherwise.
+_pipeline = _secrets.get("pipeline", {})
+PIPELINE_QUEUES = {
+    "search": {"concurrency": 8, "prefetch": 4, "rate_limit": None, "pool": None, "threads": 64},
+    "pricing": {"concurrency": 4, "prefetch": 1, "rate_limit": None, "pool": None, "threads": 32},
+    "holds": {"concurrency": 2, "prefetch": 1, "rate_limit": None, "pool": None, "threads": 8},
+}
+for _queue, _settings in PIPELINE_QUEUES.items():
+    _settings.update(_pipeline.get(_queue, {}))
+# Upper bound on sub-searches a single flexible (fan-out) search may expand to
+FANOUT_MAX_SEARCHES = int(_pipeline.get("fanout_max_searches", 30))
+
+# Celery's default "celery" queue: single-task searches (search_and_hold_flight),
+# chord callbacks and anything else without a route
+DEFAULT_QUEUE = {"concurrency": 2, "prefetch": 4, "rate_limit": None, **_pipeline.get("celery", {})}
+
+# Background work runs on its own queues so it never waits behind, or delays,
+# interactive searches. Batch searches run the whole pipeline on "batch".
+BACKGROUND_QUEUES = {
+    "batch": {"concurrency": 4, "prefetch": 4, "rate_limit": None},
+    "maintenance": {"concurrency": 1, "prefetch": 1, "rate_limit": None},
+}
+for _queue, _settings in BACKGROUND_QUEUES.items():
+    _settings.update(_pipeline.get(_queue, {}))
+# Priority class -> queues. Interactive work uses the pipeline stage queues.
+PRIORITY_CLASSES = {
+    "interactive": list(PIPELINE_QUEUES),
+    "batch": ["batch"],
+    "maintenance": ["maintenance"],
+}
+
+# Worker autoscaling (see worker/autoscale.py). Each queue's worker pool is
+# resized between min_concurrency and max_concurrency from its backlog and
+# the p95 queue wait of its priority class over AUTOSCALE_WAIT_WINDOW seconds.
+_autoscale = _secrets.get("autoscale", {})
+AUTOSCALE_ENABLED = bool(_autoscale.get("enabled", True))
+AUTOSCALE_INTERVAL = float(_autoscale.get("interval", 5))
+AUTOSCALE_WAIT_WINDOW = float(_autoscale.get("wait_window", 60))
+AUTOSCALE_BACKLOG_PER_PROCESS = int(_autoscale.get("backlog_per_process", 4))
+AUTOSCALE_TARGET_WAIT = {
+    "interactive": 1.0,
+    "batch": 30.0,
+    "maintenance": 300.0,
+    **_autoscale.get("target_wait", {}),
+}
+for _queue, _settings in {"celery": DEFAULT_QUEUE, **PIPELINE_QUEUES, **BACKGROUND_QUEUES}.items():
+    _settings.setdefault("min_concurrency", 1)
+    _settings.setdefault("max_concurrency", _settings["concurrency"] * 2)
+
+# Prometheus metrics exported by each worker host (see worker/metrics.py)
+_metrics = _secrets.get("metrics", {})
+METRICS_PORT = int(_metrics.get("port", 9808))
+METRICS_MULTIPROC_DIR = _metrics.get("multiproc_dir", "/tmp/amadeus_booking_metrics")
+
+# Process supervisor in run.py. Replica counts are per worker queue ("celery"
+# is the default queue) and for Streamlit, which listens on consecutive
+# ports from STREAMLIT_BASE_PORT. GET :SUPERVISOR_STATUS_PORT/status reports state.
+_supervisor = _secrets.get("supervisor", {})
+WORKER_REPLICAS = {"celery": 1, **_supervisor.get("worker_replicas", {})}
+STREAMLIT_REPLICAS = int(_supervisor.get("streamlit_replicas", 1))
+STREAMLIT_BASE_PORT = int(_supervisor.get("streamlit_base_port", 8501))
+SUPERVISOR_STATUS_PORT = int(_supervisor.get("status_port", 9809))
+# Seconds a process may take to pass its readiness probe / finish in-flight work
+SUPERVISOR_READY_TIMEOUT = float(_supervisor.get("ready_timeout", 60))
+SUPERVISOR_DRAIN_TIMEOUT = float(_supervisor.get("drain_timeout", 120))
+# Crashed processes restart after RESTART_BACKOFF_BASE * 2**n seconds (capped);
+# n resets once a process has stayed up for SUPERVISOR_STABLE_AFTER seconds
+RESTART_BACKOFF_BASE = float(_supervisor.get("restart_backoff_base", 1))
+RESTART_BACKOFF_MAX = float(_supervisor.get("restart_backoff_max", 60))
+SUPERVISOR_STABLE_AFTER = float(_supervisor.get("stable_after", 60))
+# Beat schedules a heartbeat task this often; beat is ready once one has run
+BEAT_HEARTBEAT_INTERVAL = float(_supervisor.get("beat_heartbeat_interval", 5))
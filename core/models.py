@@ -1,5 +1,17 @@
-from pydantic import BaseModel, constr, conint
-from typing import Optional
+from pydantic import BaseModel, constr, conint, field_validator
+from typing import List, Optional
+from datetime import date, timedelta
+import hashlib
+
+from core.airports import get_airport_index
+
+
+def validate_location_code(code: str) -> str:
+    """Uppercases an IATA airport/city code and rejects unknown ones."""
+    code = code.strip().upper()
+    if not get_airport_index().is_valid(code):
+        raise ValueError(f"Unknown airport or city code: {code}")
+    return code
 
 class FlightSearchRequest(BaseModel):
     from_location: constr(min_length=3, max_length=3)
@@ -8,6 +20,63 @@ class FlightSearchRequest(BaseModel):
     num_passengers: conint(gt=0)
     seat_class: str  # e.g., "Economy", "Premium Economy", etc.
 
+    @field_validator("from_location", "to_location")
+    @classmethod
+    def _known_location(cls, value: str) -> str:
+        return validate_location_code(value)
+
+    def cache_key(self) -> str:
+        """
+        Returns a stable key for this search, so that "jfk"/"JFK" or
+        "Premium Economy"/"PREMIUM_ECONOMY" map to the same Amadeus query.
+        """
+        normalized = "|".join([
+            self.from_location.strip().upper(),
+            self.to_location.strip().upper(),
+            self.departure_date.strip(),
+            str(self.num_passengers),
+            self.seat_class.strip().upper().replace(" ", "_"),
+        ])
+        return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+class FlexibleSearchRequest(FlightSearchRequest):
+    """
+    A search that fans out over a ± date window and alternative airports.
+    Every combination becomes one FlightSearchRequest.
+    """
+    date_window: conint(ge=0, le=7) = 0  # days either side of departure_date
+    alt_origins: List[constr(min_length=3, max_length=3)] = []
+    alt_destinations: List[constr(min_length=3, max_length=3)] = []
+    top_k: conint(gt=0, le=250) = 10
+
+    @field_validator("alt_origins", "alt_destinations")
+    @classmethod
+    def _known_alternatives(cls, value: List[str]) -> List[str]:
+        return [validate_location_code(code) for code in value]
+
+    def expand(self) -> List[FlightSearchRequest]:
+        """Returns the individual searches covered by this request, without duplicates."""
+        origins = list(dict.fromkeys(code.upper() for code in [self.from_location, *self.alt_origins]))
+        destinations = list(dict.fromkeys(code.upper() for code in [self.to_location, *self.alt_destinations]))
+        base_date = date.fromisoformat(self.departure_date)
+        dates = [
+            (base_date + timedelta(days=offset)).isoformat()
+            for offset in range(-self.date_window, self.date_window + 1)
+        ]
+        return [
+            FlightSearchRequest(
+                from_location=origin,
+                to_location=destination,
+                departure_date=departure_date,
+                num_passengers=self.num_passengers,
+                seat_class=self.seat_class,
+            )
+            for origin in origins
+            for destination in destinations
+            if origin != destination
+            for departure_date in dates
+        ]
+
 # Optional: For later use to display flight options
 class FlightOption(BaseModel):
     airline: str
@@ -0,0 +1,140 @@
+# core/normalize.py
+# Columnar normalization of Amadeus flight offers.
+# The worker turns a batch of offers into one typed table; the UI only
+# formats and renders it. Nested JSON is flattened in a single pass and all
+# parsing (timestamps, ISO-8601 durations, prices) is done column-wise.
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = [
+    "offer_id", "offer_ref", "route", "departure_at", "arrival_at",
+    "duration_minutes", "stops", "airlines", "cabin",
+    "bags_quantity", "bags_weight", "bags_weight_unit", "price", "currency",
+]
+DATETIME_COLUMNS = ["departure_at", "arrival_at"]
+STRING_COLUMNS = ["offer_id", "offer_ref", "route", "airlines", "cabin", "bags_weight_unit", "currency"]
+
+DISPLAY_COLUMNS = [
+    "Offer ID", "Route", "Departure", "Arrival", "Duration",
+    "Stops", "Airline(s)", "Cabin", "Checked Bags", "Price",
+]
+
+_DURATION_PATTERN = r"^P(?:(?P<days>\d+)D)?T?(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?$"
+
+
+def _flatten(offers: list) -> dict:
+    """Extracts the raw scalar fields of every offer into per-column lists."""
+    raw = {name: [] for name in (
+        "offer_id", "offer_ref", "route", "departure_at", "arrival_at", "duration",
+        "stops", "airlines", "cabin", "bags_quantity", "bags_weight", "bags_weight_unit",
+        "price", "currency",
+    )}
+    for i, offer in enumerate(offers):
+        if not isinstance(offer, dict):
+            continue
+        itineraries = offer.get("itineraries") or [{}]
+        segments = itineraries[0].get("segments") or []
+        if not segments:
+            continue
+        codes = [seg.get("departure", {}).get("iataCode") for seg in segments]
+        codes.append(segments[-1].get("arrival", {}).get("iataCode"))
+        fare_details = ((offer.get("travelerPricings") or [{}])[0].get("fareDetailsBySegment") or [{}])[0]
+        bags = fare_details.get("includedCheckedBags")
+        price = offer.get("price", {})
+
+        raw["offer_id"].append(offer.get("id", f"N/A_{i + 1}"))
+        raw["offer_ref"].append(offer.get("offerRef"))
+        raw["route"].append(" → ".join(code for code in codes if code) or "N/A")
+        raw["departure_at"].append(segments[0].get("departure", {}).get("at"))
+        raw["arrival_at"].append(segments[-1].get("arrival", {}).get("at"))
+        raw["duration"].append(itineraries[0].get("duration"))
+        raw["stops"].append(len(segments) - 1)
+        raw["airlines"].append(", ".join(offer.get("validatingAirlineCodes") or []) or "N/A")
+        raw["cabin"].append(fare_details.get("cabin"))
+        # An empty includedCheckedBags dict means no checked bags
+        raw["bags_quantity"].append(bags.get("quantity", 0 if not bags else None) if bags is not None else None)
+        raw["bags_weight"].append(bags.get("weight") if bags else None)
+        raw["bags_weight_unit"].append(bags.get("weightUnit") if bags else None)
+        raw["price"].append(price.get("grandTotal"))
+        raw["currency"].append(price.get("currency", ""))
+    return raw
+
+
+def _apply_types(df: pd.DataFrame) -> pd.DataFrame:
+    """Casts every column of a raw table to its normalized dtype."""
+    for column in DATETIME_COLUMNS:
+        df[column] = pd.to_datetime(df[column], errors="coerce", format="ISO8601")
+    for column in STRING_COLUMNS:
+        df[column] = df[column].astype("string")
+    df["duration_minutes"] = pd.to_numeric(df["duration_minutes"], errors="coerce").astype("Int64")
+    df["stops"] = pd.to_numeric(df["stops"], errors="coerce").astype("Int16")
+    df["bags_quantity"] = pd.to_numeric(df["bags_quantity"], errors="coerce").astype("Int16")
+    df["bags_weight"] = pd.to_numeric(df["bags_weight"], errors="coerce").astype("float64")
+    df["price"] = pd.to_numeric(df["price"], errors="coerce").astype("float64")
+    return df[COLUMNS]
+
+
+def normalize_offers(offers: list) -> pd.DataFrame:
+    """Returns one typed row per valid offer, in the order given."""
+    raw = _flatten(offers or [])
+    durations = pd.Series(raw.pop("duration"), dtype="object")
+    df = pd.DataFrame(raw)
+
+    parts = durations.str.extract(_DURATION_PATTERN).astype("float64")
+    minutes = parts["days"].fillna(0) * 1440 + parts["hours"].fillna(0) * 60 + parts["minutes"].fillna(0)
+    df["duration_minutes"] = minutes.where(parts.notna().any(axis=1))
+    return _apply_types(df)
+
+
+def to_columns(df: pd.DataFrame) -> dict:
+    """Converts a normalized table into plain column lists for a task result."""
+    columns = {}
+    for name in COLUMNS:
+        series = df[name]
+        if name in DATETIME_COLUMNS:
+            series = series.dt.strftime("%Y-%m-%dT%H:%M:%S")
+        columns[name] = series.astype("object").where(series.notna(), None).tolist()
+    return columns
+
+
+def from_columns(columns: dict) -> pd.DataFrame:
+    """Rebuilds a typed table from to_columns() output."""
+    length = max((len(values) for values in columns.values()), default=0)
+    return _apply_types(pd.DataFrame({name: columns.get(name, [None] * length) for name in COLUMNS}))
+
+
+def _format_minutes(series: pd.Series) -> pd.Series:
+    """Formats timestamps as "YYYY-MM-DD HH:MM" without per-element strftime."""
+    text = np.datetime_as_string(series.to_numpy("datetime64[m]"), unit="m")
+    return pd.Series(np.char.replace(text, "T", " "), index=series.index).where(series.notna(), "N/A")
+
+
+def to_display(df: pd.DataFrame) -> pd.DataFrame:
+    """Formats a normalized table into the columns shown in the results table."""
+    hours = (df["duration_minutes"] // 60).astype("string")
+    minutes = (df["duration_minutes"] % 60).astype("string")
+    duration = (hours + "H " + minutes + "M").fillna("N/A")
+
+    bags = pd.Series("N/A", index=df.index, dtype="object")
+    has_weight = df["bags_weight"].notna() & df["bags_weight_unit"].notna()
+    weight = df["bags_weight"].map("{:g}".format, na_action="ignore").astype("string")
+    bags = bags.mask(has_weight, weight + " " + df["bags_weight_unit"])
+    has_quantity = df["bags_quantity"].notna()
+    bags = bags.mask(has_quantity, df["bags_quantity"].astype("string") + " pc(s)")
+
+    price = df["price"].map("{:.2f}".format, na_action="ignore").astype("string")
+    price = (price + " " + df["currency"].fillna("")).str.strip().fillna("N/A")
+
+    return pd.DataFrame({
+        "Offer ID": df["offer_id"].fillna("N/A"),
+        "Route": df["route"].fillna("N/A"),
+        "Departure": _format_minutes(df["departure_at"]),
+        "Arrival": _format_minutes(df["arrival_at"]),
+        "Duration": duration,
+        "Stops": df["stops"],
+        "Airline(s)": df["airlines"].fillna("N/A"),
+        "Cabin": df["cabin"].fillna("N/A").str.replace("_", " ").str.title(),
+        "Checked Bags": bags,
+        "Price": price,
+    })[DISPLAY_COLUMNS]
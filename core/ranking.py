@@ -0,0 +1,94 @@
+# core/ranking.py
+# Multi-criteria ranking of a page of flight offers.
+# Works on the normalized table from core/normalize.py: every criterion is a
+# vectorized cost in [0, 1] (0 = best on this page), and an offer's score is
+# 1 minus the weighted mean of its costs. Weights and carrier preferences
+# come from the "ranking" section of the config; new criteria can be added
+# with register_criterion().
+
+import numpy as np
+import pandas as pd
+
+from core import config
+
+CRITERIA = {}
+
+
+def register_criterion(name: str):
+    """Decorator adding fn(df, options) -> cost array to the ranking criteria."""
+    def decorator(fn):
+        CRITERIA[name] = fn
+        return fn
+    return decorator
+
+
+def _min_max(values: pd.Series) -> np.ndarray:
+    """Scales values to [0, 1] across the page; missing values cost 1."""
+    array = pd.to_numeric(values, errors="coerce").astype("float64").to_numpy()
+    if np.isnan(array).all():
+        return np.ones(len(array))
+    low, high = np.nanmin(array), np.nanmax(array)
+    scaled = (array - low) / (high - low) if high > low else np.where(np.isnan(array), np.nan, 0.0)
+    return np.nan_to_num(scaled, nan=1.0)
+
+
+@register_criterion("price")
+def price_cost(df: pd.DataFrame, options: dict) -> np.ndarray:
+    return _min_max(df["price"])
+
+
+@register_criterion("duration")
+def duration_cost(df: pd.DataFrame, options: dict) -> np.ndarray:
+    return _min_max(df["duration_minutes"])
+
+
+@register_criterion("stops")
+def stops_cost(df: pd.DataFrame, options: dict) -> np.ndarray:
+    return _min_max(df["stops"])
+
+
+@register_criterion("carrier")
+def carrier_cost(df: pd.DataFrame, options: dict) -> np.ndarray:
+    """0 for preferred carriers, 1 for avoided ones, 0.5 otherwise."""
+    preferred, avoided = options.get("preferred_carriers", []), options.get("avoided_carriers", [])
+    cost = np.full(len(df), 0.5 if preferred or avoided else 0.0)
+    airlines = df["airlines"].fillna("")
+    if preferred:
+        cost[airlines.str.contains("|".join(preferred), regex=True).to_numpy(dtype=bool)] = 0.0
+    if avoided:
+        cost[airlines.str.contains("|".join(avoided), regex=True).to_numpy(dtype=bool)] = 1.0
+    return cost
+
+
+@register_criterion("baggage")
+def baggage_cost(df: pd.DataFrame, options: dict) -> np.ndarray:
+    """0 with checked bags included, 1 without, 0.5 when unknown."""
+    quantity = df["bags_quantity"].astype("float64").to_numpy()
+    weight = df["bags_weight"].astype("float64").to_numpy()
+    known = ~np.isnan(quantity) | ~np.isnan(weight)
+    included = (np.nan_to_num(quantity) > 0) | (np.nan_to_num(weight) > 0)
+    return np.where(included, 0.0, np.where(known, 1.0, 0.5))
+
+
+def score_offers(df: pd.DataFrame, weights: dict = None, options: dict = None) -> np.ndarray:
+    """Returns one score in [0, 1] per row of a normalized table; higher is better."""
+    weights = config.RANKING_WEIGHTS if weights is None else weights
+    options = config.RANKING_OPTIONS if options is None else options
+    active = {name: weight for name, weight in weights.items() if weight and name in CRITERIA}
+    if df.empty or not active:
+        return np.ones(len(df))
+    cost = sum(weight * CRITERIA[name](df, options) for name, weight in active.items())
+    return 1.0 - cost / sum(active.values())
+
+
+def rank_offers(df: pd.DataFrame, weights: dict = None, options: dict = None) -> pd.DataFrame:
+    """
+    Returns the table sorted best first, with a "score" column. Ties go to
+    the cheaper offer, then to the original order.
+    """
+    scores = score_offers(df, weights, options)
+    price = df["price"].astype("float64").fillna(np.inf).to_numpy()
+    order = np.lexsort((np.arange(len(df)), price, -scores))
+    ranked = df.iloc[order].reset_index(drop=True)
+    ranked["score"] = scores[order].round(4)
+    return ranked
@@ -0,0 +1,25 @@
+# core/redis_client.py
+# Shared Redis connection for application data (caches, locks, counters).
+# Uses the same Redis instance that Celery uses as broker and result backend.
+
+import ssl
+import redis
+
+from core import config
+
+_client = None
+
+
+def get_redis() -> redis.Redis:
+    """
+    Returns a process-wide Redis client, creating it on first use.
+    The underlying connection pool is shared by every caller in the process.
+    """
+    global _client
+    if _client is None:
+        kwargs = {}
+        if config.REDIS_URL.startswith("rediss://"):
+            # Match the relaxed SSL settings used for the Celery broker/backend
+            kwargs["ssl_cert_reqs"] = ssl.CERT_NONE
+        _client = redis.Redis.from_url(config.REDIS_URL, **kwargs)
+    return _client
@@ -0,0 +1,71 @@
+# core/secrets.py
+# Settings loader with no UI dependencies, so workers do not have to import
+# streamlit just to read st.secrets.
+#
+# Sources, lowest to highest precedence:
+#   1. TOML secrets: $SECRETS_PATH, else .streamlit/secrets.toml in the working
+#      directory or the home directory (the files st.secrets reads)
+#   2. .env in the working directory
+#   3. Environment variables named <SECTION>_<KEY>, e.g. AMADEUS_CLIENT_ID or
+#      CACHE_SEARCH_TTL. Values are parsed as JSON when possible, so
+#      RATE_LIMITS_PRICING="[20, 20]" works too, except in STRING_SECTIONS.
+
+import json
+import os
+import tomllib
+from pathlib import Path
+
+from dotenv import dotenv_values
+
+# Sections that may be set from environment variables (see core/config.py)
+SECTIONS = (
+    "amadeus", "redis", "cache", "ranking", "singleflight", "holds", "retry",
+    "rate_limits", "pipeline", "metrics", "autoscale", "supervisor", "fare_watch",
+    "history", "batch",
+)
+# Credentials and URLs: kept exactly as given, so a secret such as "12345"
+# or "1e10" never turns into a number (core/config.py casts the numeric
+# settings of these sections itself)
+STRING_SECTIONS = ("amadeus", "redis")
+
+
+def _toml_path():
+    if os.environ.get("SECRETS_PATH"):
+        return Path(os.environ["SECRETS_PATH"])
+    for base in (Path.cwd(), Path.home()):
+        path = base / ".streamlit" / "secrets.toml"
+        if path.exists():
+            return path
+    return None
+
+
+def _parse(value: str):
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def _apply_env(secrets: dict, environ: dict):
+    # Longest section first, so RATE_LIMITS_X is not read as a "rate" section
+    for name, value in environ.items():
+        for section in sorted(SECTIONS, key=len, reverse=True):
+            prefix = section.upper() + "_"
+            if name.startswith(prefix) and len(name) > len(prefix):
+                secrets.setdefault(section, {})[name[len(prefix):].lower()] = (
+                    value if section in STRING_SECTIONS else _parse(value)
+                )
+                break
+
+
+def load_secrets(env_file: str = ".env") -> dict:
+    """Returns settings as nested dicts, shaped like st.secrets."""
+    secrets = {}
+    path = _toml_path()
+    if path is not None and path.exists():
+        with open(path, "rb") as handle:
+            secrets = tomllib.load(handle)
+    if os.path.exists(env_file):
+        _apply_env(secrets, {k: v for k, v in dotenv_values(env_file).items() if v is not None})
+    _apply_env(secrets, os.environ)
+    return secrets
@@ -0,0 +1,32 @@
+# core/serialization.py
+# Compact binary serializer for Celery task results: msgpack, then zstd.
+# Registered with kombu under the name "msgpack-zstd" so the worker and the
+# Streamlit app (which both import celery_worker) can encode and decode it.
+
+import msgpack
+import zstandard
+from kombu.serialization import register
+
+SERIALIZER_NAME = "msgpack-zstd"
+CONTENT_TYPE = "application/x-msgpack-zstd"
+
+_compressor = zstandard.ZstdCompressor(level=3)
+_decompressor = zstandard.ZstdDecompressor()
+
+
+def packb(obj) -> bytes:
+    return _compressor.compress(msgpack.packb(obj, use_bin_type=True))
+
+
+def unpackb(data: bytes):
+    return msgpack.unpackb(_decompressor.decompress(data), raw=False)
+
+
+def register_serializer():
+    register(
+        SERIALIZER_NAME,
+        packb,
+        unpackb,
+        content_type=CONTENT_TYPE,
+        content_encoding="binary",
+    )
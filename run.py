@@ -1,40 +1,327 @@
 # run.py
+# Supervises the app's processes on one host: a Celery worker per queue
+# (times WORKER_REPLICAS), celery beat, and STREAMLIT_REPLICAS Streamlit
+# servers. See the "supervisor" section in core/config.py.
+#
+# - Workers start first; Streamlit starts once every worker answers a ping.
+# - Processes that die are restarted with exponential backoff.
+# - SIGHUP does a rolling reload. Each worker gets a replacement, which must
+#   pass readiness before the old one drains (warm shutdown: no new tasks,
+#   in-flight tasks finish). Streamlit replicas restart one at a time.
+# - SIGTERM / Ctrl-C drains everything and exits.
+# - GET :SUPERVISOR_STATUS_PORT/status returns JSON; /healthz is 200 when all
+#   processes are ready.
 
+import json
+import logging
+import signal
+import socket
 import subprocess
+import threading
 import time
-import signal
-import sys
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-def run():
-    try:
-        # Start Celery
-        celery_proc = subprocess.Popen(
-            ["celery", "-A", "celery_worker", "worker", "--loglevel=info"]
-        )
+from core import config
+from core.redis_client import get_redis
+from celery_worker import WORKER_QUEUES, celery, stage_worker_command
+from worker.tasks import BEAT_HEARTBEAT_KEY
+
+STARTING = "starting"
+READY = "ready"
+DRAINING = "draining"
+BACKOFF = "backoff"
+STOPPED = "stopped"
+
+
+class ProcessGroup:
+    """A kind of supervised process: how to start it and how to probe it."""
+
+    def __init__(self, name, replicas, command, probe, surge=True, graceful=signal.SIGTERM):
+        self.name = name
+        self.replicas = replicas
+        self.command = command  # replica -> argv
+        self.probe = probe  # replica -> bool
+        # Rolling reloads start the replacement before draining the old
+        # process; not possible when replicas bind a fixed port
+        self.surge = surge
+        self.graceful = graceful
+
+
+class Replica:
+    """One supervised process."""
+
+    def __init__(self, group: ProcessGroup, index: int, generation: int = 0):
+        self.group = group
+        self.index = index
+        self.generation = generation
+        self.proc = None
+        self.state = STOPPED
+        self.started_at = None
+        self.launched_at = None
+        self.restarts = 0
+        self.failures = 0  # consecutive crashes, drives the backoff
+        self.next_start = 0.0
+
+    @property
+    def name(self) -> str:
+        return f"{self.group.name}-{self.index}.{self.generation}"
+
+    def start(self):
+        self.proc = subprocess.Popen(self.group.command(self))
+        self.state = STARTING
+        self.started_at = time.monotonic()
+        self.launched_at = time.time()  # wall clock, to compare with heartbeats
+        logging.info(f"Started {self.name} (pid {self.proc.pid})")
+
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    def check_ready(self) -> bool:
+        if self.state == STARTING and self.alive():
+            try:
+                if self.group.probe(self):
+                    self.state = READY
+                    logging.info(f"{self.name} is ready")
+            except Exception:
+                pass
+        return self.state == READY
+
+    def wait_ready(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and self.alive():
+            if self.check_ready():
+                return True
+            time.sleep(0.5)
+        return False
+
+    def drain(self, timeout: float):
+        """Asks the process to finish in-flight work and exit; kills it after timeout."""
+        if self.alive():
+            if self.state != DRAINING:
+                self.state = DRAINING
+                logging.info(f"Draining {self.name}")
+                self.proc.send_signal(self.group.graceful)
+            try:
+                self.proc.wait(timeout)
+            except subprocess.TimeoutExpired:
+                logging.warning(f"{self.name} did not drain within {timeout}s, killing it")
+                self.proc.kill()
+                self.proc.wait()
+        self.state = STOPPED
+
+    def status(self) -> dict:
+        return {
+            "name": self.name,
+            "group": self.group.name,
+            "state": self.state,
+            "pid": self.proc.pid if self.alive() else None,
+            "uptime": round(time.monotonic() - self.started_at, 1) if self.alive() else 0,
+            "restarts": self.restarts,
+        }
+
+
+def worker_node(replica: Replica) -> str:
+    # Generation in the node name lets a replacement run beside the process it replaces
+    return f"{replica.group.name}-{replica.index}.{replica.generation}"
+
+
+def ping_worker(replica: Replica) -> bool:
+    destination = f"{worker_node(replica)}@{socket.gethostname()}"
+    return bool(celery.control.ping(destination=[destination], timeout=1.0))
+
+
+def streamlit_port(replica: Replica) -> int:
+    return config.STREAMLIT_BASE_PORT + replica.index
 
-        # Give Celery time to spin up
-        time.sleep(2)
 
-        # Start Streamlit (blocking)
-        streamlit_proc = subprocess.Popen(
-            ["streamlit", "run", "streamlit_app/app.py"]
+def probe_streamlit(replica: Replica) -> bool:
+    with urllib.request.urlopen(f"http://127.0.0.1:{streamlit_port(replica)}/_stcore/health", timeout=1) as response:
+        return response.status == 200
+
+
+def probe_beat(replica: Replica) -> bool:
+    """
+    Ready once a heartbeat task from this beat has run (worker.beat_heartbeat),
+    i.e. it loaded its schedule and reached the broker.
+    """
+    beat = get_redis().get(BEAT_HEARTBEAT_KEY)
+    return beat is not None and float(beat) >= replica.launched_at
+
+
+def build_groups() -> list:
+    groups = [
+        ProcessGroup(
+            queue,
+            config.WORKER_REPLICAS.get(queue, 1),
+            lambda replica, queue=queue: stage_worker_command(queue, worker_node(replica)),
+            ping_worker,
         )
+        for queue in WORKER_QUEUES
+    ]
+    # Periodic tasks (hold status refresh); exactly one beat per deployment
+    groups.append(ProcessGroup(
+        "beat", 1, lambda replica: ["celery", "-A", "celery_worker", "beat", "--loglevel=info"],
+        probe_beat, surge=False,
+    ))
+    groups.append(ProcessGroup(
+        "streamlit",
+        config.STREAMLIT_REPLICAS,
+        lambda replica: [
+            "streamlit", "run", "streamlit_app/app.py",
+            "--server.port", str(streamlit_port(replica)), "--server.headless", "true",
+        ],
+        probe_streamlit,
+        surge=False,
+    ))
+    return groups
+
+
+class Supervisor:
+    def __init__(self, groups: list):
+        self.groups = groups
+        self.replicas = {group.name: [Replica(group, i) for i in range(group.replicas)] for group in groups}
+        self.lock = threading.Lock()
+        self.stopping = False
+        self.reload_requested = False
+
+    def all_replicas(self) -> list:
+        return [replica for replicas in self.replicas.values() for replica in replicas]
+
+    def start(self):
+        """Starts workers and beat, waits for their readiness, then starts Streamlit."""
+        for name, replicas in self.replicas.items():
+            if name != "streamlit":
+                for replica in replicas:
+                    replica.start()
+        for replica in self.all_replicas():
+            if replica.state == STARTING and not replica.wait_ready(config.SUPERVISOR_READY_TIMEOUT):
+                logging.warning(f"{replica.name} not ready after {config.SUPERVISOR_READY_TIMEOUT}s")
+        for replica in self.replicas.get("streamlit", []):
+            replica.start()
+            replica.wait_ready(config.SUPERVISOR_READY_TIMEOUT)
+
+    def tick(self):
+        """Marks processes ready, and restarts crashed ones after their backoff."""
+        now = time.monotonic()
+        with self.lock:
+            for replica in self.all_replicas():
+                if replica.state in (STARTING, READY) and not replica.alive():
+                    replica.failures += 1
+                    if now - replica.started_at > config.SUPERVISOR_STABLE_AFTER:
+                        replica.failures = 1
+                    delay = min(config.RESTART_BACKOFF_MAX, config.RESTART_BACKOFF_BASE * 2 ** (replica.failures - 1))
+                    logging.warning(
+                        f"{replica.name} exited with {replica.proc.returncode}, restarting in {delay:.0f}s"
+                    )
+                    replica.state = BACKOFF
+                    replica.next_start = now + delay
+                elif replica.state == BACKOFF and now >= replica.next_start:
+                    replica.restarts += 1
+                    replica.start()
+                else:
+                    replica.check_ready()
+
+    def rolling_reload(self):
+        """Replaces every process one at a time without dropping capacity."""
+        logging.info("Rolling reload")
+        for name, replicas in self.replicas.items():
+            for i, old in enumerate(list(replicas)):
+                if self.stopping:
+                    return
+                if not old.group.surge:
+                    old.drain(config.SUPERVISOR_DRAIN_TIMEOUT)
+                    old.start()
+                    old.wait_ready(config.SUPERVISOR_READY_TIMEOUT)
+                    continue
+                new = Replica(old.group, old.index, old.generation + 1)
+                new.start()
+                if not new.wait_ready(config.SUPERVISOR_READY_TIMEOUT):
+                    logging.error(f"{new.name} failed readiness; keeping {old.name}")
+                    new.drain(config.SUPERVISOR_DRAIN_TIMEOUT)
+                    continue
+                with self.lock:
+                    replicas[i] = new
+                old.drain(config.SUPERVISOR_DRAIN_TIMEOUT)
+
+    def shutdown(self):
+        """Drains Streamlit first (no new searches), then workers, then beat."""
+        self.stopping = True
+        order = sorted(self.replicas, key=lambda name: {"streamlit": 0, "beat": 2}.get(name, 1))
+        for name in order:
+            replicas = self.replicas[name]
+            for replica in replicas:
+                if replica.alive():
+                    replica.state = DRAINING
+                    replica.proc.send_signal(replica.group.graceful)
+            for replica in replicas:
+                replica.drain(config.SUPERVISOR_DRAIN_TIMEOUT)
+
+    def status(self) -> dict:
+        with self.lock:
+            processes = [replica.status() for replica in self.all_replicas()]
+        return {"ready": all(p["state"] == READY for p in processes), "processes": processes}
+
+    def serve_status(self, port: int) -> ThreadingHTTPServer:
+        supervisor = self
 
-        # Wait for Streamlit to finish
-        streamlit_proc.wait()
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
 
+            def do_GET(self):
+                status = supervisor.status()
+                if self.path == "/healthz":
+                    code = 200 if status["ready"] else 503
+                elif self.path == "/status":
+                    code = 200
+                else:
+                    code, status = 404, {"error": "not found"}
+                body = json.dumps(status).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+        threading.Thread(target=server.serve_forever, name="supervisor-status", daemon=True).start()
+        logging.info(f"Supervisor status on :{port}/status")
+        return server
+
+    def loop(self):
+        while not self.stopping:
+            if self.reload_requested:
+                self.reload_requested = False
+                self.rolling_reload()
+            self.tick()
+            time.sleep(1)
+
+
+def run():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s supervisor %(levelname)s %(message)s")
+    supervisor = Supervisor(build_groups())
+
+    def request_stop(signum, frame):
+        supervisor.stopping = True
+
+    def request_reload(signum, frame):
+        supervisor.reload_requested = True
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGHUP, request_reload)
+
+    status_server = supervisor.serve_status(config.SUPERVISOR_STATUS_PORT)
+    try:
+        supervisor.start()
+        supervisor.loop()
     except KeyboardInterrupt:
         print("\nShutting down due to KeyboardInterrupt...")
-
     finally:
-        print("Terminating subprocesses...")
-        if 'celery_proc' in locals():
-            celery_proc.terminate()
-        if 'streamlit_proc' in locals() and streamlit_proc.poll() is None:
-            streamlit_proc.terminate()
-
-        # Optional: wait for clean shutdown
-        time.sleep(1)
+        print("Draining subprocesses...")
+        supervisor.shutdown()
+        status_server.shutdown()
+
 
 if __name__ == "__main__":
     run()
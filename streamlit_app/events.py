@@ -0,0 +1,124 @@
+# streamlit_app/events.py
+# Event-driven delivery of Celery task state changes to Streamlit sessions.
+# The Redis result backend publishes every state it stores on the task's
+# result key. One subscriber per Streamlit server process listens on those
+# channels and keeps the newest state of every watched task in memory, with
+# a version that grows on each change. Sessions read it with latest() and
+# rerun only when their task's version changed (see streamlit_app/poll.py),
+# instead of each session polling Redis on a timer.
+
+import logging
+import queue
+import ssl
+import threading
+
+import redis
+import streamlit as st
+
+from celery_worker import celery
+from core import config
+
+
+class TaskEventSubscriber:
+    """
+    Shares one pub/sub connection (plus a small bounded pool for snapshot
+    reads) across all sessions in the process.
+
+    Sessions call watch() for their task, latest() for its state and
+    unwatch() when done. All pub/sub commands run on the listener thread,
+    since redis-py PubSub objects are not thread-safe.
+    """
+
+    def __init__(self, redis_url=config.REDIS_URL, max_connections=config.RESULT_SUBSCRIBER_MAX_CONNECTIONS):
+        kwargs = {}
+        if redis_url.startswith("rediss://"):
+            kwargs["ssl_cert_reqs"] = ssl.CERT_NONE
+        self.pool = redis.BlockingConnectionPool.from_url(
+            redis_url, max_connections=max_connections, **kwargs
+        )
+        self.client = redis.Redis(connection_pool=self.pool)
+        self._lock = threading.Lock()
+        self._states = {}  # task_id -> (version, state, meta)
+        self._watchers = {}  # task_id -> number of sessions watching
+        self._commands = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="task-events", daemon=True)
+        self._thread.start()
+
+    def watch(self, task_id: str):
+        with self._lock:
+            self._watchers[task_id] = self._watchers.get(task_id, 0) + 1
+            first = self._watchers[task_id] == 1
+        if first:
+            self._commands.put(("subscribe", task_id))
+
+    def unwatch(self, task_id: str):
+        with self._lock:
+            self._watchers[task_id] = self._watchers.get(task_id, 1) - 1
+            last = self._watchers[task_id] <= 0
+            if last:
+                self._watchers.pop(task_id, None)
+                self._states.pop(task_id, None)
+        if last:
+            self._commands.put(("unsubscribe", task_id))
+
+    def latest(self, task_id: str):
+        """Returns the newest known (version, state, meta) without blocking."""
+        with self._lock:
+            return self._states.get(task_id, (-1, None, None))
+
+    def _channel(self, task_id: str) -> bytes:
+        return celery.backend.get_key_for_task(task_id)
+
+    def _update(self, task_id: str, raw):
+        meta = celery.backend.decode_result(raw)
+        with self._lock:
+            if task_id not in self._watchers:
+                return
+            version = self._states.get(task_id, (-1,))[0] + 1
+            self._states[task_id] = (version, meta.get("status"), meta)
+
+    def _apply_commands(self, pubsub):
+        while True:
+            try:
+                command, task_id = self._commands.get_nowait()
+            except queue.Empty:
+                return
+            channel = self._channel(task_id)
+            if command == "subscribe":
+                pubsub.subscribe(channel)
+                # Catch states stored before the subscription was active
+                raw = self.client.get(channel)
+                if raw is not None:
+                    self._update(task_id, raw)
+            else:
+                pubsub.unsubscribe(channel)
+
+    def _run(self):
+        prefix = self._channel("")
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                # Re-subscribe everything after a reconnect
+                with self._lock:
+                    for task_id in self._watchers:
+                        self._commands.put(("subscribe", task_id))
+                while True:
+                    self._apply_commands(pubsub)
+                    if not pubsub.subscribed:
+                        threading.Event().wait(0.1)
+                        continue
+                    message = pubsub.get_message(timeout=0.2)
+                    if message and message["type"] == "message":
+                        task_id = message["channel"][len(prefix):].decode()
+                        self._update(task_id, message["data"])
+            except redis.RedisError:
+                logging.exception("Task event subscriber lost its connection, reconnecting")
+                threading.Event().wait(1)
+            finally:
+                pubsub.close()
+
+
+@st.cache_resource
+def get_task_subscriber() -> TaskEventSubscriber:
+    """Returns the process-wide subscriber shared by every session."""
+    return TaskEventSubscriber()
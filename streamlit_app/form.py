@@ -1,13 +1,40 @@
 # streamlit_app/form.py
 # Contains the Streamlit form for collecting flight search input
-# and initiating the search and hold task.
+# and initiating the search and hold task, optionally with a fare watch
+# (worker/fare_watch.py) on the same search.
 
 import streamlit as st
-from streamlit_app.state import set_task_id # get_session is not used directly here
+from streamlit_app.state import get_submission_id, set_task_id # get_session is not used directly here
 # Assuming core.models and worker.tasks are in paths accessible by Python
 # e.g., they are installed or in PYTHONPATH
+from core.airports import get_airport_index
 from core.models import FlightSearchRequest # Placeholder, ensure this path is correct
-from worker.tasks import search_and_hold_flight # Placeholder, ensure this path is correct
+from worker.tasks import submit_search_and_hold # Placeholder, ensure this path is correct
+from worker.fare_watch import fare_watch
+
+def airport_input(label, key, help=None):
+    """
+    Free-text airport/city search backed by the local airport index.
+    Shows matching airports as the user types and returns the chosen
+    IATA code, or "" while nothing valid is selected.
+    """
+    query = st.text_input(label, key=f"{key}_query", help=help)
+    if not query.strip():
+        return ""
+
+    index = get_airport_index()
+    options = index.autocomplete(query)
+    exact = index.lookup(query)
+    if exact:
+        options = [exact] + [airport for airport in options if airport != exact]
+    if not options:
+        suggestions = index.suggest(query)
+        hint = ", ".join(airport.label for airport in suggestions)
+        st.warning(f"No airport matches '{query}'." + (f" Did you mean: {hint}?" if hint else ""))
+        return ""
+
+    choice = st.selectbox(f"{label} – matches", options, format_func=lambda airport: airport.label, key=f"{key}_choice")
+    return choice.code
 
 def flight_search_form():
     """
@@ -15,43 +42,78 @@ def flight_search_form():
     Collects user input for flight search parameters and submits a task
     to the Celery worker upon submission.
     """
-    with st.form("flight_form"):
-        st.markdown("##### Enter Flight Details") # Subheading for the form
+    st.markdown("##### Enter Flight Details") # Subheading for the form
+
+    # Airport pickers sit outside the form so suggestions update while typing
+    from_loc = airport_input("From (airport, city or code)", "from", help="E.g., JFK, London, Paris")
+    to_loc = airport_input("To (airport, city or code)", "to", help="E.g., LHR, Kathmandu")
 
+    with st.form("flight_form"):
         # Input fields for flight search
-        from_loc = st.text_input("From (Airport Code)", max_chars=3, help="E.g., JFK, LAX")
-        to_loc = st.text_input("To (Airport Code)", max_chars=3, help="E.g., LHR, CDG")
         date = st.date_input("Departure Date")
         pax = st.number_input("Passengers", min_value=1, max_value=9, value=1, step=1)
         seat_class_options = ["ECONOMY", "PREMIUM_ECONOMY", "BUSINESS", "FIRST"]
         seat_class = st.selectbox("Class", seat_class_options)
 
+        # Optional fare watch: re-searches periodically and notifies on price drops
+        with st.expander("🔔 Watch this fare"):
+            watch = st.checkbox("Notify me when the price drops", key="watch_fare")
+            subscriber = st.text_input("Notify (email or name)", key="watch_subscriber")
+            target_price = st.number_input("Target price (0 for none)", min_value=0.0, value=0.0, step=10.0)
+            drop_pct = st.number_input("Or a drop of (%)", min_value=0.0, max_value=90.0, value=10.0, step=5.0)
+
         # Submit button for the form
         submitted = st.form_submit_button("Search Flights")
 
         if submitted:
-            # Validate inputs (basic example)
+            # Validate inputs locally, before anything is enqueued
             if not from_loc or not to_loc:
-                st.error("Please enter both 'From' and 'To' locations.")
+                st.error("Please choose both 'From' and 'To' airports.")
+                return
+            if from_loc == to_loc:
+                st.error("'From' and 'To' must be different airports.")
+                return
+
+            # Create a flight search request object (re-checks the codes against the index)
+            try:
+                req = FlightSearchRequest(
+                    from_location=from_loc,
+                    to_location=to_loc,
+                    departure_date=date.isoformat(), # Convert date to ISO format string
+                    num_passengers=pax,
+                    seat_class=seat_class
+                )
+            except ValueError as e:
+                st.error(f"❌ Invalid search: {e}")
+                return
+            if watch and not subscriber.strip():
+                st.error("Please enter who to notify for the fare watch.")
                 return
-            if len(from_loc) != 3 or len(to_loc) != 3:
-                st.warning("Airport codes should typically be 3 characters long.")
-
-            # Create a flight search request object
-            req = FlightSearchRequest(
-                from_location=from_loc.upper(),
-                to_location=to_loc.upper(),
-                departure_date=date.isoformat(), # Convert date to ISO format string
-                num_passengers=pax,
-                seat_class=seat_class
-            )
 
             try:
-                # Asynchronously call the Celery task
+                # Asynchronously run the search -> price -> hold pipeline
                 # .model_dump() is a Pydantic method, ensure FlightSearchRequest is a Pydantic model
-                task = search_and_hold_flight.delay(req.model_dump())
+                search_data = req.model_dump()
+                # Resubmitting the same search reuses its token, and so its hold
+                task = submit_search_and_hold(search_data, submission_id=get_submission_id(search_data))
                 set_task_id(task.id) # Store the task ID in session state
                 st.success(f"✅ Flight search submitted! Task ID: {task.id}")
                 st.info("Results will appear below once processing is complete.")
             except Exception as e:
                 st.error(f"❌ Failed to submit task: {e}")
+
+            if watch:
+                start_fare_watch(req, subscriber.strip(), target_price or None, drop_pct or None)
+
+def start_fare_watch(req: FlightSearchRequest, subscriber: str, target_price=None, drop_pct=None):
+    """
+    Subscribes to price changes for the search; the schedule_fare_watches
+    beat task re-runs it and publishes notifications for the subscriber.
+    """
+    try:
+        fare_watch.watch(req.model_dump(), subscriber, target_price=target_price, drop_pct=drop_pct)
+    except Exception as e:
+        st.error(f"❌ Failed to start the fare watch: {e}")
+        return
+    conditions = [f"below {target_price:g}" if target_price else "", f"down {drop_pct:g}%" if drop_pct else ""]
+    st.success(f"🔔 Watching this fare for {subscriber} ({' or '.join(c for c in conditions if c) or 'any change'}).")
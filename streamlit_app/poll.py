@@ -1,24 +1,41 @@
 # streamlit_app/poll.py
-# Handles polling for task results from Celery and triggers rendering
+# Shows the state of the session's Celery task and triggers rendering
 # of the results using a provided render function.
+#
+# Nothing here blocks the script thread: each run renders the latest state
+# the shared subscriber has received and returns. While the task runs, a
+# small fragment checks every REFRESH_INTERVAL seconds (reading memory, not
+# Redis) whether the task's state changed since it was rendered, and reruns
+# the app only when it did.
 
 import time
+
 import streamlit as st
-from celery.result import AsyncResult
-from celery_worker import celery
-from streamlit_app.state import get_task_id, set_search_offers, set_hold_details
+from streamlit_app.events import get_task_subscriber
+from streamlit_app.state import (
+    get_task_id, get_task_result, set_hold_details, set_search_offers, set_task_result,
+)
+from worker.progress import OFFERS_FOUND, PRICE_CONFIRMED, PROGRESS_STATES
+
+# How often a waiting session checks for a new task state (in seconds)
+REFRESH_INTERVAL = 1
+# Stop waiting after this long without the task finishing (in seconds)
+MAX_WAIT = 600
+
+FINAL_STATES = {"SUCCESS", "FAILURE"}
 
-# Define a polling interval (in seconds)
-POLLING_INTERVAL = 2 # Check every 2 seconds
 
 def poll_results(render_fn):
     """
-    Polls for the result of an asynchronous Celery task.
-    Updates the UI based on the task's status (pending, success, failure).
+    Shows the result of an asynchronous Celery task.
+    Updates the UI based on the task's status (pending, partial, success, failure).
+    Returns immediately; while the task is running, a fragment reruns the
+    app whenever the shared subscriber receives a new state for it.
 
     Args:
-        render_fn (callable): A function to call with the task result when ready.
-                              This function is responsible for displaying the data.
+        render_fn (callable): A function to call with the offers, their normalized
+                              table (if any) and the task id when ready. This
+                              function is responsible for displaying the data.
     """
     task_id = get_task_id()
 
@@ -26,31 +43,110 @@ def poll_results(render_fn):
         st.info("Submit a flight search to view results here.")
         return
 
-    is_exist = False
-    while not is_exist:
-        try:
-            task = AsyncResult(task_id, app=celery) # Get the AsyncResult object for the task
-
-            if task.state == "FAILURE":
-                st.error(f"❌ Task failed. Error: {task.traceback}")
-            elif task.state == "SUCCESS":
-                # Task is complete, render the results
-                st.success("🎉 Results are ready!")
-                task_output = task.get()
-                print("## Task OUTPUT ##", task_output)
-                if task_output:
-                    set_hold_details(task_output['hold_details'])
-                render_fn(task_output['offers']) # Pass the actual result data to the render function
-                is_exist = True
+    finished = get_task_result(task_id)
+    if finished is not None:
+        render_final_state(*finished, render_fn, task_id)
+        return
+    if st.session_state.get("timed_out") == task_id:
+        st.warning("⌛ Still waiting for results. Refresh the page to check again.")
+        return
+
+    try:
+        _watch(task_id)
+        version, state, meta = get_task_subscriber().latest(task_id)
+    except Exception as e:
+        st.error(f"🚨 An error occurred while waiting for results: {e}")
+        return
+
+    if state in FINAL_STATES:
+        _unwatch(task_id)
+        set_task_result(task_id, state, meta)
+        render_final_state(state, meta, render_fn, task_id)
+        return
+
+    _render_progress(task_id, state, meta, render_fn)
+    st.session_state["rendered_version"] = (task_id, version)
+    _wait_for_change(task_id)
+
+
+def _watch(task_id: str):
+    """Subscribes to task_id once per session, dropping the previous task's subscription."""
+    watching = st.session_state.get("watching")
+    if watching and watching[0] == task_id:
+        return
+    subscriber = get_task_subscriber()
+    if watching:
+        subscriber.unwatch(watching[0])
+    subscriber.watch(task_id)
+    st.session_state["watching"] = (task_id, time.monotonic())
+
+
+def _unwatch(task_id: str):
+    watching = st.session_state.pop("watching", None)
+    if watching and watching[0] == task_id:
+        get_task_subscriber().unwatch(task_id)
+
+
+@st.fragment(run_every=REFRESH_INTERVAL)
+def _wait_for_change(task_id: str):
+    """Reruns the app once the task's state differs from the rendered one."""
+    watching = st.session_state.get("watching")
+    if not watching or watching[0] != task_id:
+        # A newer search replaced this one; the next app run renders it
+        return
+    if time.monotonic() - watching[1] > MAX_WAIT:
+        _unwatch(task_id)
+        st.session_state["timed_out"] = task_id
+        st.rerun()
+    try:
+        version = get_task_subscriber().latest(task_id)[0]
+    except Exception:
+        # Shown by the next full run, if the subscriber is still failing
+        return
+    if st.session_state.get("rendered_version") != (task_id, version):
+        st.rerun()
+
+
+def _render_progress(task_id: str, state, meta, render_fn):
+    """Renders a running task's latest state."""
+    if state in PROGRESS_STATES:
+        # Offers are known; show them while pricing/hold are still running
+        progress = meta.get("result") or {}
+        offers = progress.get("offers", [])
+        set_search_offers(offers)
+        if state == OFFERS_FOUND:
+            st.info("💲 Offers found. Confirming price...")
+        elif state == PRICE_CONFIRMED:
+            price = (progress.get("priced_offer") or {}).get("price") or {}
+            if price.get("grandTotal"):
+                st.info(f"📌 Price confirmed at {price['grandTotal']} {price.get('currency') or ''}. Placing hold...")
             else:
-                # Task is still pending
-                with st.spinner(f"⏳ Searching for flights... (Task ID: {task_id[:8]}...). Please wait."):
-                    # Rerun the script to check again after a delay
-                    # Note: st.experimental_rerun() will stop execution of current script and rerun from top.
-                    # Consider using time.sleep() and st.empty() for a more controlled refresh,
-                    # or rely on Streamlit's natural reactivity if other widgets can trigger reruns.
-                    # For long-polling, st.experimental_rerun is a common pattern.
-                    time.sleep(POLLING_INTERVAL) # Wait before rerunning
-        except Exception as e:
-            st.error(f"🚨 An error occurred while polling for results: {e}")
-            is_exist = True
+                st.info("📌 Price confirmed. Placing hold...")
+        render_fn(offers, progress.get("table"), task_id)
+    else:
+        # Unknown yet / PENDING / STARTED / RETRY
+        st.info(f"⏳ Searching for flights... (Task ID: {task_id[:8]}...). Please wait.")
+
+
+def render_final_state(state: str, meta: dict, render_fn, task_id: str = None):
+    """Renders a finished task's outcome and results."""
+    if state == "FAILURE":
+        st.error(f"❌ Task failed. Error: {meta.get('traceback')}")
+        return
+    # Task is complete, render the results
+    task_output = meta.get("result") or {}
+    status = task_output.get("status")
+    if status == "hold_failed":
+        st.error(f"❌ Offers found, but the hold failed: {task_output.get('error')}")
+    elif status == "failed":
+        stage = task_output.get("stage", "search")
+        st.error(f"❌ The {stage} step failed: {task_output.get('error')}")
+    elif status == "not_found":
+        st.warning("No flights found for this search.")
+    else:
+        st.success("🎉 Results are ready!")
+    if task_output.get("hold_details"):
+        set_hold_details(task_output["hold_details"])
+    set_search_offers(task_output.get("offers", []))
+    # Pass the actual result data (and the worker's normalized table) to the render function
+    render_fn(task_output.get("offers", []), task_output.get("table"), task_id)
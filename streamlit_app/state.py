@@ -2,6 +2,8 @@
 # Helper functions for managing session state in the Streamlit application.
 # Used to store and retrieve data like task IDs and hold information across reruns.
 
+import uuid
+
 import streamlit as st
 
 def init_session():
@@ -68,3 +70,31 @@ def set_search_offers(offers: list):
 def get_search_offers() -> list | None:
     return st.session_state.get("offers")
 
+
+def set_task_result(task_id: str, state: str, meta: dict):
+    """Keeps a finished task's final state so reruns render it without waiting."""
+    st.session_state["task_result"] = (task_id, state, meta)
+
+def get_task_result(task_id: str):
+    """
+    Returns (state, meta) for task_id if it has finished, otherwise None.
+    """
+    stored = st.session_state.get("task_result")
+    if stored and stored[0] == task_id:
+        return stored[1], stored[2]
+    return None
+
+
+def get_submission_id(search_data: dict) -> str:
+    """
+    Returns the idempotency token for submitting search_data. Submitting the
+    same search again (e.g. a double click) reuses the token, so the worker
+    returns the first hold instead of placing a second order; a changed
+    search gets a new one.
+    """
+    stored = st.session_state.get("submission")
+    if stored and stored[0] == search_data:
+        return stored[1]
+    token = uuid.uuid4().hex
+    st.session_state["submission"] = (search_data, token)
+    return token
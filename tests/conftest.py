@@ -0,0 +1,40 @@
+# tests/conftest.py
+# Settings come from core/secrets.py, so the required ones are set here
+# before any test imports core.config. Redis is replaced by fakeredis.
+
+import os
+
+os.environ.setdefault("AMADEUS_CLIENT_ID", "test-client")
+os.environ.setdefault("AMADEUS_CLIENT_SECRET", "test-secret")
+os.environ.setdefault("AMADEUS_ENVIRONMENT", "test")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+
+import fakeredis
+import pytest
+
+
+@pytest.fixture
+def redis_client():
+    client = fakeredis.FakeRedis()
+    yield client
+    client.flushall()
+
+
+@pytest.fixture
+def app_redis(redis_client, monkeypatch):
+    """Points every module-level Redis user of the worker at redis_client."""
+    from core import redis_client as shared
+    from worker import (
+        auth, autoscale, cache, fare_watch, history, holds, idempotency, offer_store, pricing_cache,
+        ratelimit, singleflight,
+    )
+
+    monkeypatch.setattr(shared, "_client", redis_client)
+    for singleton in (
+        auth.token_provider, autoscale.queue_wait_stats, cache.search_cache, fare_watch.fare_watch,
+        history.search_history, holds.hold_registry, idempotency.hold_idempotency, offer_store.offer_store,
+        pricing_cache.pricing_cache, ratelimit.rate_limiter, singleflight.single_flight,
+    ):
+        if hasattr(singleton, "_redis"):
+            monkeypatch.setattr(singleton, "_redis", redis_client)
+    return redis_client
@@ -0,0 +1,56 @@
+import pytest
+
+from core.airports import AIRPORT, CITY, AirportIndex, build
+from core.models import FlightSearchRequest
+
+AIRPORTS = """iata,name,city,country
+JFK,John F Kennedy International Airport,New York,US
+LGA,La Guardia Airport,New York,US
+LHR,London Heathrow Airport,London,GB
+GRU,Guarulhos International Airport,São Paulo,BR
+KTM,Tribhuvan International Airport,Kathmandu,NP
+"""
+MACS = """City Code,City Name,Country
+NYC,New York,US
+JFK,New York,US
+"""
+
+
+@pytest.fixture
+def index(tmp_path):
+    (tmp_path / "airports.csv").write_text(AIRPORTS, encoding="utf-8")
+    (tmp_path / "macs.csv").write_text(MACS, encoding="utf-8")
+    assert build(str(tmp_path / "airports.csv"), str(tmp_path / "macs.csv"), str(tmp_path / "airports.dat"))[0] == 6
+    return AirportIndex(str(tmp_path / "airports.dat"))
+
+
+def test_lookup(index):
+    assert index.lookup(" jfk").kind == AIRPORT
+    assert index.lookup("NYC").kind == CITY
+    assert index.lookup("GRU").city == "São Paulo"
+    assert index.lookup("XXX") is None and index.lookup("JFKX") is None
+
+
+def test_autocomplete_puts_code_matches_then_city_matches_first(index):
+    assert [a.code for a in index.autocomplete("L")] == ["LGA", "LHR"]
+    # The metropolitan code before its airports
+    assert [a.code for a in index.autocomplete("new y")] == ["NYC", "JFK", "LGA"]
+    assert [a.code for a in index.autocomplete("sao")] == ["GRU"]
+    assert index.autocomplete("  ") == []
+
+
+def test_suggestions_for_typos(index):
+    assert [a.code for a in index.suggest("JKF")] == ["JFK"]
+    assert [a.code for a in index.suggest("KTN")] == ["KTM"]
+    assert [a.code for a in index.suggest("Kathmadu")] == ["KTM"]
+
+
+def test_bundled_index_validates_requests():
+    request = FlightSearchRequest(
+        from_location="jfk", to_location="KTM", departure_date="2026-11-20", num_passengers=1, seat_class="ECONOMY",
+    )
+    assert request.from_location == "JFK"
+    with pytest.raises(ValueError, match="Unknown airport"):
+        FlightSearchRequest(
+            from_location="QQQ", to_location="KTM", departure_date="2026-11-20", num_passengers=1, seat_class="ECONOMY",
+        )
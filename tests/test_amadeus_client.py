@@ -0,0 +1,27 @@
+import pytest
+
+from core import config
+from worker import tasks
+from worker.auth import SharedAccessToken
+
+
+@pytest.fixture
+def fresh_client(monkeypatch):
+    monkeypatch.setattr(tasks, "_amadeus", None)
+    return tasks.get_amadeus
+
+
+@pytest.mark.parametrize("environment, host", [("test", "test.api.amadeus.com"), ("production", "api.amadeus.com")])
+def test_client_uses_the_configured_environment(fresh_client, monkeypatch, environment, host):
+    monkeypatch.setattr(config, "AMADEUS_ENVIRONMENT", environment)
+    monkeypatch.setattr(config, "AMADEUS_BASE_URL", None)
+    client = fresh_client()
+    assert client.hostname == environment
+    assert (client.host, client.port, client.ssl) == (host, 443, True)
+    assert isinstance(client.access_token, SharedAccessToken)
+
+
+def test_client_honours_the_base_url_override(fresh_client, monkeypatch):
+    monkeypatch.setattr(config, "AMADEUS_BASE_URL", "http://127.0.0.1:8080")
+    client = fresh_client()
+    assert (client.host, client.port, client.ssl) == ("127.0.0.1", 8080, False)
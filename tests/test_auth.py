@@ -0,0 +1,63 @@
+import json
+import time
+
+import pytest
+
+from worker import auth
+from worker.auth import LOCK_KEY, TOKEN_KEY, SharedTokenProvider
+from worker.transport import TransportError
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, payload=None):
+        self.status_code = status_code
+        self._payload = payload or {}
+        self.text = json.dumps(self._payload)
+        self.headers = {}
+
+    def json(self):
+        return self._payload
+
+
+@pytest.fixture
+def token_posts(monkeypatch):
+    posts = []
+
+    def post(url, data, timeout):
+        posts.append(data)
+        return FakeResponse(payload={"access_token": f"token-{len(posts)}", "expires_in": 1799})
+
+    monkeypatch.setattr(auth.requests, "post", post)
+    return posts
+
+
+def provider(redis_client, **kwargs):
+    return SharedTokenProvider("id", "secret", "test", redis_client=redis_client, **kwargs)
+
+
+def test_processes_share_one_token(redis_client, token_posts):
+    first, second = provider(redis_client), provider(redis_client)
+    assert first.get_token() == second.get_token() == "token-1"
+    assert len(token_posts) == 1 and token_posts[0]["client_id"] == "id"
+    assert 0 < redis_client.ttl(TOKEN_KEY) <= 1799
+    assert redis_client.get(LOCK_KEY) is None
+
+
+def test_token_is_refreshed_before_it_expires(redis_client, token_posts):
+    redis_client.set(TOKEN_KEY, json.dumps({"access_token": "old", "expires_at": time.time() + 30}))
+    assert provider(redis_client, refresh_margin=60).get_token() == "token-1"
+    assert provider(redis_client, refresh_margin=10).get_token() == "token-1"
+
+
+def test_expiring_token_is_used_while_another_process_refreshes(redis_client, token_posts):
+    redis_client.set(TOKEN_KEY, json.dumps({"access_token": "old", "expires_at": time.time() + 30}))
+    redis_client.set(LOCK_KEY, "other")
+    assert provider(redis_client, refresh_margin=60).get_token() == "old"
+    assert token_posts == []
+
+
+def test_failed_fetch_raises_a_transport_error(redis_client, monkeypatch):
+    monkeypatch.setattr(auth.requests, "post", lambda *args, **kwargs: FakeResponse(401, {"error": "invalid_client"}))
+    with pytest.raises(TransportError):
+        provider(redis_client).get_token()
+    assert redis_client.get(LOCK_KEY) is None
@@ -0,0 +1,62 @@
+from worker import autoscale
+from worker.autoscale import QueueDepthAutoscaler, percentile, priority_class
+
+
+class FakePool:
+    def __init__(self, processes):
+        self.num_processes = processes
+        self.grown = self.shrunk = 0
+
+    def grow(self, n):
+        self.grown += n
+        self.num_processes += n
+
+    def shrink(self, n):
+        self.shrunk += n
+        self.num_processes -= n
+
+
+def make_autoscaler(processes, low=1, high=8):
+    scaler = QueueDepthAutoscaler(FakePool(processes), high, low)
+    scaler._queues = lambda: ["batch"]
+    return scaler
+
+
+def test_priority_class_and_percentile():
+    assert priority_class("batch") == "batch" and priority_class("unknown") == "default"
+    assert percentile([], 95) == 0.0
+    assert percentile(list(range(1, 101)), 95) == 95
+    assert percentile([3, 1, 2], 50) == 2
+
+
+def test_waits_are_filtered_by_window(app_redis, monkeypatch):
+    stats = autoscale.queue_wait_stats
+    monkeypatch.setattr(autoscale.time, "time", lambda: 1000.0)
+    stats.record("batch", 5.0)
+    monkeypatch.setattr(autoscale.time, "time", lambda: 1100.0)
+    stats.record("batch", 1.0)
+    assert sorted(stats.waits("batch")) == [1.0, 5.0]
+    assert stats.waits("batch", window=60) == [1.0]
+    app_redis.rpush("batch", "a", "b", "c")
+    report = stats.report()["batch"]
+    assert (report["depth"], report["samples"], report["wait_max"]) == (3, 2, 5.0)
+
+
+def test_desired_processes():
+    scaler = make_autoscaler(2)
+    per_process = autoscale.config.AUTOSCALE_BACKLOG_PER_PROCESS
+    assert scaler.desired_processes(2, 0, 0.0, 30.0) == 1
+    assert scaler.desired_processes(2, per_process * 5, 0.0, 30.0) == 5
+    # A slow queue adds a process even without backlog
+    assert scaler.desired_processes(2, 0, 31.0, 30.0) == 3
+    assert scaler.desired_processes(8, per_process * 100, 31.0, 30.0) == 8
+
+
+def test_scales_up_from_queue_depth(app_redis):
+    app_redis.rpush("batch", *range(autoscale.config.AUTOSCALE_BACKLOG_PER_PROCESS * 4))
+    scaler = make_autoscaler(1)
+    assert scaler._maybe_scale() is True
+    assert scaler.pool.grown == 3
+    # Checked at most once per AUTOSCALE_INTERVAL
+    app_redis.rpush("batch", *range(100))
+    assert scaler._maybe_scale() is None and scaler.pool.grown == 3
@@ -0,0 +1,140 @@
+import json
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import celery
+import pytest
+from celery import states
+
+from core import config
+from worker.batch import BatchRunner, read_records
+
+DEPARTURE = (date.today() + timedelta(days=30)).isoformat()
+
+
+class Interrupted(Exception):
+    pass
+
+
+class FakeBackend:
+    """Completes every submitted search; can stop the run after some polls."""
+
+    def __init__(self, fail_after=None):
+        self.results = {}
+        self.polls = 0
+        self.fail_after = fail_after
+
+    def get_many(self, ids, interval, max_iterations):
+        self.polls += 1
+        if self.fail_after is not None and self.polls > self.fail_after:
+            raise Interrupted()
+        # Finish one search per poll, newest first, so results complete out of order
+        for task_id in sorted(ids, reverse=True)[:1]:
+            yield task_id, self.results[task_id]
+
+    def forget(self, task_id):
+        self.results.pop(task_id)
+
+
+class FakeTask:
+    def __init__(self, backend):
+        self.app = SimpleNamespace(backend=backend)
+        self.submitted = []
+
+    def s(self, search_data):
+        return SimpleNamespace(search_data=search_data, set=lambda **options: search_data)
+
+
+@pytest.fixture
+def fake_group(monkeypatch):
+    def group(search_datas):
+        search_datas = list(search_datas)
+
+        def apply_async():
+            results = []
+            for search_data in search_datas:
+                task_id = f"{len(fake_group.task.submitted):06d}"
+                fake_group.task.submitted.append(search_data["from_location"])
+                fake_group.task.app.backend.results[task_id] = {
+                    "status": states.SUCCESS, "result": {"status": "searched", "table": {"price": [100.0]}},
+                }
+                results.append(SimpleNamespace(id=task_id))
+            return SimpleNamespace(results=results)
+
+        return SimpleNamespace(apply_async=apply_async)
+
+    monkeypatch.setattr(celery, "group", group)
+    monkeypatch.setattr(config, "BATCH_CHECKPOINT_INTERVAL", 0)
+    return fake_group
+
+
+def write_input(path, origins):
+    lines = []
+    for origin in origins:
+        if origin is None:
+            lines.append("{not json")
+        else:
+            lines.append(json.dumps({
+                "from_location": origin, "to_location": "LHR", "departure_date": DEPARTURE,
+                "num_passengers": 1, "seat_class": "ECONOMY",
+            }))
+        lines.append("")  # blank lines are skipped but keep their line numbers
+    path.write_text("\n".join(lines) + "\n")
+
+
+def read_output(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def run(tmp_path, fake_group, ordered=False, fail_after=None):
+    fake_group.task = FakeTask(FakeBackend(fail_after))
+    runner = BatchRunner(
+        str(tmp_path / "out.jsonl"), ordered=ordered, chunk_size=2, max_in_flight=4,
+        poll_interval=0, task=fake_group.task,
+    )
+    return runner.run(str(tmp_path / "in.jsonl"))
+
+
+def test_read_records_reports_invalid_lines(tmp_path):
+    write_input(tmp_path / "in.jsonl", ["JFK", None])
+    records = list(read_records(str(tmp_path / "in.jsonl")))
+    assert [(line, data is not None, error is not None) for line, _, data, error in records] == [
+        (1, True, False), (3, False, True),
+    ]
+
+
+@pytest.mark.parametrize("ordered", [False, True])
+def test_every_line_is_written_once(tmp_path, fake_group, ordered):
+    write_input(tmp_path / "in.jsonl", ["JFK", "BOS", None, "SFO", "ORD", "MIA"])
+    counts = run(tmp_path, fake_group, ordered)
+    assert counts == {"searched": 5, "invalid": 1}
+    lines = [record["line"] for record in read_output(tmp_path / "out.jsonl")]
+    assert sorted(lines) == [1, 3, 5, 7, 9, 11]
+    if ordered:
+        assert lines == sorted(lines)
+
+
+@pytest.mark.parametrize("ordered", [False, True])
+def test_resume_after_interruption(tmp_path, fake_group, ordered):
+    origins = ["JFK", "BOS", None, "SFO", "ORD", "MIA", "SEA", "DEN"]
+    write_input(tmp_path / "in.jsonl", origins)
+    with pytest.raises(Interrupted):
+        run(tmp_path, fake_group, ordered, fail_after=3)
+    first_run = fake_group.task.submitted
+    assert 0 < len(read_output(tmp_path / "out.jsonl")) < len(origins)
+
+    counts = run(tmp_path, fake_group, ordered)
+    records = read_output(tmp_path / "out.jsonl")
+    assert sorted(record["line"] for record in records) == [1, 3, 5, 7, 9, 11, 13, 15]
+    assert counts == {"searched": 7, "invalid": 1}
+    # Only searches that were not written before the interruption run again
+    assert len(first_run) + len(fake_group.task.submitted) < 2 * 7
+    assert set(fake_group.task.submitted) | set(first_run) == {o for o in origins if o}
+
+
+def test_checkpoint_belongs_to_its_input(tmp_path, fake_group):
+    write_input(tmp_path / "in.jsonl", ["JFK"])
+    run(tmp_path, fake_group)
+    runner = BatchRunner(str(tmp_path / "out.jsonl"), task=FakeTask(FakeBackend()))
+    with pytest.raises(ValueError, match="belongs to a run of"):
+        runner.run(str(tmp_path / "other.jsonl"))
@@ -0,0 +1,57 @@
+from datetime import date, timedelta
+
+from benchmarks.offers import make_offer
+from core import config
+from core.models import FlightSearchRequest
+from worker import cache as cache_module
+from worker.cache import HIT, MISS, STALE, SearchCache
+
+
+def search_request():
+    return FlightSearchRequest(
+        from_location="JFK", to_location="LHR", departure_date=(date.today() + timedelta(days=30)).isoformat(),
+        num_passengers=1, seat_class="ECONOMY",
+    )
+
+
+def test_default_cap_follows_the_page_size():
+    assert config.SEARCH_CACHE_MAX_ENTRY_BYTES >= config.SEARCH_MAX_OFFERS * 8 * 1024
+
+
+def test_large_results_are_cached_up_to_the_cap(redis_client):
+    offers = [make_offer(i) for i in range(250)]
+    cache = SearchCache(max_entry_bytes=2 * 1024 * 1024, redis_client=redis_client)
+    assert cache.set(search_request(), offers)
+    assert cache.get(search_request()) == (offers, HIT)
+
+
+def test_oversized_results_are_counted_and_logged(redis_client, caplog):
+    cache = SearchCache(max_entry_bytes=1024, redis_client=redis_client)
+    assert not cache.set(search_request(), [make_offer(i) for i in range(5)])
+    assert cache.stats()["oversized"] == 1
+    assert "not cached: 5 offers" in caplog.text
+
+
+def test_stale_entries_are_served_with_one_refresh(redis_client, monkeypatch):
+    cache = SearchCache(ttl=60, stale_ttl=600, redis_client=redis_client)
+    assert cache.get(search_request()) == (None, MISS)
+    cache.set(search_request(), [make_offer(0)])
+    real_time = cache_module.time.time
+    monkeypatch.setattr(cache_module.time, "time", lambda: real_time() + 61)
+    assert cache.get(search_request()) == ([make_offer(0)], STALE)
+    assert cache.claim_refresh(search_request())
+    assert not cache.claim_refresh(search_request())
+    assert 60 < redis_client.ttl("search:cache:" + search_request().cache_key()) <= 660
+    stats = cache.stats()
+    assert (stats[MISS], stats[STALE], stats["hit_ratio"]) == (1, 1, 0.5)
+
+
+def test_least_recently_used_entries_are_evicted(redis_client):
+    cache = SearchCache(max_entries=2, redis_client=redis_client)
+    requests = [search_request().model_copy(update={"to_location": code}) for code in ("LHR", "CDG", "KTM")]
+    cache.set(requests[0], [])
+    cache.set(requests[1], [])
+    cache.get(requests[0])
+    cache.set(requests[2], [])
+    assert [cache.get(r)[1] for r in requests] == [HIT, MISS, HIT]
+    assert cache.stats()["evicted"] == 1
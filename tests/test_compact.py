@@ -0,0 +1,42 @@
+import json
+
+from benchmarks.offers import make_offer
+from core.serialization import packb, unpackb
+from worker.compact import REF_KEY, project_offer, project_order
+from worker.offer_store import OfferStore, content_hash
+
+
+def test_projection_is_much_smaller_and_keeps_what_the_ui_shows():
+    offer = make_offer(0)
+    slim = project_offer(offer, "ref")
+    assert len(json.dumps(slim)) < len(json.dumps(offer)) / 2
+    assert slim[REF_KEY] == "ref" and slim["price"] == {
+        "grandTotal": offer["price"]["grandTotal"], "currency": offer["price"]["currency"],
+    }
+    assert [len(i["segments"]) for i in slim["itineraries"]] == [len(i["segments"]) for i in offer["itineraries"]]
+
+
+def test_order_projection():
+    order = {"id": "order-1", "associatedRecords": [{"reference": "ABC123"}], "travelers": [{"id": "1"}]}
+    assert project_order(order, "ref") == {
+        "id": "order-1", REF_KEY: "ref", "associatedRecords": [{"reference": "ABC123"}], "ticketingAgreement": {},
+    }
+
+
+def test_serializer_round_trips_and_compresses():
+    offers = [make_offer(i) for i in range(50)]
+    packed = packb(offers)
+    assert unpackb(packed) == offers
+    assert len(packed) < len(json.dumps(offers)) / 3
+
+
+def test_store_is_content_addressed(redis_client):
+    store = OfferStore(ttl=60, redis_client=redis_client)
+    offer = make_offer(0)
+    reordered = dict(reversed(list(offer.items())))
+    assert content_hash(offer) == content_hash(reordered)
+    refs = store.put_many([offer, reordered, make_offer(1)])
+    assert refs[0] == refs[1] != refs[2]
+    assert len(redis_client.keys("offer:blob:*")) == 2
+    assert store.get(refs[0]) == offer
+    assert store.get("missing") is None
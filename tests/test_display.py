@@ -0,0 +1,19 @@
+from benchmarks.offers import make_offers
+from core import normalize
+from core.normalize import normalize_offers, to_columns
+from streamlit_app import display
+
+
+def test_display_frame_is_built_once_per_task(monkeypatch):
+    offers = make_offers(5)
+    table = to_columns(normalize_offers(offers))
+    calls = []
+    real = normalize.from_columns
+    monkeypatch.setattr(display, "from_columns", lambda columns: calls.append(1) or real(columns))
+
+    first = display._cached_display_frame("task-cache-1", offers, table)
+    second = display._cached_display_frame("task-cache-1", offers, table)
+    assert first.equals(second) and len(first) == 5
+    assert len(calls) == 1
+    display._cached_display_frame("task-cache-2", offers, table)
+    assert len(calls) == 2
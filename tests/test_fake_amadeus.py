@@ -0,0 +1,54 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from benchmarks.fake_amadeus import serve
+from core import config
+from worker.auth import SharedTokenProvider
+
+
+@pytest.fixture
+def fake_server():
+    servers = []
+
+    def start(**kwargs):
+        options = {"latency": 0, "jitter": 0, "error_rate": 0, "rate_limit": 0, **kwargs}
+        server = serve(port=0, **options)
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def get(url):
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return response.status, json.loads(response.read())
+
+
+def test_search_is_deterministic_per_route(fake_server):
+    base = fake_server()
+    query = "/v2/shopping/flight-offers?originLocationCode=JFK&destinationLocationCode=LHR&departureDate=2026-11-20&max=3"
+    status, first = get(base + query)
+    assert status == 200 and first["meta"]["count"] == 3
+    assert get(base + query)[1] == first
+    assert {offer["itineraries"][0]["segments"][0]["departure"]["iataCode"] for offer in first["data"]} == {"JFK"}
+    assert get(base + "/__stats")[1]["calls"] == {"flight_offers_search": 2}
+
+
+def test_rate_limited_endpoints_answer_429_with_retry_after(fake_server):
+    base = fake_server(rate_limit=1)
+    get(base + "/v2/shopping/flight-offers")
+    with pytest.raises(urllib.error.HTTPError) as error:
+        get(base + "/v2/shopping/flight-offers")
+    assert error.value.code == 429 and float(error.value.headers["Retry-After"]) > 0
+
+
+def test_base_url_points_the_token_provider_at_the_fake_server(fake_server, redis_client, monkeypatch):
+    monkeypatch.setattr(config, "AMADEUS_BASE_URL", fake_server())
+    provider = SharedTokenProvider("id", "secret", "test", redis_client=redis_client)
+    assert len(provider.get_token()) == 32
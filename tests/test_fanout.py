@@ -0,0 +1,67 @@
+import copy
+from datetime import date, timedelta
+
+import pytest
+
+from benchmarks.offers import make_offer
+from core import config
+from core.models import FlexibleSearchRequest
+from worker import tasks
+from worker.compact import project_offer
+from worker.fanout import merge_offers, offer_price
+
+DEPARTURE = date.today() + timedelta(days=30)
+
+
+def repriced(offer, price, offer_id):
+    offer = copy.deepcopy(offer)
+    offer["id"] = offer_id
+    offer["price"]["grandTotal"] = f"{price:.2f}"
+    return offer
+
+
+def test_merge_keeps_the_cheapest_copy_of_each_itinerary():
+    a, b = make_offer(0), make_offer(1)
+    merged = merge_offers([[a, repriced(b, 900, "b1")], [repriced(b, 200, "b2")], None])
+    assert {offer["id"] for offer in merged} == {a["id"], "b2"}
+
+
+def test_merge_returns_top_k_cheapest():
+    offers = [make_offer(i) for i in range(10)]
+    merged = merge_offers([offers[:5], offers[5:]], top_k=3)
+    assert [offer_price(offer) for offer in merged] == sorted(map(offer_price, offers))[:3]
+
+
+def test_flexible_request_expands_dates_and_airports():
+    request = FlexibleSearchRequest(
+        from_location="JFK", to_location="LHR", departure_date=DEPARTURE.isoformat(),
+        num_passengers=1, seat_class="ECONOMY", date_window=1, alt_origins=["EWR", "JFK"], alt_destinations=["LGW"],
+    )
+    searches = request.expand()
+    assert len(searches) == 2 * 2 * 3
+    assert {search.departure_date for search in searches} == {
+        (DEPARTURE + timedelta(days=offset)).isoformat() for offset in (-1, 0, 1)
+    }
+
+
+def test_flexible_search_is_capped(monkeypatch):
+    monkeypatch.setattr(config, "FANOUT_MAX_SEARCHES", 2)
+    with pytest.raises(ValueError, match="expands to 3 searches"):
+        tasks.submit_flexible_search({
+            "from_location": "JFK", "to_location": "LHR", "departure_date": DEPARTURE.isoformat(),
+            "num_passengers": 1, "seat_class": "ECONOMY", "date_window": 1,
+        })
+
+
+def test_merge_search_results_ranks_one_page():
+    contexts = [
+        {"status": "searched", "offers": [project_offer(make_offer(i), f"ref-{i}") for i in range(0, 6)]},
+        {"status": "not_found"},
+        {"status": "searched", "offers": [project_offer(make_offer(i), f"ref-{i}") for i in range(4, 9)]},
+    ]
+    result = tasks.merge_search_results.apply(args=(contexts, 5)).get()
+    assert result["status"] == "searched" and result["searches"] == 3
+    assert len(result["offers"]) == len(result["table"]["offer_ref"]) == 5
+    assert len({offer["id"] for offer in result["offers"]}) == 5
+
+    assert tasks.merge_search_results.apply(args=([{"status": "not_found"}], 5)).get() == {"status": "not_found"}
@@ -0,0 +1,73 @@
+import json
+
+from benchmarks.offers import make_offer
+from worker.fare_watch import DUE_KEY, NOTIFY_CHANNEL, FareWatchService, crossed, diff_prices, itinerary_id
+
+SEARCH = {
+    "from_location": "JFK", "to_location": "KTM", "departure_date": "2026-11-20",
+    "num_passengers": 1, "seat_class": "ECONOMY",
+}
+
+
+def priced(index, price):
+    offer = make_offer(index)
+    offer["price"]["grandTotal"] = f"{price:.2f}"
+    return offer
+
+
+def test_thresholds_fire_only_when_crossed():
+    target = {"target_price": 500}
+    assert crossed(target, 600, 499) == "below_target"
+    assert crossed(target, None, 500) == "below_target"
+    assert crossed(target, 480, 450) == ""
+    drop = {"drop_pct": 10, "reference_price": 1000}
+    assert crossed(drop, 1000, 900) == "price_drop"
+    assert crossed(drop, 1000, 901) == ""
+    assert crossed(drop, 1000, None) == ""
+
+
+def test_diff_prices():
+    assert diff_prices({"a": 1, "b": 2, "c": 3}, {"b": 2, "c": 4, "d": 5}) == {
+        "added": {"d": 5}, "removed": ["a"], "changed": {"c": 4},
+    }
+
+
+def test_subscribers_share_one_search_per_interval(redis_client):
+    service = FareWatchService(interval=3600, redis_client=redis_client)
+    key = service.watch(SEARCH, "alice", target_price=500)
+    assert service.watch(SEARCH, "bob", drop_pct=10, interval=1800) == key
+    assert redis_client.zcard(DUE_KEY) == 1
+    due_at = redis_client.zscore(DUE_KEY, key)
+    assert service.claim_due(10, now=due_at - 1) == []
+    assert service.claim_due(10, now=due_at) == [key]
+    # Moved to its next slot of the shorter interval
+    assert redis_client.zscore(DUE_KEY, key) == due_at + 1800
+    assert service.claim_due(10, now=due_at) == []
+
+    service.unwatch(key, "alice")
+    assert redis_client.zcard(DUE_KEY) == 1
+    service.unwatch(key, "bob")
+    assert redis_client.zcard(DUE_KEY) == 0 and service.search_data(key) is None
+
+
+def test_record_diffs_and_notifies(redis_client):
+    service = FareWatchService(redis_client=redis_client)
+    key = service.watch(SEARCH, "alice", target_price=500)
+    service.watch(SEARCH, "bob", drop_pct=10)
+    pubsub = redis_client.pubsub()
+    pubsub.subscribe(NOTIFY_CHANNEL)
+    pubsub.get_message()
+
+    first = service.record(key, [priced(0, 1000), priced(1, 1200)], now=1.0)
+    assert first["min_price"] == 1000 and len(first["added"]) == 2
+    assert pubsub.get_message() is None
+
+    second = service.record(key, [priced(0, 450), priced(1, 1200)], now=2.0)
+    assert second["changed"] == {itinerary_id(priced(0, 450)): 450.0}
+    notified = sorted((m["subscriber"], m["reason"]) for m in (json.loads(pubsub.get_message()["data"]) for _ in range(2)))
+    assert notified == [("alice", "below_target"), ("bob", "price_drop")]
+
+    # Unchanged prices: no diff stored and nobody notified again
+    service.record(key, [priced(0, 450), priced(1, 1200)], now=3.0)
+    assert pubsub.get_message() is None
+    assert [diff["at"] for diff in service.history_of(key)] == [2.0, 1.0]
@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from streamlit_app import form
+from worker.fare_watch import DUE_KEY, SUBS_PREFIX, FareWatchService
+
+
+def search_page():
+    from streamlit_app.form import flight_search_form
+
+    flight_search_form()
+
+
+@pytest.fixture
+def app(redis_client, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(form, "fare_watch", FareWatchService(redis_client=redis_client))
+    monkeypatch.setattr(
+        form, "submit_search_and_hold",
+        lambda data, submission_id: submitted.append((data, submission_id)) or SimpleNamespace(id="task-1"),
+    )
+    app = AppTest.from_function(search_page)
+    app.run(timeout=20)
+    app.text_input(key="from_query").input("JFK")
+    app.text_input(key="to_query").input("LHR")
+    app.run(timeout=20)
+    app.submitted = submitted
+    return app
+
+
+def test_search_can_start_a_fare_watch(app, redis_client):
+    app.checkbox(key="watch_fare").check()
+    app.text_input(key="watch_subscriber").input("ana@example.com")
+    app.button[0].click()
+    app.run(timeout=20)
+
+    assert len(app.submitted) == 1
+    assert any("Watching this fare for ana@example.com" in message.value for message in app.success)
+    (key,) = [key.decode() for key in redis_client.zrange(DUE_KEY, 0, -1)]
+    assert redis_client.hexists(SUBS_PREFIX + key, "ana@example.com")
+
+
+def test_fare_watch_needs_a_subscriber(app, redis_client):
+    app.checkbox(key="watch_fare").check()
+    app.button[0].click()
+    app.run(timeout=20)
+
+    assert app.submitted == []
+    assert redis_client.zcard(DUE_KEY) == 0
+
+
+def test_search_without_a_watch(app, redis_client):
+    app.button[0].click()
+    app.run(timeout=20)
+
+    assert len(app.submitted) == 1
+    assert redis_client.zcard(DUE_KEY) == 0
+
+
+def test_resubmitting_the_same_search_reuses_its_token(app):
+    app.button[0].click()
+    app.run(timeout=20)
+    app.button[0].click()
+    app.run(timeout=20)
+    app.text_input(key="to_query").input("CDG")
+    app.run(timeout=20)
+    app.button[0].click()
+    app.run(timeout=20)
+
+    tokens = [submission_id for _, submission_id in app.submitted]
+    assert len(tokens) == 3 and tokens[0] == tokens[1] != tokens[2]
@@ -0,0 +1,124 @@
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+from worker.history import (
+    BUFFER_KEY, COMPACT_LOCK_PREFIX, FLUSH_LOCK_KEY, OFFER_FIELDS, OFFERS, OUTCOMES, PROCESSING_KEY,
+    SearchHistory,
+)
+
+SEARCH = {
+    "request_key": "k1", "origin": "JFK", "destination": "LHR",
+    "departure_date": "2026-12-01", "seat_class": "ECONOMY", "passengers": 1,
+}
+TABLE = {
+    **{name: [None, None] for name in OFFER_FIELDS},
+    "offer_id": ["1", "2"], "price": [412.3, 530.0], "currency": ["EUR", "EUR"], "stops": [0, 1],
+}
+
+
+def today() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+@pytest.fixture
+def history(redis_client, tmp_path):
+    return SearchHistory(directory=str(tmp_path), redis_client=redis_client)
+
+
+def parquet_files(history, kind):
+    directory = os.path.join(history.directory, kind, f"day={today()}")
+    return sorted(name for name in os.listdir(directory) if name.endswith(".parquet"))
+
+
+def test_flush_writes_queryable_partitions(history, redis_client):
+    history.record_search(SEARCH, TABLE)
+    history.record_outcome(SEARCH, "held", offers_found=2, held_price=412.3, order_id="order-1")
+    assert history.flush() == 2
+    assert redis_client.llen(BUFFER_KEY) == redis_client.llen(PROCESSING_KEY) == 0
+
+    offers = history.query(OFFERS, columns=["offer_id", "price", "origin"], start_day=today())
+    assert sorted(offers["offer_id"]) == ["1", "2"] and set(offers["origin"]) == {"JFK"}
+    outcomes = history.query(OUTCOMES, columns=["status", "order_id", "best_price"])
+    assert outcomes.to_dict("records")[0]["order_id"] == "order-1"
+
+
+def test_failed_write_keeps_the_records(history, redis_client, monkeypatch):
+    history.record_search(SEARCH, TABLE)
+    history.record_outcome(SEARCH, "held", offers_found=2)
+    write = history._write
+
+    def fail_on_outcomes(kind, df, name):
+        if kind == OUTCOMES:
+            raise OSError("disk full")
+        write(kind, df, name)
+
+    monkeypatch.setattr(history, "_write", fail_on_outcomes)
+    with pytest.raises(OSError):
+        history.flush()
+    assert redis_client.llen(PROCESSING_KEY) == 2
+
+    # Records pushed meanwhile wait for the next batch
+    history.record_outcome(SEARCH, "not_found")
+    monkeypatch.setattr(history, "_write", write)
+    assert history.flush() == 2
+    assert history.flush() == 1
+    # The retried batch replaced its offers file rather than adding a copy
+    assert len(history.query(OFFERS)) == 2
+    assert sorted(history.query(OUTCOMES)["status"]) == ["held", "not_found"]
+
+
+def test_malformed_records_are_dropped(history):
+    history.record_search(SEARCH, {"offer_id": ["1", "2"], "price": [412.3]})
+    history.record_outcome(SEARCH, "held")
+    assert history.flush() == 2
+    assert list(history.query(OUTCOMES)["status"]) == ["held"]
+
+
+def test_flush_skips_while_another_flush_runs(history, redis_client):
+    history.record_outcome(SEARCH, "held")
+    redis_client.set(FLUSH_LOCK_KEY, "other-worker", ex=60)
+    assert history.flush() == 0
+    assert redis_client.llen(BUFFER_KEY) == 1
+
+
+def test_compact_merges_a_partition(history):
+    for status in ("held", "not_found", "hold_failed"):
+        history.record_outcome(SEARCH, status)
+        history.flush()
+    assert len(parquet_files(history, OUTCOMES)) == 3
+
+    assert history.compact(OUTCOMES, today(), min_files=4) == 0
+    assert history.compact(OUTCOMES, today(), min_files=2) == 3
+    assert len(parquet_files(history, OUTCOMES)) == 1
+    assert sorted(history.query(OUTCOMES)["status"]) == ["held", "hold_failed", "not_found"]
+
+
+def test_compact_merges_files_written_before_a_column_was_added(history):
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    history.record_outcome(SEARCH, "held")
+    history.record_outcome(SEARCH, "failed", stage="pricing")
+    history.flush()
+    (name,) = parquet_files(history, OUTCOMES)
+    path = os.path.join(history.directory, OUTCOMES, f"day={today()}", name)
+    table = pq.read_table(path)
+    held = table.filter(pc.equal(table["status"], "held")).drop_columns(["stage"])
+    pq.write_table(table.filter(pc.equal(table["status"], "failed")), path)
+    pq.write_table(held, path.replace(".parquet", "-old.parquet"))
+
+    assert history.compact(OUTCOMES, today(), min_files=2) == 2
+    rows = history.query(OUTCOMES, columns=["status", "stage"]).sort_values("status")
+    assert rows["status"].tolist() == ["failed", "held"]
+    assert rows["stage"].iloc[0] == "pricing" and rows["stage"].isna().iloc[1]
+
+
+def test_compact_skips_a_partition_being_compacted(history, redis_client):
+    for status in ("held", "not_found"):
+        history.record_outcome(SEARCH, status)
+        history.flush()
+    redis_client.set(f"{COMPACT_LOCK_PREFIX}{OUTCOMES}:{today()}", "other-worker", ex=60)
+    assert history.compact(OUTCOMES, today(), min_files=2) == 0
+    assert len(parquet_files(history, OUTCOMES)) == 2
@@ -0,0 +1,106 @@
+import json
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from worker.holds import (
+    CANCELLED, EVENTS_CHANNEL, EXPIRED, EXPIRY_KEY, NEAR_EXPIRY, ON_HOLD, REFRESH_KEY, TICKETED,
+    HoldRegistry, hold_expiry, order_state,
+)
+
+# Record keys expire a day after the hold, on the Redis clock
+CREATED = float(int(time.time()))
+DAY = 86400
+
+
+def iso(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def flight_order(order_id="order-1", delay="6D", **extra):
+    return {
+        "id": order_id,
+        "associatedRecords": [{"reference": "ABC123", "creationDate": iso(CREATED)}],
+        "ticketingAgreement": {"option": "DELAY_TO_CANCEL", "delay": delay},
+        **extra,
+    }
+
+
+@pytest.fixture
+def registry(redis_client):
+    return HoldRegistry(warnings=[DAY], redis_client=redis_client)
+
+
+@pytest.fixture
+def events(redis_client):
+    pubsub = redis_client.pubsub()
+    pubsub.subscribe(EVENTS_CHANNEL)
+    pubsub.get_message(timeout=1)
+
+    def received():
+        messages = []
+        while (message := pubsub.get_message(timeout=0.1)) is not None:
+            messages.append(json.loads(message["data"]))
+        return messages
+
+    return received
+
+
+def test_expiry_comes_from_the_order():
+    assert hold_expiry(flight_order(), created_at=0) == CREATED + 6 * DAY
+    deadline = {"option": "DELAY_TO_CANCEL", "dateTime": iso(CREATED + 2 * DAY)}
+    assert hold_expiry(flight_order(ticketingAgreement=deadline), created_at=0) == CREATED + 2 * DAY
+
+
+def test_order_state():
+    expires_at = CREATED + 6 * DAY
+    assert order_state(flight_order(), expires_at, CREATED) == ON_HOLD
+    assert order_state(flight_order(tickets=[{"documentNumber": "1"}]), expires_at, CREATED) == TICKETED
+    assert order_state(flight_order(status="CANCELLED"), expires_at, CREATED) == CANCELLED
+    assert order_state(flight_order(), expires_at, expires_at) == EXPIRED
+
+
+def test_registering_again_keeps_the_original_expiry(registry, redis_client):
+    assert registry.register(flight_order(), now=CREATED + 60) == CREATED + 6 * DAY
+    # A retried submission returns the same order days later
+    assert registry.register(flight_order(), now=CREATED + 3 * DAY) == CREATED + 6 * DAY
+    assert redis_client.zscore(EXPIRY_KEY, "order-1") == CREATED + 6 * DAY
+    assert registry.get("order-1")["created_at"] == CREATED
+
+
+def test_orders_not_on_hold_are_not_registered(registry, redis_client):
+    assert registry.register(flight_order(tickets=[{"documentNumber": "1"}]), now=CREATED) is None
+    assert registry.register(flight_order(), now=CREATED + 7 * DAY) is None
+    assert redis_client.zcard(EXPIRY_KEY) == 0
+
+
+def test_status_check_updates_the_expiry_from_the_order(registry, redis_client):
+    registry.register(flight_order(), now=CREATED)
+    extended = flight_order(ticketingAgreement={"option": "DELAY_TO_CANCEL", "delay": "8D"})
+    assert registry.record_status("order-1", extended, now=CREATED + DAY) == ON_HOLD
+    record = registry.get("order-1")
+    assert record["status"] == ON_HOLD and record["checked_at"] == CREATED + DAY
+    assert redis_client.zscore(EXPIRY_KEY, "order-1") == CREATED + 8 * DAY
+
+
+@pytest.mark.parametrize("order, state", [
+    (flight_order(tickets=[{"documentNumber": "1"}]), TICKETED),
+    (flight_order(status="CANCELLED"), CANCELLED),
+    (None, CANCELLED),
+])
+def test_orders_no_longer_on_hold_stop_being_tracked(registry, redis_client, events, order, state):
+    registry.register(flight_order(), now=CREATED)
+    assert registry.record_status("order-1", order, now=CREATED + DAY) == state
+    assert registry.get("order-1") is None
+    assert redis_client.zcard(EXPIRY_KEY) == redis_client.zcard(REFRESH_KEY) == 0
+    assert [(event["event"], event["id"]) for event in events()] == [(state, "order-1")]
+
+
+def test_expiry_events(registry, events):
+    registry.register(flight_order(), now=CREATED)
+    assert registry.fire_expiry_events(now=CREATED + 5 * DAY + 60) == 1
+    assert registry.fire_expiry_events(now=CREATED + 5 * DAY + 120) == 0
+    assert registry.fire_expiry_events(now=CREATED + 6 * DAY) == 1
+    assert [event["event"] for event in events()] == [NEAR_EXPIRY, EXPIRED]
+    assert registry.get("order-1") is None
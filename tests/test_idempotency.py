@@ -0,0 +1,76 @@
+import itertools
+
+import pytest
+
+from benchmarks.offers import make_offer
+from worker import tasks
+from core.serialization import packb
+from worker.idempotency import KEY_PREFIX, PENDING, HoldIdempotency, HoldInProgressError, hold_key
+
+
+def order_body(offer=None):
+    return tasks.build_flight_order(offer or make_offer(0))
+
+
+def test_hold_key_is_per_submission():
+    body = order_body()
+    assert hold_key(body, "task-1") == hold_key(body, "task-1")
+    assert hold_key(body, "task-1") != hold_key(body, "task-2")
+    assert hold_key(body, "task-1") != hold_key(order_body(make_offer(1)), "task-1")
+
+
+def test_hold_key_requires_a_submission_id():
+    with pytest.raises(ValueError):
+        hold_key(order_body(), "")
+
+
+def test_repeat_returns_the_recorded_order(redis_client):
+    idempotency = HoldIdempotency(redis_client=redis_client)
+    calls = []
+    create = lambda: calls.append(1) or {"id": f"order-{len(calls)}"}
+
+    assert idempotency.do("k", create) == ({"id": "order-1"}, False)
+    assert idempotency.do("k", create) == ({"id": "order-1"}, True)
+    assert len(calls) == 1
+    assert idempotency.stats()["suppressed"] == 1
+
+
+def test_failed_creation_releases_the_claim(redis_client):
+    idempotency = HoldIdempotency(redis_client=redis_client)
+
+    def fail():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        idempotency.do("k", fail)
+    assert idempotency.do("k", lambda: {"id": "order-1"}) == ({"id": "order-1"}, False)
+    assert idempotency.stats()["released"] == 1
+
+
+def test_gives_up_on_a_claim_that_stays_pending(redis_client):
+    # Another worker's claim, still pending when this worker's wait runs out
+    redis_client.set(KEY_PREFIX + "k", packb({"state": PENDING, "owner": "other", "at": 0}), ex=60)
+    idempotency = HoldIdempotency(claim_timeout=1, redis_client=redis_client)
+    with pytest.raises(HoldInProgressError):
+        idempotency.do("k", lambda: {"id": "never"})
+    assert idempotency.stats()["waited"] == 1
+
+
+def test_takes_over_an_expired_claim(redis_client):
+    redis_client.set(KEY_PREFIX + "k", packb({"state": PENDING, "owner": "dead", "at": 0}), ex=1)
+    idempotency = HoldIdempotency(claim_timeout=5, redis_client=redis_client)
+    assert idempotency.do("k", lambda: {"id": "order-1"}) == ({"id": "order-1"}, False)
+
+
+def test_separate_submissions_create_separate_holds(redis_client, monkeypatch):
+    monkeypatch.setattr(tasks.hold_idempotency, "_redis", redis_client)
+    order_ids = itertools.count(1)
+    monkeypatch.setattr(tasks, "call_amadeus", lambda endpoint, sync_call, async_call: {"id": f"order-{next(order_ids)}"})
+    offer = make_offer(0)
+
+    first = tasks.hold_flight_offer(offer, "submission-a")
+    retry = tasks.hold_flight_offer(offer, "submission-a")
+    second = tasks.hold_flight_offer(offer, "submission-b")
+
+    assert first["id"] == retry["id"] == "order-1"
+    assert second["id"] == "order-2"
@@ -0,0 +1,30 @@
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from worker.metrics import _stamp_publish_time, queue_wait
+
+NOW = 1_800_000_000.0
+
+
+def request(enqueued_at=None, eta=None):
+    return SimpleNamespace(enqueued_at=None, headers={"enqueued_at": enqueued_at}, eta=eta)
+
+
+def test_queue_wait_counts_from_publishing():
+    assert queue_wait(request(NOW - 3), NOW) == 3
+    assert queue_wait(request(), NOW) is None
+
+
+def test_queue_wait_excludes_the_retry_countdown():
+    eta = datetime.fromtimestamp(NOW - 2, timezone.utc)
+    assert queue_wait(request(NOW - 60, eta.isoformat()), NOW) == 2
+    assert queue_wait(request(NOW - 60, eta), NOW) == 2
+    # A worker may pick up a task a little before its eta
+    assert queue_wait(request(NOW - 60, datetime.fromtimestamp(NOW + 1, timezone.utc).isoformat()), NOW) == 0
+
+
+def test_republishing_restamps_the_headers():
+    headers = {"enqueued_at": time.time() - 600}
+    _stamp_publish_time(headers=headers)
+    assert time.time() - headers["enqueued_at"] < 1
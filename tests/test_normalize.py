@@ -0,0 +1,55 @@
+from core.normalize import COLUMNS, DISPLAY_COLUMNS, from_columns, normalize_offers, to_columns, to_display
+
+
+def offer(offer_id="1", duration="P1DT2H5M", bags=None, price="123.40"):
+    return {
+        "id": offer_id,
+        "itineraries": [{"duration": duration, "segments": [
+            {"departure": {"iataCode": "JFK", "at": "2026-11-20T08:00:00"}, "arrival": {"iataCode": "DOH", "at": "2026-11-20T20:00:00"}},
+            {"departure": {"iataCode": "DOH", "at": "2026-11-21T01:00:00"}, "arrival": {"iataCode": "KTM", "at": "2026-11-21T10:05:00"}},
+        ]}],
+        "price": {"grandTotal": price, "currency": "USD"},
+        "validatingAirlineCodes": ["QR"],
+        "travelerPricings": [{"fareDetailsBySegment": [{"cabin": "PREMIUM_ECONOMY", "includedCheckedBags": bags}]}],
+    }
+
+
+def test_offers_are_flattened_and_typed():
+    df = normalize_offers([offer(bags={"quantity": 2}), offer("2", duration="PT45M", bags={}, price=None)])
+    assert list(df.columns) == COLUMNS
+    assert df["route"].tolist() == ["JFK → DOH → KTM"] * 2
+    assert df["duration_minutes"].tolist() == [26 * 60 + 5, 45]
+    assert df["stops"].tolist() == [1, 1]
+    # An empty includedCheckedBags means no checked bags, a missing one is unknown
+    assert df["bags_quantity"].tolist() == [2, 0]
+    assert df.loc[0, "price"] == 123.4 and df["price"].isna().tolist() == [False, True]
+
+
+def test_offers_without_segments_are_skipped():
+    broken = offer("2")
+    broken["itineraries"] = [{"segments": []}]
+    df = normalize_offers([offer(), broken, "not an offer"])
+    assert df["offer_id"].tolist() == ["1"]
+
+
+def test_unparseable_duration_is_missing():
+    df = normalize_offers([offer(duration="soon")])
+    assert df["duration_minutes"].isna().all()
+
+
+def test_columns_round_trip():
+    df = normalize_offers([offer(bags={"weight": 23, "weightUnit": "KG"}), offer("2")])
+    columns = to_columns(df)
+    assert columns["departure_at"] == ["2026-11-20T08:00:00"] * 2
+    assert columns["bags_quantity"] == [None, None]
+    assert from_columns(columns).equals(df)
+
+
+def test_display_formatting():
+    df = normalize_offers([offer(bags={"weight": 23, "weightUnit": "KG"}), offer("2", duration="x", price=None)])
+    display = to_display(df)
+    assert list(display.columns) == DISPLAY_COLUMNS
+    assert display.loc[0, ["Departure", "Duration", "Cabin", "Checked Bags", "Price"]].tolist() == [
+        "2026-11-20 08:00", "26H 5M", "Premium Economy", "23 KG", "123.40 USD",
+    ]
+    assert display.loc[1, ["Duration", "Checked Bags", "Price"]].tolist() == ["N/A", "N/A", "N/A"]
@@ -0,0 +1,94 @@
+from datetime import date, timedelta
+
+import pytest
+
+from benchmarks.offers import make_offer
+from celery_worker import celery
+from core.serialization import unpackb
+from worker import tasks
+from worker.history import BUFFER_KEY
+from worker.holds import EXPIRY_KEY
+from worker.progress import OFFERS_FOUND, PRICE_CONFIRMED
+
+SEARCH = {
+    "from_location": "JFK", "to_location": "LHR",
+    "departure_date": (date.today() + timedelta(days=30)).isoformat(), "num_passengers": 1, "seat_class": "ECONOMY",
+}
+
+
+@pytest.fixture
+def amadeus(app_redis, monkeypatch):
+    """Eager Celery with a fake Amadeus; records calls and published states."""
+    calls, published = [], []
+    offers = [make_offer(i) for i in range(5)]
+
+    def call_amadeus(endpoint, sync_call, async_call):
+        calls.append(endpoint)
+        if endpoint == "flight_offers_search":
+            return offers
+        if endpoint == "pricing":
+            return {"flightOffers": [offers[0]]}
+        return {"id": "order-1", "associatedRecords": [{"reference": "ABC123"}],
+                "ticketingAgreement": {"option": "DELAY_TO_CANCEL", "delay": "6D"}}
+
+    monkeypatch.setattr(tasks, "call_amadeus", call_amadeus)
+    monkeypatch.setattr(celery.conf, "task_always_eager", True)
+    monkeypatch.setattr(celery.backend, "store_result", lambda task_id, meta, state, **kwargs: published.append(state))
+    return calls, published
+
+
+def test_search_price_hold_chain(amadeus, app_redis):
+    calls, published = amadeus
+    result = tasks.submit_search_and_hold(SEARCH).get()
+
+    assert result["status"] == "held"
+    assert result["hold_details"]["id"] == "order-1"
+    assert len(result["offers"]) == len(result["table"]["offer_ref"]) == 5
+    assert calls == ["flight_offers_search", "pricing", "flight_orders"]
+    # The hold stage re-publishes PRICE_CONFIRMED over its own STARTED state
+    progress = [state for state in published if state in (OFFERS_FOUND, PRICE_CONFIRMED)]
+    assert progress[0] == OFFERS_FOUND and set(progress[1:]) == {PRICE_CONFIRMED}
+    assert app_redis.zscore(EXPIRY_KEY, "order-1") is not None
+
+
+def test_double_submit_places_one_order(amadeus):
+    calls, _ = amadeus
+    first = tasks.submit_search_and_hold(SEARCH, submission_id="form-token").get()
+    second = tasks.submit_search_and_hold(SEARCH, submission_id="form-token").get()
+    assert first["hold_details"]["id"] == second["hold_details"]["id"] == "order-1"
+    assert calls.count("flight_orders") == 1
+    tasks.submit_search_and_hold(SEARCH, submission_id="another-token").get()
+    assert calls.count("flight_orders") == 2
+
+
+def test_failed_searches_are_recorded_in_the_history(amadeus, app_redis, monkeypatch):
+    def unavailable(endpoint, sync_call, async_call):
+        raise KeyError("data")
+
+    monkeypatch.setattr(tasks, "call_amadeus", unavailable)
+    result = tasks.submit_search_and_hold(SEARCH).get()
+    assert result["status"] == "failed" and result["stage"] == "search"
+    outcomes = [unpackb(raw) for raw in app_redis.lrange(BUFFER_KEY, 0, -1)]
+    assert [(o["row"]["status"], o["row"]["stage"], o["search"]["origin"]) for o in outcomes] == [
+        ("failed", "search", "JFK"),
+    ]
+
+
+def test_repeated_search_is_served_from_the_cache(amadeus):
+    calls, _ = amadeus
+    tasks.search_offers.apply(args=(SEARCH,)).get()
+    context = tasks.search_offers.apply(args=(SEARCH,)).get()
+    assert context["status"] == "searched"
+    assert calls == ["flight_offers_search"]
+
+
+def test_stages_pass_through_a_finished_context():
+    for stage in (tasks.price_stage, lambda context: tasks.hold_stage(context, "submission")):
+        assert stage({"status": "not_found"}) == {"status": "not_found"}
+
+
+def test_batch_priority_runs_every_stage_on_the_batch_queue():
+    assert tasks._queue_options("interactive") == {}
+    assert tasks._queue_options("batch") == {"queue": "batch"}
+    with pytest.raises(ValueError):
+        tasks._queue_options("urgent")
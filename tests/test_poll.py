@@ -0,0 +1,91 @@
+import time
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from streamlit_app import poll
+from worker.progress import OFFERS_FOUND, PRICE_CONFIRMED
+
+
+class FakeSubscriber:
+    def __init__(self):
+        self.states = {}
+        self.watchers = {}
+
+    def watch(self, task_id):
+        self.watchers[task_id] = self.watchers.get(task_id, 0) + 1
+
+    def unwatch(self, task_id):
+        self.watchers[task_id] -= 1
+
+    def latest(self, task_id):
+        return self.states.get(task_id, (-1, None, None))
+
+
+def results_page():
+    import streamlit as st
+
+    from streamlit_app.poll import poll_results
+
+    st.session_state.setdefault("task_id", "task-1")
+    poll_results(lambda offers, table, task_id: st.write(f"{len(offers)} offers"))
+
+
+@pytest.fixture
+def subscriber(monkeypatch):
+    subscriber = FakeSubscriber()
+    monkeypatch.setattr(poll, "get_task_subscriber", lambda: subscriber)
+    return subscriber
+
+
+def test_renders_the_current_state_and_returns(subscriber):
+    app = AppTest.from_function(results_page)
+    started = time.monotonic()
+    app.run(timeout=5)
+    assert time.monotonic() - started < 5
+    assert "Searching for flights" in app.info[0].value
+    assert subscriber.watchers == {"task-1": 1}
+
+    subscriber.states["task-1"] = (0, OFFERS_FOUND, {"result": {"offers": [{"id": "1"}, {"id": "2"}]}})
+    app.run(timeout=5)
+    assert "Confirming price" in app.info[0].value
+    assert app.markdown[0].value == "2 offers"
+    assert subscriber.watchers == {"task-1": 1}
+
+    priced = {"offers": [{"id": "1"}], "priced_offer": {"price": {"grandTotal": "412.30", "currency": "EUR"}}}
+    subscriber.states["task-1"] = (1, PRICE_CONFIRMED, {"result": priced})
+    app.run(timeout=5)
+    assert "Price confirmed at 412.30 EUR" in app.info[0].value
+
+
+def test_finished_task_is_rendered_and_unwatched(subscriber):
+    subscriber.states["task-1"] = (1, "SUCCESS", {"result": {"status": "held", "offers": [{"id": "1"}]}})
+    app = AppTest.from_function(results_page)
+    app.run(timeout=5)
+    assert app.success[0].value.endswith("Results are ready!")
+    assert app.markdown[0].value == "1 offers"
+    assert subscriber.watchers == {"task-1": 0}
+    assert app.session_state["task_result"][1] == "SUCCESS"
+
+
+def test_failed_stage_is_reported(subscriber):
+    result = {"status": "failed", "stage": "pricing", "error": "KeyError: 'price'", "offers": []}
+    subscriber.states["task-1"] = (1, "SUCCESS", {"result": result})
+    app = AppTest.from_function(results_page)
+    app.run(timeout=5)
+    assert app.error[0].value.startswith("The pricing step failed")
+
+
+def test_ticks_rerun_only_when_the_task_changed(subscriber, monkeypatch):
+    reruns = []
+    session = {"watching": ("task-1", time.monotonic()), "rendered_version": ("task-1", 0)}
+    monkeypatch.setattr(poll.st, "session_state", session)
+    monkeypatch.setattr(poll.st, "rerun", lambda: reruns.append(1))
+    subscriber.states["task-1"] = (0, OFFERS_FOUND, {"result": {"offers": [{"id": "1"}]}})
+
+    # One timer tick of the fragment
+    poll._wait_for_change.__wrapped__("task-1")
+    assert reruns == []
+    subscriber.states["task-1"] = (1, PRICE_CONFIRMED, {"result": {"offers": [{"id": "1"}]}})
+    poll._wait_for_change.__wrapped__("task-1")
+    assert reruns == [1]
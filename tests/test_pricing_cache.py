@@ -0,0 +1,43 @@
+import copy
+
+from benchmarks.offers import make_offer
+from worker.pricing_cache import PricingCache, fare_key
+
+
+def test_fare_key_ignores_volatile_fields_but_not_the_fare():
+    offer = make_offer(0)
+    other = copy.deepcopy(offer)
+    other["numberOfBookableSeats"] += 1
+    assert fare_key(other) == fare_key(offer)
+    other["price"]["grandTotal"] = "1.00"
+    assert fare_key(other) != fare_key(offer)
+    other = copy.deepcopy(offer)
+    other["travelerPricings"][0]["fareDetailsBySegment"][0]["class"] = "Y"
+    assert fare_key(other) != fare_key(offer)
+
+
+def test_priced_offer_is_reused_until_the_offer_changes(redis_client):
+    cache = PricingCache(ttl=60, redis_client=redis_client)
+    calls = []
+
+    def price(offer):
+        calls.append(offer["id"])
+        return {"priced": offer["id"]}
+
+    offer = make_offer(0)
+    assert cache.get_or_price(offer, price) == {"priced": "1"}
+    assert cache.get_or_price(copy.deepcopy(offer), price) == {"priced": "1"}
+    assert cache.get_or_price(make_offer(1), price) == {"priced": "2"}
+    assert calls == ["1", "2"]
+    stats = cache.stats()
+    assert (stats["hit"], stats["miss"]) == (1, 2)
+    assert stats["saved_seconds"] > 0
+    assert 0 < redis_client.ttl(redis_client.keys("pricing:cache:[0-9a-f]*")[0]) <= 60
+
+
+def test_zero_ttl_disables_the_cache(redis_client):
+    cache = PricingCache(ttl=0, redis_client=redis_client)
+    calls = []
+    for _ in range(2):
+        cache.get_or_price(make_offer(0), lambda offer: calls.append(1) or {})
+    assert len(calls) == 2 and not redis_client.keys()
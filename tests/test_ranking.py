@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.offers import make_offer
+from core.normalize import normalize_offers
+from core.ranking import CRITERIA, rank_offers, register_criterion, score_offers
+from worker.compact import REF_KEY, project_offer
+from worker.tasks import rank_page
+
+
+def table(**columns):
+    rows = len(next(iter(columns.values())))
+    defaults = {
+        "price": [500.0] * rows, "duration_minutes": [600] * rows, "stops": [1] * rows,
+        "airlines": ["XX"] * rows, "bags_quantity": [1] * rows, "bags_weight": [np.nan] * rows,
+    }
+    return pd.DataFrame({**defaults, **columns})
+
+
+def test_cheapest_wins_on_price_alone():
+    df = table(price=[700.0, 300.0, 500.0])
+    assert list(rank_offers(df, weights={"price": 1.0})["price"]) == [300.0, 500.0, 700.0]
+
+
+def test_weights_trade_price_against_duration():
+    df = table(price=[400.0, 420.0], duration_minutes=[1500, 500])
+    assert rank_offers(df, weights={"price": 1.0})["price"][0] == 400.0
+    assert rank_offers(df, weights={"price": 1.0, "duration": 2.0})["price"][0] == 420.0
+
+
+def test_carrier_preferences():
+    df = table(airlines=["AA", "LH", "BA"])
+    ranked = rank_offers(df, weights={"carrier": 1.0}, options={"preferred_carriers": ["LH"], "avoided_carriers": ["AA"]})
+    assert list(ranked["airlines"]) == ["LH", "BA", "AA"]
+
+
+@pytest.mark.parametrize("prices, scores", [([np.nan, 450.0], [0.0, 1.0]), ([np.nan, 450.0, 900.0], [0.0, 1.0, 0.0])])
+def test_missing_values_score_worst(prices, scores):
+    assert list(score_offers(table(price=prices), weights={"price": 1.0})) == scores
+
+
+def test_ties_go_to_the_cheaper_offer_then_input_order():
+    df = table(price=[500.0, 400.0, 400.0], offer_id=["a", "b", "c"])
+    ranked = rank_offers(df, weights={"stops": 1.0})
+    assert list(ranked["offer_id"]) == ["b", "c", "a"]
+    assert list(ranked["score"]) == [1.0, 1.0, 1.0]
+
+
+def test_custom_criterion(monkeypatch):
+    monkeypatch.setitem(CRITERIA, "red_eye", None)
+    register_criterion("red_eye")(lambda df, options: np.array([1.0, 0.0]))
+    ranked = rank_offers(table(offer_id=["late", "early"]), weights={"red_eye": 1.0})
+    assert list(ranked["offer_id"]) == ["early", "late"]
+
+
+@pytest.mark.parametrize("limit", [1, 10])
+def test_rank_page_keeps_offers_and_table_aligned(limit):
+    slim = [project_offer(make_offer(i), f"ref-{i}") for i in range(25)]
+    offers, page = rank_page(slim, limit)
+    assert len(offers) == len(page["offer_ref"]) == len(page["score"]) == limit
+    assert [offer[REF_KEY] for offer in offers] == page["offer_ref"]
+    assert page["score"] == sorted(page["score"], reverse=True)
+    assert normalize_offers(slim)["price"].count() == 25
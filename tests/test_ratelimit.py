@@ -0,0 +1,37 @@
+import time
+
+import pytest
+
+from worker.ratelimit import RateLimitExceeded, TokenBucketLimiter
+
+
+def test_burst_then_queued_at_the_rate(redis_client):
+    limiter = TokenBucketLimiter(limits={"search": (10, 2)}, max_wait=5, redis_client=redis_client)
+    started = time.monotonic()
+    waits = [limiter.acquire("search") for _ in range(4)]
+    assert waits[:2] == [0.0, 0.0]
+    assert 0.05 < waits[2] <= 0.1 and 0.05 < waits[3] <= 0.1
+    assert time.monotonic() - started >= 0.15
+    assert limiter.stats()["search"]["waited"] == 2
+
+
+def test_rejects_when_the_queue_is_longer_than_max_wait(redis_client):
+    limiter = TokenBucketLimiter(limits={"orders": (1, 1)}, max_wait=0.5, redis_client=redis_client)
+    limiter.acquire("orders")
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire("orders")
+    assert limiter.stats()["orders"]["rejected"] == 1
+
+
+def test_buckets_are_shared_across_limiters(redis_client):
+    first, second = (
+        TokenBucketLimiter(limits={"pricing": (1, 1)}, max_wait=0.5, redis_client=redis_client) for _ in range(2)
+    )
+    first.acquire("pricing")
+    with pytest.raises(RateLimitExceeded):
+        second.acquire("pricing")
+
+
+def test_unlimited_endpoints_pass_through(redis_client):
+    limiter = TokenBucketLimiter(limits={}, redis_client=redis_client)
+    assert limiter.acquire("anything") == 0.0
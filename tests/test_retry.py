@@ -0,0 +1,115 @@
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+import redis
+from amadeus import ClientError, NetworkError, ServerError
+from pydantic import ValidationError
+
+from core.models import FlightSearchRequest
+from worker import tasks
+from worker.idempotency import HoldInProgressError
+from worker.ratelimit import RateLimitExceeded
+from worker.retry import backoff_countdown, classify
+from worker.transport import TransportError
+
+
+def amadeus_response(status_code, headers=None):
+    return SimpleNamespace(status_code=status_code, result=None, parsed=False, headers=headers or {})
+
+
+def validation_error():
+    try:
+        FlightSearchRequest(from_location="JFK")
+    except ValidationError as ex:
+        return ex
+
+
+def json_error():
+    try:
+        json.loads("{not json")
+    except ValueError as ex:
+        return ex
+
+
+@pytest.mark.parametrize("exc", [
+    NetworkError(amadeus_response(None)),
+    httpx.ConnectTimeout("connect timed out"),
+    httpx.ReadError("connection reset"),
+    ConnectionResetError(),
+    TimeoutError(),
+    redis.ConnectionError("redis down"),
+    RateLimitExceeded("queue too long"),
+    HoldInProgressError("still creating"),
+    ServerError(amadeus_response(503)),
+    TransportError(500, "oops"),
+])
+def test_transient_errors_are_retried(exc):
+    assert classify(exc).retry
+
+
+@pytest.mark.parametrize("exc", [
+    validation_error(),
+    KeyError("price"),
+    LookupError("missing"),
+    TypeError("unsupported operand"),
+    json_error(),
+    ClientError(amadeus_response(400)),
+    TransportError(422, "invalid offer"),
+    TransportError(401, "bad token"),
+])
+def test_bugs_and_bad_requests_are_not_retried(exc):
+    assert not classify(exc).retry
+
+
+def test_rate_limited_uses_retry_after():
+    decision = classify(TransportError(429, "slow down", {"Retry-After": "7"}))
+    assert decision.retry and decision.retry_after == 7.0
+    assert backoff_countdown(0, decision.retry_after) >= 7.0
+
+
+def test_backoff_is_capped():
+    assert all(0 <= backoff_countdown(10, base=2, cap=5) <= 5 for _ in range(100))
+
+
+class FakeTask:
+    name = "worker.fake"
+    max_retries = 3
+
+    def __init__(self, retries=0):
+        self.request = SimpleNamespace(retries=retries)
+
+    def retry(self, exc=None, countdown=None):
+        raise RuntimeError(f"retry in {countdown}")
+
+
+def test_give_up_keeps_the_failed_stage_and_offers():
+    context = {"status": "priced", "offers": [{"id": "1"}], "table": {"price": [1.0]}}
+    result = tasks._retry_or_give_up(FakeTask(), TransportError(422, "invalid"), "hold", context)
+    assert result["status"] == "hold_failed"
+    assert result["offers"] == [{"id": "1"}] and result["error"].startswith("http_422")
+
+    result = tasks._retry_or_give_up(FakeTask(), KeyError("price"), "pricing", context)
+    assert result["status"] == "failed" and result["stage"] == "pricing"
+
+    result = tasks._retry_or_give_up(FakeTask(), KeyError("data"), "search")
+    assert result == {"status": "failed", "stage": "search", "error": "KeyError: 'data'"}
+
+
+def test_retryable_error_reschedules_until_retries_run_out():
+    with pytest.raises(RuntimeError, match="retry in"):
+        tasks._retry_or_give_up(FakeTask(retries=0), httpx.ConnectTimeout("t"), "search")
+    result = tasks._retry_or_give_up(FakeTask(retries=3), httpx.ConnectTimeout("t"), "search")
+    assert result["status"] == "failed"
+
+
+def test_pricing_task_failure_is_not_reported_as_not_found(monkeypatch):
+    def broken_price_stage(context):
+        raise KeyError("flightOffers")
+
+    monkeypatch.setattr(tasks, "price_stage", broken_price_stage)
+    context = {"status": "searched", "offers": [{"id": "1"}], "table": {"price": [1.0]}}
+    result = tasks.price_offer.apply(args=(context,)).get()
+    assert result["status"] == "failed" and result["stage"] == "pricing"
+    assert result["offers"] == [{"id": "1"}]
@@ -0,0 +1,24 @@
+from core.secrets import _apply_env
+
+
+def test_credentials_stay_strings():
+    secrets = {}
+    _apply_env(secrets, {
+        "AMADEUS_CLIENT_ID": "0012345", "AMADEUS_CLIENT_SECRET": "1e10", "AMADEUS_TIMEOUT": "15",
+        "REDIS_URL": "redis://localhost:6379/0",
+    })
+    assert secrets["amadeus"] == {"client_id": "0012345", "client_secret": "1e10", "timeout": "15"}
+    assert secrets["redis"] == {"url": "redis://localhost:6379/0"}
+
+
+def test_other_settings_are_parsed_as_json():
+    secrets = {}
+    _apply_env(secrets, {
+        "RATE_LIMITS_PRICING": "[20, 20]", "HISTORY_ENABLED": "false", "CACHE_SEARCH_TTL": "60",
+        "HISTORY_DIR": "/var/history", "UNRELATED": "1",
+    })
+    assert secrets == {
+        "rate_limits": {"pricing": [20, 20]},
+        "history": {"enabled": False, "dir": "/var/history"},
+        "cache": {"search_ttl": 60},
+    }
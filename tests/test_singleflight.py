@@ -0,0 +1,79 @@
+import threading
+import time
+
+import httpx
+import pytest
+
+from worker.retry import classify
+from worker.singleflight import LOCK_PREFIX, SingleFlight, SingleFlightError
+
+
+def run_in_thread(fn):
+    outcome = {}
+
+    def target():
+        try:
+            outcome["value"] = fn()
+        except Exception as ex:
+            outcome["error"] = ex
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread, outcome
+
+
+def test_leader_keeps_its_lock_and_followers_share_its_result(redis_client):
+    flight = SingleFlight(lock_timeout=1, max_wait=10, redis_client=redis_client)
+    calls = []
+
+    def slow_search():
+        calls.append(1)
+        time.sleep(2.5)  # well past lock_timeout
+        return ["offer"]
+
+    leader, leader_outcome = run_in_thread(lambda: flight.do("k", slow_search))
+    time.sleep(0.2)
+    follower, follower_outcome = run_in_thread(lambda: flight.do("k", slow_search))
+    time.sleep(1.5)
+    assert redis_client.exists(LOCK_PREFIX + "k")
+    leader.join()
+    follower.join()
+
+    assert leader_outcome == follower_outcome == {"value": ["offer"]}
+    assert len(calls) == 1
+    assert not redis_client.exists(LOCK_PREFIX + "k")
+
+
+def test_follower_takes_over_from_a_crashed_leader(redis_client):
+    redis_client.set(LOCK_PREFIX + "k", "dead-leader", ex=1)
+    flight = SingleFlight(lock_timeout=1, max_wait=10, redis_client=redis_client)
+    assert flight.do("k", lambda: ["offer"]) == ["offer"]
+
+
+def test_follower_never_calls_alongside_a_live_leader(redis_client):
+    redis_client.set(LOCK_PREFIX + "k", "busy-leader", ex=60)
+    flight = SingleFlight(lock_timeout=1, max_wait=1, redis_client=redis_client)
+    calls = []
+    with pytest.raises(SingleFlightError) as raised:
+        flight.do("k", lambda: calls.append(1))
+    assert not calls
+    assert classify(raised.value).retry
+
+
+@pytest.mark.parametrize("error, retryable", [(httpx.ConnectTimeout("timed out"), True), (KeyError("data"), False)])
+def test_followers_inherit_whether_the_leader_error_is_retryable(redis_client, error, retryable):
+    flight = SingleFlight(lock_timeout=5, max_wait=10, redis_client=redis_client)
+
+    def failing_search():
+        time.sleep(0.5)
+        raise error
+
+    leader, leader_outcome = run_in_thread(lambda: flight.do("k", failing_search))
+    time.sleep(0.1)
+    follower, follower_outcome = run_in_thread(lambda: flight.do("k", failing_search))
+    leader.join()
+    follower.join()
+
+    assert leader_outcome["error"] is error
+    assert isinstance(follower_outcome["error"], SingleFlightError)
+    assert classify(follower_outcome["error"]).retry is retryable
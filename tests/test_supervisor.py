@@ -0,0 +1,114 @@
+import signal
+import subprocess
+import time
+
+from core import config
+from celery_worker import WORKER_QUEUES, stage_worker_command
+from run import BACKOFF, READY, STARTING, ProcessGroup, Replica, Supervisor, build_groups, probe_beat
+from worker import tasks
+
+
+def test_every_group_builds_its_command():
+    groups = {group.name: group for group in build_groups()}
+    assert {"celery", "beat", "streamlit", *WORKER_QUEUES} <= set(groups)
+    for group in groups.values():
+        command = group.command(Replica(group, 0))
+        assert command and isinstance(command[0], str)
+
+
+def test_default_queue_worker_command():
+    command = stage_worker_command("celery", "celery-0.1")
+    assert command[command.index("-Q") + 1] == "celery"
+    assert command[command.index("-n") + 1] == "celery-0.1@%h"
+
+
+def test_sync_transport_workers_use_autoscaled_prefork(monkeypatch):
+    monkeypatch.setattr(config, "AMADEUS_TRANSPORT", "sync")
+    monkeypatch.setattr(config, "AUTOSCALE_ENABLED", True)
+    command = stage_worker_command("search")
+    assert "--pool=prefork" in command
+    assert any(arg.startswith("--autoscale=") for arg in command)
+
+
+def test_async_transport_runs_stage_workers_on_threads(monkeypatch):
+    monkeypatch.setattr(config, "AMADEUS_TRANSPORT", "async")
+    monkeypatch.setattr(config, "AUTOSCALE_ENABLED", True)
+    command = stage_worker_command("search")
+    assert "--pool=threads" in command
+    assert f"--concurrency={WORKER_QUEUES['search']['threads']}" in command
+    assert not any(arg.startswith("--autoscale") for arg in command)
+    # Queues that make no Amadeus calls keep prefork
+    assert "--pool=prefork" in stage_worker_command("maintenance")
+
+
+def test_pool_can_be_set_per_queue(monkeypatch):
+    monkeypatch.setattr(config, "AMADEUS_TRANSPORT", "async")
+    monkeypatch.setitem(WORKER_QUEUES["holds"], "pool", "prefork")
+    assert "--pool=prefork" in stage_worker_command("holds")
+
+
+def test_beat_is_ready_only_after_a_heartbeat_since_it_started(app_redis):
+    replica = Replica(ProcessGroup("beat", 1, lambda replica: [], probe_beat), 0)
+    replica.launched_at = time.time()
+    assert not probe_beat(replica)
+    app_redis.set(tasks.BEAT_HEARTBEAT_KEY, replica.launched_at - 60)  # from a previous beat
+    assert not probe_beat(replica)
+    tasks.beat_heartbeat.apply()
+    assert probe_beat(replica)
+
+
+def sleeper_group(replicas=1):
+    return ProcessGroup("sleeper", replicas, lambda replica: ["sleep", "30"], lambda replica: True)
+
+
+def test_tick_restarts_a_killed_process(monkeypatch):
+    monkeypatch.setattr(config, "RESTART_BACKOFF_BASE", 0)
+    supervisor = Supervisor([sleeper_group()])
+    supervisor.start()
+    replica = supervisor.replicas["sleeper"][0]
+    try:
+        assert replica.state == READY
+        first_pid = replica.proc.pid
+        replica.proc.send_signal(signal.SIGKILL)
+        replica.proc.wait()
+
+        supervisor.tick()
+        assert replica.state == BACKOFF
+        supervisor.tick()
+        assert replica.state == STARTING and replica.restarts == 1
+        assert replica.proc.pid != first_pid and replica.alive()
+        supervisor.tick()
+        assert replica.state == READY
+    finally:
+        supervisor.shutdown()
+    assert not replica.alive()
+
+
+def test_backoff_grows_with_consecutive_crashes(monkeypatch):
+    monkeypatch.setattr(config, "RESTART_BACKOFF_BASE", 1)
+    monkeypatch.setattr(config, "RESTART_BACKOFF_MAX", 60)
+    supervisor = Supervisor([ProcessGroup("crasher", 1, lambda replica: ["false"], lambda replica: True)])
+    replica = supervisor.replicas["crasher"][0]
+    delays = []
+    for _ in range(3):
+        replica.start()
+        replica.proc.wait()
+        supervisor.tick()
+        delays.append(round(replica.next_start - replica.started_at))
+    assert delays == [1, 2, 4]
+
+
+def test_drain_kills_a_process_that_ignores_the_signal():
+    group = ProcessGroup(
+        "stubborn", 1, lambda replica: ["sh", "-c", "trap '' TERM; sleep 30"], lambda replica: True
+    )
+    replica = Replica(group, 0)
+    replica.start()
+    try:
+        # Give the shell time to install its trap
+        subprocess.run(["sleep", "0.2"])
+        replica.drain(timeout=0.5)
+    finally:
+        if replica.alive():
+            replica.proc.kill()
+    assert not replica.alive()
@@ -0,0 +1,51 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from worker.transport import AsyncAmadeusTransport, TransportError, run_async
+
+
+def make_transport(handler):
+    calls = []
+
+    def record(request):
+        calls.append(request.url.path)
+        return handler(request)
+
+    transport = AsyncAmadeusTransport("id", "secret", "test")
+    transport._client = httpx.AsyncClient(base_url=transport.base_url, transport=httpx.MockTransport(record))
+    transport._token_lock = asyncio.Lock()
+    return transport, calls
+
+
+def amadeus(request):
+    if request.url.path == "/v1/security/oauth2/token":
+        return httpx.Response(200, json={"access_token": "token", "expires_in": 1799})
+    assert request.headers["Authorization"] == "Bearer token"
+    if request.url.path == "/v2/shopping/flight-offers":
+        return httpx.Response(200, json={"data": [{"id": request.url.params["originLocationCode"]}]})
+    return httpx.Response(400, json={"errors": [{"title": "INVALID FORMAT"}]})
+
+
+def test_concurrent_searches_share_the_loop_and_one_token():
+    transport, calls = make_transport(amadeus)
+
+    def search(origin):
+        return run_async(transport.search_flight_offers(originLocationCode=origin))
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(search, ["JFK", "LHR", "CDG", "KTM"] * 4))
+    assert [offers[0]["id"] for offers in results] == ["JFK", "LHR", "CDG", "KTM"] * 4
+    assert calls.count("/v1/security/oauth2/token") == 1
+
+
+def test_error_responses_raise_transport_errors():
+    transport, _ = make_transport(amadeus)
+    sample = {}
+    with pytest.raises(TransportError) as error:
+        run_async(transport.request("POST", "/v1/shopping/flight-offers/pricing", json={}, sample=sample))
+    assert error.value.status_code == 400
+    assert error.value.body == {"errors": [{"title": "INVALID FORMAT"}]}
+    assert sample["bytes"] > 0
@@ -0,0 +1,133 @@
+# worker/auth.py
+# Amadeus OAuth access token shared by every worker and Streamlit process.
+# The token and its expiry live in Redis; one process refreshes it shortly
+# before expiry under a lock while the others keep using the current token.
+
+import json
+import logging
+import time
+import uuid
+
+import requests
+
+from core import config
+from core.redis_client import get_redis
+from worker.transport import TransportError, base_url
+
+TOKEN_KEY = "amadeus:oauth:token"
+LOCK_KEY = "amadeus:oauth:lock"
+
+
+class SharedTokenProvider:
+    """
+    Returns a valid Amadeus access token, fetching one only when the shared
+    token is missing or within refresh_margin seconds of expiring.
+    """
+
+    def __init__(
+        self,
+        client_id=config.AMADEUS_CLIENT_ID,
+        client_secret=config.AMADEUS_CLIENT_SECRET,
+        environment=config.AMADEUS_ENVIRONMENT,
+        refresh_margin=config.TOKEN_REFRESH_MARGIN,
+        lock_timeout=10,
+        redis_client=None,
+    ):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.token_url = base_url(environment) + "/v1/security/oauth2/token"
+        self.refresh_margin = refresh_margin
+        self.lock_timeout = lock_timeout
+        self._redis = redis_client
+        self._token = None
+        self._expires_at = 0.0
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis()
+        return self._redis
+
+    def cached_token(self):
+        """Returns the process-local token if it is still fresh, otherwise None."""
+        if self._token and time.time() < self._expires_at - self.refresh_margin:
+            return self._token
+        return None
+
+    def get_token(self) -> str:
+        # Process-local copy avoids a Redis round trip on every request
+        token = self.cached_token()
+        if token:
+            return token
+
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            token, expires_at = self._load()
+            if token and time.time() < expires_at - self.refresh_margin:
+                return self._remember(token, expires_at)
+
+            owner = uuid.uuid4().hex
+            if self.redis.set(LOCK_KEY, owner, nx=True, ex=self.lock_timeout):
+                try:
+                    return self._refresh()
+                finally:
+                    if self.redis.get(LOCK_KEY) == owner.encode():
+                        self.redis.delete(LOCK_KEY)
+
+            # Another process is refreshing; the current token is still usable until it expires
+            if token and time.time() < expires_at:
+                return self._remember(token, expires_at)
+            if time.monotonic() > deadline:
+                logging.warning("Timed out waiting for shared Amadeus token, fetching directly")
+                return self._refresh()
+            time.sleep(0.05)
+
+    def _load(self):
+        raw = self.redis.get(TOKEN_KEY)
+        if raw is None:
+            return None, 0.0
+        entry = json.loads(raw)
+        return entry["access_token"], entry["expires_at"]
+
+    def _remember(self, token: str, expires_at: float) -> str:
+        self._token, self._expires_at = token, expires_at
+        return token
+
+    def _refresh(self) -> str:
+        logging.info("Fetching new Amadeus access token")
+        response = requests.post(
+            self.token_url,
+            data={
+                "grant_type": "client_credentials",
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+            },
+            timeout=10,
+        )
+        if response.status_code != 200:
+            raise TransportError(response.status_code, response.text, response.headers)
+        payload = response.json()
+        expires_in = int(payload.get("expires_in", 1799))
+        expires_at = time.time() + expires_in
+        self.redis.set(
+            TOKEN_KEY,
+            json.dumps({"access_token": payload["access_token"], "expires_at": expires_at}),
+            ex=expires_in,
+        )
+        return self._remember(payload["access_token"], expires_at)
+
+
+class SharedAccessToken:
+    """
+    Drop-in replacement for the amadeus SDK's per-client AccessToken, so the
+    synchronous Client reuses the shared token instead of fetching its own.
+    """
+
+    def __init__(self, provider: SharedTokenProvider):
+        self.provider = provider
+
+    def _bearer_token(self):
+        return f"Bearer {self.provider.get_token()}"
+
+
+token_provider = SharedTokenProvider()
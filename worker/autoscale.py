@@ -0,0 +1,160 @@
+# worker/autoscale.py
+# Queue-depth driven autoscaling and per-priority-class queue-wait stats.
+#
+# Every task start records how long it sat in its queue (see
+# worker/metrics.py). QueueDepthAutoscaler, installed as celery's
+# worker_autoscaler, resizes a worker's pool between its --autoscale bounds
+# from the backlog on the queues it consumes and the recent queue wait of
+# their priority class, instead of Celery's default of reserved tasks only.
+#
+#   python -m worker.autoscale report     # queue wait per priority class
+
+import logging
+import math
+import sys
+import time
+
+from celery.worker.autoscale import Autoscaler
+
+from core import config
+from core.redis_client import get_redis
+
+SAMPLES_PREFIX = "queue:wait:samples:"  # list of recent queue waits per priority class
+SAMPLE_LIMIT = 1000
+
+
+def priority_class(queue: str) -> str:
+    """Returns the priority class a queue belongs to."""
+    for name, queues in config.PRIORITY_CLASSES.items():
+        if queue in queues:
+            return name
+    return "default"
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+
+class QueueWaitStats:
+    """Keeps the last SAMPLE_LIMIT queue waits per priority class in Redis."""
+
+    def __init__(self, redis_client=None):
+        self._redis = redis_client
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis()
+        return self._redis
+
+    def record(self, queue: str, wait: float):
+        key = SAMPLES_PREFIX + priority_class(queue)
+        pipe = self.redis.pipeline()
+        pipe.lpush(key, f"{time.time():.3f}:{wait:.4f}")
+        pipe.ltrim(key, 0, SAMPLE_LIMIT - 1)
+        pipe.execute()
+
+    def waits(self, name: str, window: float = None) -> list:
+        """Returns recent queue waits for a priority class, optionally only the last window seconds."""
+        since = time.time() - window if window else 0
+        waits = []
+        for raw in self.redis.lrange(SAMPLES_PREFIX + name, 0, -1):
+            at, wait = raw.decode().split(":")
+            if float(at) >= since:
+                waits.append(float(wait))
+        return waits
+
+    def depth(self, queues) -> int:
+        """Messages waiting in the given broker queues (Redis lists)."""
+        pipe = self.redis.pipeline()
+        for queue in queues:
+            pipe.llen(queue)
+        return sum(pipe.execute())
+
+    def report(self, window: float = None) -> dict:
+        """Returns depth and queue-wait percentiles for every priority class."""
+        report = {}
+        for name, queues in config.PRIORITY_CLASSES.items():
+            waits = self.waits(name, window)
+            report[name] = {
+                "queues": list(queues),
+                "depth": self.depth(queues),
+                "samples": len(waits),
+                "wait_p50": percentile(waits, 50),
+                "wait_p95": percentile(waits, 95),
+                "wait_max": max(waits, default=0.0),
+                "target_wait": config.AUTOSCALE_TARGET_WAIT.get(name),
+            }
+        return report
+
+
+queue_wait_stats = QueueWaitStats()
+
+
+class QueueDepthAutoscaler(Autoscaler):
+    """
+    Scales the pool to cover the backlog on this worker's queues
+    (AUTOSCALE_BACKLOG_PER_PROCESS waiting tasks per process), and adds a
+    process whenever the class's recent p95 queue wait exceeds its target.
+    Scale-downs still wait for Celery's keepalive after the last scale-up.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._checked_at = 0.0
+
+    def _queues(self) -> list:
+        return list(self.worker.app.amqp.queues.consume_from) if self.worker else []
+
+    def desired_processes(self, procs: int, depth: int, wait_p95: float, target_wait: float) -> int:
+        wanted = max(self.qty, math.ceil(depth / config.AUTOSCALE_BACKLOG_PER_PROCESS))
+        if target_wait and wait_p95 > target_wait:
+            wanted = max(wanted, procs + 1)
+        return max(self.min_concurrency, min(self.max_concurrency, wanted))
+
+    def _maybe_scale(self, req=None):
+        now = time.monotonic()
+        if now - self._checked_at < config.AUTOSCALE_INTERVAL:
+            return None
+        self._checked_at = now
+
+        queues = self._queues()
+        try:
+            depth = queue_wait_stats.depth(queues)
+            name = priority_class(queues[0]) if queues else "default"
+            wait_p95 = percentile(queue_wait_stats.waits(name, window=config.AUTOSCALE_WAIT_WINDOW), 95)
+        except Exception:
+            logging.exception("Autoscaler could not read queue stats, falling back to reserved tasks")
+            return super()._maybe_scale(req)
+
+        procs = self.processes
+        wanted = self.desired_processes(procs, depth, wait_p95, config.AUTOSCALE_TARGET_WAIT.get(name))
+        if wanted > procs:
+            logging.info(f"Autoscale {queues}: depth {depth}, p95 wait {wait_p95:.2f}s -> {wanted} processes")
+            self.scale_up(wanted - procs)
+            return True
+        if wanted < procs:
+            self.scale_down(procs - wanted)
+            return True
+        return None
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] != "report":
+        print("usage: python -m worker.autoscale report [window_seconds]")
+        return
+    window = float(sys.argv[2]) if len(sys.argv) > 2 else None
+    print(f"{'class':<12} {'depth':>7} {'samples':>8} {'p50':>8} {'p95':>8} {'max':>8} {'target':>8}  queues")
+    for name, row in queue_wait_stats.report(window).items():
+        target = f"{row['target_wait']:.1f}" if row["target_wait"] else "-"
+        print(
+            f"{name:<12} {row['depth']:>7} {row['samples']:>8} {row['wait_p50']:>8.2f} "
+            f"{row['wait_p95']:>8.2f} {row['wait_max']:>8.2f} {target:>8}  {','.join(row['queues'])}"
+        )
+
+
+if __name__ == "__main__":
+    main()
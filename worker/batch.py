@@ -0,0 +1,256 @@
+# worker/batch.py
+# Bulk searches from a JSONL file of FlightSearchRequest records.
+#
+#   python -m worker.batch searches.jsonl results.jsonl [--ordered] [--chunk-size N]
+#                                                       [--max-in-flight N] [--checkpoint PATH]
+#
+# The input is read line by line, so its size does not matter. Each record is
+# validated, then searched with worker.search_offers on the "batch" queue;
+# records are submitted as Celery groups of chunk_size, and reading stops
+# while max_in_flight searches are submitted but not yet written out. Results
+# are appended to the output as they complete, or in input order with
+# --ordered. One output line per non-blank input line:
+#
+#   {"line": 12, "status": "searched", "request": {...}, "table": {...}}
+#   {"line": 13, "status": "invalid", "error": "..."}
+#
+# Progress is checkpointed (atomically, every BATCH_CHECKPOINT_INTERVAL
+# seconds) to <output>.checkpoint. Running the same command again resumes:
+# the output is truncated to the last checkpoint and the input is read from
+# the first line not yet written, skipping lines written out of order.
+
+import argparse
+import json
+import logging
+import os
+import time
+from collections import deque
+
+from celery import states
+from pydantic import ValidationError
+
+from core import config
+from core.models import FlightSearchRequest
+
+
+def read_records(path: str, offset: int = 0, line: int = 1):
+    """
+    Yields (line number, offset of the next line, search data, error) for
+    each non-blank line of a JSONL file, starting at byte offset (the start
+    of line). Exactly one of search data and error is set.
+    """
+    with open(path, "rb") as handle:
+        handle.seek(offset)
+        for raw in handle:
+            offset += len(raw)
+            if raw.strip():
+                try:
+                    search_data = FlightSearchRequest(**json.loads(raw)).model_dump()
+                except (ValueError, TypeError, ValidationError) as ex:
+                    yield line, offset, None, str(ex).strip()
+                else:
+                    yield line, offset, search_data, None
+            line += 1
+
+
+class BatchRunner:
+    """Streams a JSONL file of searches through the batch queue into a JSONL file of results."""
+
+    def __init__(self, output_path: str, ordered: bool = False, chunk_size: int = config.BATCH_CHUNK_SIZE,
+                 max_in_flight: int = config.BATCH_MAX_IN_FLIGHT, checkpoint_path: str = None,
+                 priority: str = "batch", poll_interval: float = config.BATCH_POLL_INTERVAL, task=None):
+        self.output_path = output_path
+        self.ordered = ordered
+        self.chunk_size = max(1, min(chunk_size, max_in_flight))
+        self.max_in_flight = max_in_flight
+        self.checkpoint_path = checkpoint_path or output_path + ".checkpoint"
+        self.priority = priority
+        self.poll_interval = poll_interval
+        self.task = task
+
+        self.order = deque()  # lines read but not written, in input order
+        self.offsets = {}  # line -> byte offset, for lines in order
+        self.pending = {}  # task id -> (line, search data)
+        self.finished = {}  # line -> output record not yet written
+        self.written_ahead = set()  # lines written before an earlier line (as-completed mode)
+        self.next_line, self.next_offset = 1, 0  # resume point once order is empty
+        self.counts = {}
+        self.output = None
+        self.last_checkpoint = 0.0
+
+    def in_flight(self) -> int:
+        return len(self.pending) + len(self.finished)
+
+    def run(self, input_path: str) -> dict:
+        """Runs (or resumes) the batch and returns counts per output status."""
+        from worker.tasks import _queue_options, search_offers
+
+        task = self.task or search_offers
+        options = _queue_options(self.priority)
+        input_path = os.path.abspath(input_path)
+        self._open(input_path)
+        started, reported = time.monotonic(), time.monotonic()
+        records = read_records(input_path, self.next_offset, self.next_line)
+        exhausted = False
+        try:
+            while not exhausted or self.in_flight():
+                # Backpressure: read only while there is room for another chunk
+                while not exhausted and self.max_in_flight - self.in_flight() >= self.chunk_size:
+                    exhausted = self._submit(records, task, options)
+                if self.pending:
+                    self._collect(task)
+                self._write()
+                if time.monotonic() - reported > 60:
+                    reported = time.monotonic()
+                    done = sum(self.counts.values())
+                    logging.info(
+                        f"Batch: {done} written ({done / (reported - started):.1f}/s), "
+                        f"{len(self.pending)} running, {self.counts}"
+                    )
+            self._checkpoint(force=True)
+        finally:
+            self.output.close()
+        logging.info(f"Batch finished in {time.monotonic() - started:.0f}s: {self.counts}")
+        return self.counts
+
+    def _submit(self, records, task, options) -> bool:
+        """
+        Reads up to chunk_size records and submits the valid ones as one
+        group. Returns True once the input is exhausted.
+        """
+        from celery import group
+
+        chunk, exhausted = [], False
+        for _ in range(self.chunk_size):
+            record = next(records, None)
+            if record is None:
+                exhausted = True
+                break
+            line, next_offset, search_data, error = record
+            # Lines are located by their start, i.e. the previous line's next_offset
+            self.offsets[line] = self.next_offset
+            self.next_line, self.next_offset = line + 1, next_offset
+            if line in self.written_ahead:
+                del self.offsets[line]
+                continue
+            self.order.append(line)
+            if error is not None:
+                self.finished[line] = {"line": line, "status": "invalid", "error": error}
+            else:
+                chunk.append((line, search_data))
+        if chunk:
+            group_result = group(task.s(search_data).set(**options) for _, search_data in chunk).apply_async()
+            for (line, search_data), result in zip(chunk, group_result.results):
+                self.pending[result.id] = (line, search_data)
+        return exhausted
+
+    def _open(self, input_path: str):
+        """Opens the output, resuming from the checkpoint if there is one."""
+        state = None
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as handle:
+                state = json.load(handle)
+            if state["input"] != input_path:
+                raise ValueError(f"{self.checkpoint_path} belongs to a run of {state['input']}")
+        if state is None:
+            self.output = open(self.output_path, "wb")
+            self.input_path = input_path
+            return
+        self.input_path = input_path
+        self.next_line, self.next_offset = state["next_line"], state["next_offset"]
+        self.written_ahead = set(state["written_ahead"])
+        self.counts = state["counts"]
+        # Drops lines written after the checkpoint; they are searched again
+        self.output = open(self.output_path, "r+b")
+        self.output.truncate(state["output_offset"])
+        self.output.seek(state["output_offset"])
+        logging.info(f"Resuming batch at line {self.next_line} ({sum(self.counts.values())} written)")
+
+    def _collect(self, task):
+        """Moves completed searches from pending to finished; waits up to one poll interval."""
+        backend = task.app.backend
+        for task_id, meta in backend.get_many(list(self.pending), interval=self.poll_interval, max_iterations=1):
+            line, search_data = self.pending.pop(task_id)
+            result = meta["result"]
+            if meta["status"] == states.SUCCESS and isinstance(result, dict):
+                self.finished[line] = {
+                    "line": line, "status": result.get("status"), "request": search_data,
+                    "table": result.get("table"),
+                }
+                if result.get("error"):
+                    self.finished[line]["error"] = result["error"]
+            else:
+                self.finished[line] = {"line": line, "status": "failed", "request": search_data, "error": str(result)}
+            # Results are written to the output; no need to keep them until result_expires
+            backend.forget(task_id)
+
+    def _write(self):
+        """Writes finished records (in input order if ordered) and advances the resume point."""
+        if self.ordered:
+            while self.order and self.order[0] in self.finished:
+                self._emit(self.finished.pop(self.order[0]))
+                self.offsets.pop(self.order.popleft())
+        else:
+            for line in sorted(self.finished):
+                self._emit(self.finished.pop(line))
+                self.written_ahead.add(line)
+            while self.order and self.order[0] in self.written_ahead:
+                self.written_ahead.discard(self.order[0])
+                self.offsets.pop(self.order.popleft())
+        self._checkpoint()
+
+    def _emit(self, record: dict):
+        self.output.write(json.dumps(record, separators=(",", ":"), default=str).encode("utf-8") + b"\n")
+        self.counts[record["status"]] = self.counts.get(record["status"], 0) + 1
+
+    def _checkpoint(self, force: bool = False):
+        if not force and time.monotonic() - self.last_checkpoint < config.BATCH_CHECKPOINT_INTERVAL:
+            return
+        self.last_checkpoint = time.monotonic()
+        self.output.flush()
+        os.fsync(self.output.fileno())
+        if self.order:
+            next_line, next_offset = self.order[0], self.offsets[self.order[0]]
+        else:
+            next_line, next_offset = self.next_line, self.next_offset
+        # Lines before the resume point are never read again
+        self.written_ahead = {line for line in self.written_ahead if line >= next_line}
+        state = {
+            "input": self.input_path,
+            "next_line": next_line,
+            "next_offset": next_offset,
+            # Lines at or after next_line that are already in the output
+            "written_ahead": sorted(self.written_ahead),
+            "output_offset": self.output.tell(),
+            "counts": self.counts,
+        }
+        with open(self.checkpoint_path + ".tmp", "w") as handle:
+            json.dump(state, handle)
+        os.replace(self.checkpoint_path + ".tmp", self.checkpoint_path)
+
+
+def run_batch(input_path: str, output_path: str, **options) -> dict:
+    """Library entry point; options are BatchRunner's."""
+    return BatchRunner(output_path, **options).run(input_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m worker.batch", description="Run a JSONL file of flight searches")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--ordered", action="store_true", help="write results in input order")
+    parser.add_argument("--chunk-size", type=int, default=config.BATCH_CHUNK_SIZE)
+    parser.add_argument("--max-in-flight", type=int, default=config.BATCH_MAX_IN_FLIGHT)
+    parser.add_argument("--checkpoint", help="default: <output>.checkpoint")
+    parser.add_argument("--priority", default="batch", choices=sorted(config.PRIORITY_CLASSES))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    counts = run_batch(
+        args.input, args.output, ordered=args.ordered, chunk_size=args.chunk_size,
+        max_in_flight=args.max_in_flight, checkpoint_path=args.checkpoint, priority=args.priority,
+    )
+    print(json.dumps(counts))
+
+
+if __name__ == "__main__":
+    main()
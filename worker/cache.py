@@ -0,0 +1,128 @@
+# worker/cache.py
+# Redis-backed cache for Amadeus flight search results.
+# Entries are keyed on FlightSearchRequest.cache_key() and support
+# stale-while-revalidate: once an entry passes its TTL it is still served
+# for a grace period while a single background refresh fetches new offers.
+
+import json
+import logging
+import time
+
+from core import config
+from core.models import FlightSearchRequest
+from core.redis_client import get_redis
+
+KEY_PREFIX = "search:cache:"
+INDEX_KEY = "search:cache:index"  # sorted set: cache key -> last access time
+STATS_KEY = "search:cache:stats"  # hash: hit / stale / miss / evicted / oversized counters
+REFRESH_LOCK_PREFIX = "search:cache:refreshing:"
+
+HIT = "hit"
+STALE = "stale"
+MISS = "miss"
+
+
+class SearchCache:
+    """
+    Caches search offers in Redis with a fresh TTL, a stale grace period
+    and an LRU-style cap on the number of entries.
+    """
+
+    def __init__(
+        self,
+        ttl=config.SEARCH_CACHE_TTL,
+        stale_ttl=config.SEARCH_CACHE_STALE_TTL,
+        max_entries=config.SEARCH_CACHE_MAX_ENTRIES,
+        max_entry_bytes=config.SEARCH_CACHE_MAX_ENTRY_BYTES,
+        redis_client=None,
+    ):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.max_entry_bytes = max_entry_bytes
+        self._redis = redis_client
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis()
+        return self._redis
+
+    def get(self, search_request: FlightSearchRequest):
+        """
+        Looks up cached offers for a search.
+
+        Returns:
+            tuple: (offers, state) where state is HIT, STALE or MISS.
+                   offers is None on a miss.
+        """
+        key = search_request.cache_key()
+        raw = self.redis.get(KEY_PREFIX + key)
+        if raw is None:
+            self.redis.zrem(INDEX_KEY, key)  # drop index entries for expired keys
+            self._count(MISS)
+            return None, MISS
+
+        entry = json.loads(raw)
+        self.redis.zadd(INDEX_KEY, {key: time.time()})
+        age = time.time() - entry["fetched_at"]
+        state = HIT if age < self.ttl else STALE
+        self._count(state)
+        return entry["offers"], state
+
+    def set(self, search_request: FlightSearchRequest, offers: list):
+        """
+        Stores offers for a search and evicts the least recently used
+        entries once the cache holds more than max_entries.
+        """
+        key = search_request.cache_key()
+        payload = json.dumps(
+            {"fetched_at": time.time(), "offers": offers}, separators=(",", ":")
+        )
+        if len(payload) > self.max_entry_bytes:
+            logging.warning(
+                f"Search result for {key} not cached: {len(offers)} offers, {len(payload)} bytes "
+                f"> cache.search_max_entry_bytes ({self.max_entry_bytes})"
+            )
+            self._count("oversized")
+            return False
+
+        pipe = self.redis.pipeline()
+        pipe.set(KEY_PREFIX + key, payload, ex=self.ttl + self.stale_ttl)
+        pipe.zadd(INDEX_KEY, {key: time.time()})
+        pipe.execute()
+        self._evict()
+        return True
+
+    def claim_refresh(self, search_request: FlightSearchRequest) -> bool:
+        """
+        Returns True for exactly one caller per stale entry, so that only one
+        background refresh is scheduled while the stale value is being served.
+        """
+        lock_key = REFRESH_LOCK_PREFIX + search_request.cache_key()
+        return bool(self.redis.set(lock_key, "1", nx=True, ex=max(self.ttl, 30)))
+
+    def stats(self) -> dict:
+        """Returns hit/stale/miss/evicted/oversized counters and the current entry count."""
+        raw = self.redis.hgetall(STATS_KEY)
+        stats = {name: 0 for name in (HIT, STALE, MISS, "evicted", "oversized")}
+        stats.update({k.decode(): int(v) for k, v in raw.items()})
+        lookups = stats[HIT] + stats[STALE] + stats[MISS]
+        stats["hit_ratio"] = (stats[HIT] + stats[STALE]) / lookups if lookups else 0.0
+        stats["entries"] = self.redis.zcard(INDEX_KEY)
+        return stats
+
+    def _count(self, state: str, amount: int = 1):
+        self.redis.hincrby(STATS_KEY, state, amount)
+
+    def _evict(self):
+        overflow = self.redis.zcard(INDEX_KEY) - self.max_entries
+        if overflow <= 0:
+            return
+        oldest = self.redis.zpopmin(INDEX_KEY, overflow)
+        if oldest:
+            self.redis.delete(*[KEY_PREFIX + member.decode() for member, _ in oldest])
+            self._count("evicted", len(oldest))
+
+
+search_cache = SearchCache()
@@ -0,0 +1,62 @@
+# worker/compact.py
+# Slim projections of Amadeus offers and orders for task results.
+# A projection keeps the same nested shape as the Amadeus document but only
+# the fields streamlit_app/display.py renders, plus a reference to the full
+# body in the offer store.
+
+REF_KEY = "offerRef"
+
+
+def _project_segment(segment: dict) -> dict:
+    return {
+        "carrierCode": segment.get("carrierCode"),
+        "number": segment.get("number"),
+        "departure": {
+            "iataCode": segment.get("departure", {}).get("iataCode"),
+            "at": segment.get("departure", {}).get("at"),
+        },
+        "arrival": {
+            "iataCode": segment.get("arrival", {}).get("iataCode"),
+            "at": segment.get("arrival", {}).get("at"),
+        },
+    }
+
+
+def project_offer(offer: dict, ref: str) -> dict:
+    """Returns the displayable subset of a flight offer."""
+    traveler_pricings = offer.get("travelerPricings") or [{}]
+    fare_details = (traveler_pricings[0].get("fareDetailsBySegment") or [{}])[0]
+    price = offer.get("price", {})
+    return {
+        "id": offer.get("id"),
+        REF_KEY: ref,
+        "itineraries": [
+            {
+                "duration": itinerary.get("duration"),
+                "segments": [_project_segment(s) for s in itinerary.get("segments", [])],
+            }
+            for itinerary in offer.get("itineraries", [])
+        ],
+        "validatingAirlineCodes": offer.get("validatingAirlineCodes", []),
+        "travelerPricings": [
+            {
+                "fareDetailsBySegment": [
+                    {
+                        "cabin": fare_details.get("cabin"),
+                        "includedCheckedBags": fare_details.get("includedCheckedBags", {}),
+                    }
+                ]
+            }
+        ],
+        "price": {"grandTotal": price.get("grandTotal"), "currency": price.get("currency")},
+    }
+
+
+def project_order(order: dict, ref: str) -> dict:
+    """Returns the identifying subset of a flight-order (hold) response."""
+    return {
+        "id": order.get("id"),
+        REF_KEY: ref,
+        "associatedRecords": order.get("associatedRecords", []),
+        "ticketingAgreement": order.get("ticketingAgreement", {}),
+    }
@@ -0,0 +1,40 @@
+# worker/fanout.py
+# Merging of fan-out search results (see worker.tasks.submit_flexible_search).
+# Sub-searches over nearby dates or alternative airports often return the
+# same itinerary more than once; these helpers deduplicate and rank them.
+
+def offer_signature(offer: dict) -> tuple:
+    """
+    Identifies an itinerary by its flown segments (carrier, flight number,
+    departure time), independent of the offer id Amadeus assigned to it.
+    """
+    segments = []
+    for itinerary in offer.get("itineraries", []):
+        for segment in itinerary.get("segments", []):
+            segments.append((
+                segment.get("carrierCode"),
+                segment.get("number"),
+                segment.get("departure", {}).get("at"),
+            ))
+    return tuple(segments)
+
+
+def offer_price(offer: dict) -> float:
+    try:
+        return float(offer.get("price", {}).get("grandTotal"))
+    except (TypeError, ValueError):
+        return float("inf")
+
+
+def merge_offers(offer_lists, top_k: int = None) -> list:
+    """
+    Merges offers from several searches, keeping the cheapest offer per
+    itinerary, and returns the top_k cheapest overall (all if top_k is None).
+    """
+    best = {}
+    for offers in offer_lists:
+        for offer in offers or []:
+            signature = offer_signature(offer) or (offer.get("id"),)
+            if signature not in best or offer_price(offer) < offer_price(best[signature]):
+                best[signature] = offer
+    return sorted(best.values(), key=offer_price)[:top_k]
@@ -0,0 +1,211 @@
+# worker/fare_watch.py
+# Fare watches: periodic re-searches of a route/date with price-change
+# notifications.
+#
+# Watches are keyed by FlightSearchRequest.cache_key(), so every subscriber
+# watching the same search shares one entry and one Amadeus search per
+# interval. Each search gets a fixed phase within the interval (from its key),
+# which spreads searches evenly instead of bunching them at registration
+# time; the beat task also dispatches at most FARE_WATCH_SEARCHES_PER_HOUR
+# worth of searches per tick.
+#
+# Redis layout per watched search <key>:
+#   farewatch:search:<key>   packed {"search": ..., "interval": ...}
+#   farewatch:subs:<key>     hash subscriber id -> packed thresholds / state
+#   farewatch:state:<key>    packed current prices {itinerary: price}
+#   farewatch:diffs:<key>    list of packed diffs against the previous state
+#   farewatch:due            sorted set key -> next search time
+# Notifications are published as JSON on the farewatch:notifications channel.
+
+import hashlib
+import json
+import logging
+import math
+import time
+
+from core import config
+from core.models import FlightSearchRequest
+from core.redis_client import get_redis
+from core.serialization import packb, unpackb
+from worker.fanout import offer_price, offer_signature
+
+SEARCH_PREFIX = "farewatch:search:"
+SUBS_PREFIX = "farewatch:subs:"
+STATE_PREFIX = "farewatch:state:"
+DIFFS_PREFIX = "farewatch:diffs:"
+DUE_KEY = "farewatch:due"
+NOTIFY_CHANNEL = "farewatch:notifications"
+
+
+def itinerary_id(offer: dict) -> str:
+    """Short stable id for an offer's flown itinerary."""
+    signature = offer_signature(offer) or (offer.get("id"),)
+    return hashlib.sha1(json.dumps(signature).encode("utf-8")).hexdigest()[:12]
+
+
+def price_map(offers: list) -> dict:
+    """Cheapest price per itinerary."""
+    prices = {}
+    for offer in offers or []:
+        key, price = itinerary_id(offer), offer_price(offer)
+        if price != float("inf") and (key not in prices or price < prices[key]):
+            prices[key] = price
+    return prices
+
+
+def diff_prices(old: dict, new: dict) -> dict:
+    """Returns what changed between two price maps."""
+    return {
+        "added": {k: v for k, v in new.items() if k not in old},
+        "removed": [k for k in old if k not in new],
+        "changed": {k: v for k, v in new.items() if k in old and old[k] != v},
+    }
+
+
+def crossed(subscription: dict, previous_min, current_min) -> str:
+    """
+    Returns why subscription should be notified, or "". Fires only when a
+    threshold is crossed, not on every search that stays past it.
+    """
+    if current_min is None:
+        return ""
+    target = subscription.get("target_price")
+    if target is not None and current_min <= target and (previous_min is None or previous_min > target):
+        return "below_target"
+    drop_pct = subscription.get("drop_pct")
+    reference = subscription.get("reference_price")
+    if drop_pct and reference and current_min <= reference * (1 - drop_pct / 100):
+        return "price_drop"
+    return ""
+
+
+class FareWatchService:
+    """Registers watches and records the results of their searches."""
+
+    def __init__(self, interval=config.FARE_WATCH_INTERVAL, history=config.FARE_WATCH_HISTORY, redis_client=None):
+        self.interval = interval
+        self.history = history
+        self._redis = redis_client
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis()
+        return self._redis
+
+    def _phase(self, key: str, interval: float) -> float:
+        return int(key[:8], 16) % max(1, int(interval))
+
+    def _next_due(self, key: str, interval: float, now: float) -> float:
+        """Next time after now that falls on key's phase within the interval."""
+        phase = self._phase(key, interval)
+        return (math.floor((now - phase) / interval) + 1) * interval + phase
+
+    def watch(self, search_data: dict, subscriber: str, target_price: float = None,
+              drop_pct: float = None, interval: float = None) -> str:
+        """
+        Subscribes to price changes for a search and returns its watch key.
+        Subscribers of the same search share its entry and its searches.
+        """
+        search_request = FlightSearchRequest(**search_data)
+        key = search_request.cache_key()
+        interval = max(config.FARE_WATCH_MIN_INTERVAL, interval or self.interval)
+        raw = self.redis.get(SEARCH_PREFIX + key)
+        entry = unpackb(raw) if raw is not None else {"search": search_request.model_dump(), "interval": interval}
+        entry["interval"] = min(entry["interval"], interval)
+
+        subscription = {"target_price": target_price, "drop_pct": drop_pct, "reference_price": None}
+        pipe = self.redis.pipeline()
+        pipe.set(SEARCH_PREFIX + key, packb(entry))
+        pipe.hset(SUBS_PREFIX + key, subscriber, packb(subscription))
+        # NX: a search that is already scheduled keeps its slot
+        pipe.zadd(DUE_KEY, {key: self._next_due(key, entry["interval"], time.time())}, nx=True)
+        pipe.execute()
+        return key
+
+    def unwatch(self, key: str, subscriber: str):
+        """Removes a subscriber; the search stops when nobody watches it."""
+        self.redis.hdel(SUBS_PREFIX + key, subscriber)
+        if not self.redis.hlen(SUBS_PREFIX + key):
+            pipe = self.redis.pipeline()
+            pipe.zrem(DUE_KEY, key)
+            pipe.delete(SEARCH_PREFIX + key, STATE_PREFIX + key, DIFFS_PREFIX + key)
+            pipe.execute()
+
+    def claim_due(self, limit: int, now: float = None) -> list:
+        """
+        Returns up to limit due watch keys (most overdue first) and moves
+        each to its next slot, so a search is dispatched once per interval.
+        """
+        now = now or time.time()
+        keys = [key.decode() for key in self.redis.zrangebyscore(DUE_KEY, "-inf", now, start=0, num=limit)]
+        if not keys:
+            return []
+        entries = self.redis.mget([SEARCH_PREFIX + key for key in keys])
+        pipe = self.redis.pipeline()
+        for key, raw in zip(keys, entries):
+            if raw is None:
+                pipe.zrem(DUE_KEY, key)
+                continue
+            pipe.zadd(DUE_KEY, {key: self._next_due(key, unpackb(raw)["interval"], now)}, xx=True)
+        pipe.execute()
+        return [key for key, raw in zip(keys, entries) if raw is not None]
+
+    def search_data(self, key: str):
+        raw = self.redis.get(SEARCH_PREFIX + key)
+        return unpackb(raw)["search"] if raw is not None else None
+
+    def record(self, key: str, offers: list, now: float = None) -> dict:
+        """
+        Stores the diff between offers and the previous search of key and
+        notifies subscribers whose thresholds were crossed. Returns the diff.
+        """
+        now = now or time.time()
+        raw = self.redis.get(STATE_PREFIX + key)
+        old = unpackb(raw) if raw is not None else {}
+        new = price_map(offers)
+        previous_min = min(old.values(), default=None)
+        current_min = min(new.values(), default=None)
+
+        diff = {"at": now, **diff_prices(old, new), "min_price": current_min}
+        pipe = self.redis.pipeline()
+        if diff["added"] or diff["removed"] or diff["changed"] or raw is None:
+            pipe.set(STATE_PREFIX + key, packb(new))
+            pipe.lpush(DIFFS_PREFIX + key, packb(diff))
+            pipe.ltrim(DIFFS_PREFIX + key, 0, self.history - 1)
+        pipe.execute()
+
+        self._notify(key, previous_min, current_min, now)
+        return diff
+
+    def _notify(self, key: str, previous_min, current_min, now: float):
+        subscriptions = self.redis.hgetall(SUBS_PREFIX + key)
+        updates = {}
+        for subscriber, raw in subscriptions.items():
+            subscription = unpackb(raw)
+            reason = crossed(subscription, previous_min, current_min)
+            if reason:
+                self.redis.publish(NOTIFY_CHANNEL, json.dumps({
+                    "subscriber": subscriber.decode(), "watch": key, "reason": reason,
+                    "price": current_min, "previous_price": previous_min, "at": now,
+                }, separators=(",", ":")))
+                logging.info(f"Fare watch {key[:12]}: notified {subscriber.decode()} ({reason}, {current_min})")
+            # Drops are measured from the price at the last notification (or the first search)
+            if current_min is not None and (reason or subscription.get("reference_price") is None):
+                subscription["reference_price"] = current_min
+                updates[subscriber] = packb(subscription)
+        if updates:
+            self.redis.hset(SUBS_PREFIX + key, mapping=updates)
+
+    def history_of(self, key: str, limit: int = 50) -> list:
+        """Returns the most recent diffs for a watch, newest first."""
+        return [unpackb(raw) for raw in self.redis.lrange(DIFFS_PREFIX + key, 0, limit - 1)]
+
+    def stats(self) -> dict:
+        return {
+            "searches": self.redis.zcard(DUE_KEY),
+            "due": self.redis.zcount(DUE_KEY, "-inf", time.time()),
+        }
+
+
+fare_watch = FareWatchService()
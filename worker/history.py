@@ -0,0 +1,278 @@
+# worker/history.py
+# Append-only search history, kept past Celery's result_expires for analytics.
+#
+# Tasks only push a packed record onto a Redis list (one RPUSH, no disk I/O);
+# the flush_search_history beat task drains the list in batches and appends
+# them as Parquet files partitioned by day. A batch is moved to a processing
+# list first and deleted only once its files are written; a failed flush is
+# retried by the next one, under the same file names, so nothing is lost or
+# written twice:
+#
+#   <HISTORY_DIR>/offers/day=YYYY-MM-DD/part-*.parquet     one row per offer seen
+#   <HISTORY_DIR>/outcomes/day=YYYY-MM-DD/part-*.parquet   one row per search / hold outcome
+#
+# compact() merges a partition's small files into one; flush and compact
+# each hold a Redis lock, so overlapping beat runs skip instead of racing.
+# query() reads only the requested columns and the partitions inside the
+# day range.
+# pandas/pyarrow are imported only by the functions that write or read files.
+
+import logging
+import os
+import time
+import uuid
+
+from redis.exceptions import LockError
+
+from core import config
+from core.redis_client import get_redis
+from core.serialization import packb, unpackb
+
+BUFFER_KEY = "history:buffer"
+PROCESSING_KEY = "history:processing"  # the batch being written
+PROCESSING_ID_KEY = "history:processing:id"  # its file name
+FLUSH_LOCK_KEY = "history:flush:lock"
+COMPACT_LOCK_PREFIX = "history:compact:lock:"
+FLUSH_LOCK_TIMEOUT = 300
+
+# Returns the unfinished batch, or moves up to ARGV[1] buffered records
+# into a new one named ARGV[2]
+_CLAIM_SCRIPT = """
+if redis.call("llen", KEYS[2]) == 0 then
+    local items = redis.call("lrange", KEYS[1], 0, tonumber(ARGV[1]) - 1)
+    if #items == 0 then
+        return {false, {}}
+    end
+    for i = 1, #items, 1000 do
+        redis.call("rpush", KEYS[2], unpack(items, i, math.min(i + 999, #items)))
+    end
+    redis.call("ltrim", KEYS[1], #items, -1)
+    redis.call("set", KEYS[3], ARGV[2])
+end
+return {redis.call("get", KEYS[3]), redis.call("lrange", KEYS[2], 0, -1)}
+"""
+
+OFFERS = "offers"
+OUTCOMES = "outcomes"
+
+# Column types, fixed so that every file of a kind has the same schema (a
+# batch where a column is all None would otherwise be written as null type)
+SEARCH_FIELDS = {
+    "request_key": "string", "origin": "string", "destination": "string",
+    "departure_date": "string", "seat_class": "string", "passengers": "int64",
+}
+# Columns taken from the normalized offer table (core/normalize.py)
+OFFER_FIELDS = {
+    "offer_id": "string", "route": "string", "departure_at": "string", "arrival_at": "string",
+    "duration_minutes": "int64", "stops": "int64", "airlines": "string", "cabin": "string",
+    "bags_quantity": "int64", "bags_weight": "double", "price": "double", "currency": "string",
+    "score": "double",
+}
+# stage: the pipeline stage that gave up, for "failed" outcomes
+OUTCOME_FIELDS = {
+    "status": "string", "offers_found": "int64", "best_price": "double",
+    "held_price": "double", "order_id": "string", "stage": "string",
+}
+
+
+def _schema(kind: str):
+    import pyarrow as pa
+
+    fields = OFFER_FIELDS if kind == OFFERS else OUTCOME_FIELDS
+    return pa.schema(
+        [(name, pa.type_for_alias(type_)) for name, type_ in {**fields, **SEARCH_FIELDS}.items()]
+        + [("observed_at", pa.timestamp("us", tz="UTC"))]
+    )
+
+
+def search_fields(search_data: dict, request_key: str) -> dict:
+    return {
+        "request_key": request_key,
+        "origin": search_data.get("from_location"),
+        "destination": search_data.get("to_location"),
+        "departure_date": search_data.get("departure_date"),
+        "seat_class": search_data.get("seat_class"),
+        "passengers": search_data.get("num_passengers"),
+    }
+
+
+class SearchHistory:
+    """Buffers history records in Redis and writes them out as Parquet."""
+
+    def __init__(self, directory=config.HISTORY_DIR, buffer_max=config.HISTORY_BUFFER_MAX, redis_client=None):
+        self.directory = directory
+        self.buffer_max = buffer_max
+        self._redis = redis_client
+        self._claim = None
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis()
+        return self._redis
+
+    def _push(self, record: dict):
+        # History must never fail or slow down a booking
+        if not config.HISTORY_ENABLED:
+            return
+        try:
+            pipe = self.redis.pipeline()
+            pipe.rpush(BUFFER_KEY, packb(record))
+            # Bounded if the flush task falls behind: oldest records are dropped
+            pipe.ltrim(BUFFER_KEY, -self.buffer_max, -1)
+            pipe.execute()
+        except Exception:
+            logging.exception("Could not buffer search history record")
+
+    def record_search(self, search: dict, table: dict):
+        """Records every offer of a ranked search page (columns from rank_page)."""
+        self._push({"kind": OFFERS, "at": time.time(), "search": search, "columns": {
+            name: table.get(name, []) for name in OFFER_FIELDS
+        }})
+
+    def record_outcome(self, search: dict, status: str, offers_found: int = 0, best_price=None,
+                       held_price=None, order_id: str = None, stage: str = None):
+        self._push({"kind": OUTCOMES, "at": time.time(), "search": search, "row": {
+            "status": status, "offers_found": offers_found, "best_price": best_price,
+            "held_price": held_price, "order_id": order_id, "stage": stage,
+        }})
+
+    def flush(self, batch: int = config.HISTORY_FLUSH_BATCH) -> int:
+        """
+        Moves up to batch buffered records to Parquet; returns how many.
+        Finishes a previous flush's batch first if its write failed. Returns
+        0 without writing while another flush holds the lock.
+        """
+        lock = self.redis.lock(FLUSH_LOCK_KEY, timeout=FLUSH_LOCK_TIMEOUT)
+        if not lock.acquire(blocking=False):
+            return 0
+        try:
+            if self._claim is None:
+                self._claim = self.redis.register_script(_CLAIM_SCRIPT)
+            batch_id, raw_records = self._claim(
+                keys=[BUFFER_KEY, PROCESSING_KEY, PROCESSING_ID_KEY], args=[batch, uuid.uuid4().hex]
+            )
+            if not raw_records:
+                return 0
+            self._write_batch(batch_id.decode(), raw_records)
+            # Written: only now are the records dropped
+            self.redis.delete(PROCESSING_KEY, PROCESSING_ID_KEY)
+            return len(raw_records)
+        finally:
+            try:
+                lock.release()
+            except LockError:
+                logging.warning("Search history flush outlived its lock")
+
+    def _write_batch(self, batch_id: str, raw_records: list):
+        import pandas as pd
+
+        frames = {OFFERS: [], OUTCOMES: []}
+        for raw in raw_records:
+            try:
+                record = unpackb(raw)
+                observed = pd.Timestamp(record["at"], unit="s", tz="UTC")
+                if record["kind"] == OFFERS:
+                    frame = pd.DataFrame(record["columns"])
+                    if frame.empty:
+                        continue
+                else:
+                    frame = pd.DataFrame([record["row"]])
+                for name, value in record["search"].items():
+                    frame[name] = value
+                frame["observed_at"] = observed
+            except Exception:
+                # A malformed record must not block every later flush
+                logging.exception("Dropping malformed search history record")
+                continue
+            frames[record["kind"]].append(frame)
+
+        for kind, parts in frames.items():
+            if parts:
+                self._write(kind, pd.concat(parts, ignore_index=True), batch_id)
+
+    def _write(self, kind: str, df, name: str):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        df = df.astype({"observed_at": "datetime64[us, UTC]"})
+        df["day"] = df["observed_at"].dt.strftime("%Y-%m-%d")
+        for day, part in df.groupby("day"):
+            directory = os.path.join(self.directory, kind, f"day={day}")
+            os.makedirs(directory, exist_ok=True)
+            table = pa.Table.from_pandas(part.drop(columns="day"), schema=_schema(kind), preserve_index=False)
+            # A retried batch replaces its own file instead of adding a copy
+            path = os.path.join(directory, f"part-{name}.parquet")
+            # Written under a temporary name so readers never see a partial file
+            pq.write_table(table, path + ".tmp", compression="zstd")
+            os.replace(path + ".tmp", path)
+
+    def partitions(self, kind: str) -> list:
+        base = os.path.join(self.directory, kind)
+        if not os.path.isdir(base):
+            return []
+        return sorted(name[len("day="):] for name in os.listdir(base) if name.startswith("day="))
+
+    def compact(self, kind: str, day: str, min_files: int = config.HISTORY_COMPACT_MIN_FILES) -> int:
+        """
+        Rewrites a day partition's files as one file, if it has at least
+        min_files. Returns the number of files merged (0 if another worker
+        is compacting the partition).
+        """
+        lock = self.redis.lock(f"{COMPACT_LOCK_PREFIX}{kind}:{day}", timeout=int(config.HISTORY_COMPACT_INTERVAL))
+        if not lock.acquire(blocking=False):
+            return 0
+        try:
+            return self._compact(kind, day, min_files)
+        finally:
+            try:
+                lock.release()
+            except LockError:
+                logging.warning(f"Compaction of {kind}/day={day} outlived its lock")
+
+    def _compact(self, kind: str, day: str, min_files: int) -> int:
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+
+        directory = os.path.join(self.directory, kind, f"day={day}")
+        files = sorted(name for name in os.listdir(directory) if name.endswith(".parquet"))
+        if len(files) < min_files:
+            return 0
+        # Read against the current schema: files written before a column was added get nulls
+        merged = ds.dataset(
+            [os.path.join(directory, name) for name in files], schema=_schema(kind), format="parquet",
+        ).to_table()
+        path = os.path.join(directory, f"part-{uuid.uuid4().hex}.parquet")
+        pq.write_table(merged, path + ".tmp", compression="zstd")
+        os.replace(path + ".tmp", path)
+        # Only the files that were merged: a flush may have added new ones meanwhile
+        for name in files:
+            os.remove(os.path.join(directory, name))
+        return len(files)
+
+    def query(self, kind: str, columns: list = None, start_day: str = None, end_day: str = None, where=None):
+        """
+        Returns history rows as a DataFrame. Only the given columns and the
+        day partitions in [start_day, end_day] are read. where is an
+        optional pyarrow.dataset expression, e.g. ds.field("origin") == "JFK".
+        """
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        base = os.path.join(self.directory, kind)
+        if not os.path.isdir(base):
+            import pandas as pd
+            return pd.DataFrame(columns=columns)
+        dataset = ds.dataset(
+            base, schema=_schema(kind).append(pa.field("day", pa.string())), format="parquet",
+            partitioning=ds.partitioning(pa.schema([("day", pa.string())]), flavor="hive"),
+        )
+        expression = where
+        for bound, op in ((start_day, "__ge__"), (end_day, "__le__")):
+            if bound is not None:
+                condition = getattr(ds.field("day"), op)(bound)
+                expression = condition if expression is None else expression & condition
+        return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+
+search_history = SearchHistory()
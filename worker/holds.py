@@ -0,0 +1,279 @@
+# worker/holds.py
+# Registry of active holds (flight orders created with delayed ticketing),
+# indexed by expiry so they can be tracked after their task result expires.
+#
+# Three sorted sets keep every tick proportional to the work it does rather
+# than to the number of holds:
+#   hold:registry:expiry   order id -> expiry time
+#   hold:registry:refresh  order id -> next status check; checks get more
+#                          frequent as expiry approaches
+# plus, per warning threshold, a high-water mark of the expiry times already
+# warned about, so each tick only reads holds that newly entered the window.
+# Events are published as JSON on the hold:events channel.
+#
+# The expiry always comes from the order itself (ticketing deadline, or
+# creation date plus delay), never from when it was registered; each status
+# check re-derives it and stops tracking orders that are no longer on hold.
+
+import json
+import logging
+import re
+import time
+from datetime import datetime, timedelta, timezone
+
+from core import config
+from core.redis_client import get_redis
+from core.serialization import packb, unpackb
+
+EXPIRY_KEY = "hold:registry:expiry"
+REFRESH_KEY = "hold:registry:refresh"
+WARNED_PREFIX = "hold:registry:warned_until:"
+ORDER_PREFIX = "hold:registry:order:"
+EVENTS_CHANNEL = "hold:events"
+
+# Order states (see order_state); only ON_HOLD orders are tracked
+ON_HOLD = "on_hold"
+
+# Event types published on EVENTS_CHANNEL; the last three are also the
+# states that end tracking
+NEAR_EXPIRY = "near_expiry"
+EXPIRED = "expired"
+CANCELLED = "cancelled"
+TICKETED = "ticketed"
+
+_TICKETED_STATUSES = {"TICKETED", "ISSUED", "CONFIRMED"}
+_CANCELLED_STATUSES = {"CANCELLED", "CANCELED", "VOIDED"}
+
+_DELAY = re.compile(r"^(?P<amount>\d+)(?P<unit>[DHM])$")
+_DELAY_UNITS = {"D": "days", "H": "hours", "M": "minutes"}
+
+
+def _timestamp(value: str) -> float:
+    """ISO date-time to epoch seconds; Amadeus omits the offset for UTC times."""
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def order_created_at(order: dict):
+    """Returns when the order was created, from its booking record, or None."""
+    for record in order.get("associatedRecords") or []:
+        if record.get("creationDate"):
+            try:
+                return _timestamp(record["creationDate"])
+            except ValueError:
+                pass
+    return None
+
+
+def hold_expiry(order: dict, created_at: float) -> float:
+    """
+    Returns when a hold lapses: the ticketing agreement's dateTime if given,
+    else the order's creation time (created_at if the order has none) plus
+    its delay (e.g. "6D").
+    """
+    agreement = order.get("ticketingAgreement", {})
+    if agreement.get("dateTime"):
+        return _timestamp(agreement["dateTime"])
+    created_at = order_created_at(order) or created_at
+    match = _DELAY.match(str(agreement.get("delay", "")).upper())
+    if match:
+        delta = timedelta(**{_DELAY_UNITS[match.group("unit")]: int(match.group("amount"))})
+        return created_at + delta.total_seconds()
+    return created_at + config.HOLD_DEFAULT_LIFETIME
+
+
+def order_state(order: dict, expires_at: float, now: float) -> str:
+    """
+    Returns ON_HOLD, TICKETED, CANCELLED or EXPIRED for a flight order
+    payload, given its expiry time.
+    """
+    status = str(order.get("status") or order.get("orderStatus") or "").upper()
+    if order.get("tickets") or status in _TICKETED_STATUSES:
+        return TICKETED
+    if order.get("ticketingAgreement", {}).get("option") == "CONFIRM":
+        return TICKETED
+    if status in _CANCELLED_STATUSES:
+        return CANCELLED
+    if expires_at <= now:
+        return EXPIRED
+    return ON_HOLD
+
+
+class HoldRegistry:
+    """Tracks active holds and decides which ones to refresh on each tick."""
+
+    def __init__(
+        self,
+        refresh_interval=config.HOLD_REFRESH_INTERVAL,
+        warnings=config.HOLD_EXPIRY_WARNINGS,
+        lease=300,
+        redis_client=None,
+    ):
+        self.refresh_interval = refresh_interval
+        self.lease = lease
+        self.warnings = sorted(warnings, reverse=True)
+        self._redis = redis_client
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis()
+        return self._redis
+
+    def next_check(self, expires_at: float, now: float) -> float:
+        """Checks every refresh_interval, tightening to a quarter of the time left."""
+        return now + max(60.0, min(self.refresh_interval, (expires_at - now) / 4))
+
+    def register(self, order: dict, now: float = None) -> float:
+        """
+        Adds a created flight order to the registry; returns its expiry time.
+        The expiry comes from the order (ticketing deadline, or creation date
+        plus delay). Registering an order again changes nothing, so repeated
+        or idempotent holds never push the tracked deadline back. Orders that
+        are not on hold (ticketed, cancelled, lapsed) are not tracked; None
+        is returned for them.
+        """
+        now = now or time.time()
+        created_at = order_created_at(order) or now
+        expires_at = hold_expiry(order, created_at)
+        if order_state(order, expires_at, now) != ON_HOLD:
+            return None
+        record = {
+            "id": order["id"],
+            "reference": (order.get("associatedRecords") or [{}])[0].get("reference"),
+            "created_at": created_at,
+            "expires_at": expires_at,
+            "status": ON_HOLD,
+            "checked_at": None,
+        }
+        if not self.redis.set(ORDER_PREFIX + order["id"], packb(record), nx=True, exat=int(expires_at) + 86400):
+            existing = self.get(order["id"])
+            return existing["expires_at"] if existing else expires_at
+        pipe = self.redis.pipeline()
+        pipe.zadd(EXPIRY_KEY, {order["id"]: expires_at}, nx=True)
+        pipe.zadd(REFRESH_KEY, {order["id"]: self.next_check(expires_at, now)}, nx=True)
+        for threshold in self.warnings:
+            pipe.get(WARNED_PREFIX + str(threshold))
+        marks = pipe.execute()[2:]
+        # Windows the ticks have already moved past would never warn about this hold
+        for threshold, mark in zip(self.warnings, marks):
+            if mark is not None and now < expires_at <= float(mark):
+                self._warn(order["id"], expires_at, threshold, now)
+        return expires_at
+
+    def get(self, order_id: str):
+        raw = self.redis.get(ORDER_PREFIX + order_id)
+        return unpackb(raw) if raw is not None else None
+
+    def due(self, limit: int, now: float = None) -> list:
+        """
+        Returns up to limit order ids whose status check is due, nearest
+        expiry first.
+        """
+        now = now or time.time()
+        candidates = self.redis.zrangebyscore(REFRESH_KEY, "-inf", now, start=0, num=limit * 4)
+        if not candidates:
+            return []
+        expiries = self.redis.zmscore(EXPIRY_KEY, candidates)
+        ranked = sorted(
+            (expiry if expiry is not None else now, order_id.decode())
+            for order_id, expiry in zip(candidates, expiries)
+        )
+        selected = [order_id for _, order_id in ranked[:limit]]
+        # Lease the selected holds so an overlapping tick does not check them
+        # too; record_status() or postpone() reschedules them properly
+        self.redis.zadd(REFRESH_KEY, {order_id: now + self.lease for order_id in selected}, xx=True)
+        return selected
+
+    def record_status(self, order_id: str, order: dict = None, now: float = None) -> str:
+        """
+        Stores the result of a status check and returns the order's state.
+        The state and expiry come from the fetched order; orders that are no
+        longer on hold are removed and fire a ticketed / cancelled / expired
+        event. order=None means the order no longer exists (cancelled).
+        """
+        now = now or time.time()
+        record = self.get(order_id)
+        if order is None:
+            state = CANCELLED
+        else:
+            created_at = order_created_at(order) or (record or {}).get("created_at") or now
+            expires_at = hold_expiry(order, created_at)
+            state = order_state(order, expires_at, now)
+        if state != ON_HOLD:
+            self._remove(order_id)
+            self._publish(state, {**(record or {"id": order_id}), "status": state})
+            return state
+        if record is None:
+            self.register(order, now)
+            return state
+        record.update(created_at=created_at, expires_at=expires_at, checked_at=now, status=state)
+        pipe = self.redis.pipeline()
+        pipe.set(ORDER_PREFIX + order_id, packb(record), exat=int(expires_at) + 86400)
+        pipe.zadd(EXPIRY_KEY, {order_id: expires_at}, xx=True)
+        pipe.zadd(REFRESH_KEY, {order_id: self.next_check(expires_at, now)})
+        pipe.execute()
+        return state
+
+    def postpone(self, order_id: str, delay: float):
+        """Pushes back a status check that could not be made (e.g. rate limited)."""
+        self.redis.zadd(REFRESH_KEY, {order_id: time.time() + delay}, xx=True)
+
+    def fire_expiry_events(self, limit: int = 1000, now: float = None) -> int:
+        """
+        Publishes near-expiry events for holds inside each warning window
+        and expired events for lapsed holds. Only holds that entered a
+        window since the last tick are read. Returns the number of events fired.
+        """
+        now = now or time.time()
+        fired = 0
+        for order_id in self.redis.zrangebyscore(EXPIRY_KEY, "-inf", now, start=0, num=limit):
+            order_id = order_id.decode()
+            record = self.get(order_id) or {"id": order_id}
+            self._remove(order_id)
+            self._publish(EXPIRED, record)
+            fired += 1
+
+        for threshold in self.warnings:
+            mark = float(self.redis.get(WARNED_PREFIX + str(threshold)) or 0)
+            window = self.redis.zrangebyscore(
+                EXPIRY_KEY, f"({max(mark, now)}", now + threshold, start=0, num=limit, withscores=True
+            )
+            for order_id, expires_at in window:
+                self._warn(order_id.decode(), expires_at, threshold, now)
+                fired += 1
+            # A full page means more holds may be waiting; resume after the last one
+            mark = window[-1][1] if len(window) == limit else now + threshold
+            self.redis.set(WARNED_PREFIX + str(threshold), mark)
+        return fired
+
+    def _warn(self, order_id: str, expires_at: float, threshold: int, now: float):
+        record = self.get(order_id) or {"id": order_id}
+        self._publish(NEAR_EXPIRY, {**record, "threshold": threshold, "seconds_left": expires_at - now})
+
+    def stats(self) -> dict:
+        now = time.time()
+        return {
+            "active": self.redis.zcard(EXPIRY_KEY),
+            "refresh_due": self.redis.zcount(REFRESH_KEY, "-inf", now),
+            **{
+                f"expiring_within_{threshold}s": self.redis.zcount(EXPIRY_KEY, now, now + threshold)
+                for threshold in self.warnings
+            },
+        }
+
+    def _remove(self, order_id: str):
+        pipe = self.redis.pipeline()
+        pipe.zrem(EXPIRY_KEY, order_id)
+        pipe.zrem(REFRESH_KEY, order_id)
+        pipe.delete(ORDER_PREFIX + order_id)
+        pipe.execute()
+
+    def _publish(self, event: str, record: dict):
+        logging.info(f"Hold {record.get('id')}: {event}")
+        self.redis.publish(EVENTS_CHANNEL, json.dumps({"event": event, **record}, separators=(",", ":")))
+
+
+hold_registry = HoldRegistry()
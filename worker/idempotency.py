@@ -0,0 +1,146 @@
+# worker/idempotency.py
+# Idempotency for flight-order creation (holds).
+# Each hold is keyed by the submission that produced it plus a hash of the
+# fare and travelers being booked. The submission is the token the search
+# form generates once per submitted search (streamlit_app/state.py), so a
+# double-submit of the same form reuses it; without a token it is the id of
+# the task that creates the hold, which Celery keeps across retries and
+# redeliveries. The first worker to claim the key makes the Flight Orders
+# call and records the order; retries, redeliveries and resubmits of the
+# same submission get that order back instead of creating a duplicate.
+#
+# A claim is held for claim_timeout seconds while the call is in flight. If
+# the call fails, the claim is released so a retry can try again. If a
+# worker dies mid-call, the claim expires and the next attempt creates the
+# order: the API has no way to look up an order we never heard back about.
+
+import hashlib
+import json
+import logging
+import time
+import uuid
+
+from core import config
+from core.redis_client import get_redis
+from core.serialization import packb, unpackb
+from worker.pricing_cache import fare_key
+
+KEY_PREFIX = "hold:idem:"
+STATS_KEY = "hold:idem:stats"  # hash: created / suppressed / waited / released
+
+PENDING = "pending"
+DONE = "done"
+
+# Deletes the claim only if it is still the caller's pending claim
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class HoldInProgressError(Exception):
+    """Raised when another worker is still creating the same hold."""
+
+
+def hold_key(order_body: dict, submission_id: str) -> str:
+    """
+    Returns the idempotency key for a Flight Orders request body: the
+    submission it belongs to plus the fare and travelers it books.
+    """
+    if not submission_id:
+        # Without it, every search for the same fare would share one order
+        raise ValueError("hold_key needs the id of the submission creating the hold")
+    data = order_body.get("data", {})
+    travelers = [
+        [traveler.get("dateOfBirth"), traveler.get("name"), traveler.get("documents")]
+        for traveler in data.get("travelers", [])
+    ]
+    fingerprint = [
+        submission_id,
+        [fare_key(offer) for offer in data.get("flightOffers", [])],
+        travelers,
+    ]
+    return hashlib.sha256(json.dumps(fingerprint, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+class HoldIdempotency:
+    """
+    Atomic claim-or-return for order creation.
+
+    claim_timeout bounds how long a claim may stay pending (it must cover
+    the rate-limit wait plus the Flight Orders call); ttl is how long a
+    created order is returned for the same key.
+    """
+
+    def __init__(self, ttl=config.HOLD_IDEMPOTENCY_TTL, claim_timeout=config.HOLD_CLAIM_TIMEOUT, redis_client=None):
+        self.ttl = ttl
+        self.claim_timeout = claim_timeout
+        self._redis = redis_client
+        self._release = None
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis()
+        return self._redis
+
+    def do(self, key: str, create_fn):
+        """
+        Returns (order, duplicate). Calls create_fn() only if no order exists
+        or is being created for key; otherwise returns the recorded order.
+        Raises HoldInProgressError if another worker's claim outlives the wait.
+        """
+        deadline = time.monotonic() + self.claim_timeout
+        waited = False
+        while True:
+            claim = packb({"state": PENDING, "owner": uuid.uuid4().hex, "at": time.time()})
+            if self.redis.set(KEY_PREFIX + key, claim, nx=True, ex=self.claim_timeout):
+                return self._create(key, claim, create_fn), False
+
+            raw = self.redis.get(KEY_PREFIX + key)
+            if raw is None:
+                continue  # claim expired or released between SET and GET
+            record = unpackb(raw)
+            if record["state"] == DONE:
+                self.redis.hincrby(STATS_KEY, "suppressed", 1)
+                logging.info(f"Hold {key[:12]} already created, returning existing order")
+                return record["order"], True
+
+            if not waited:
+                waited = True
+                self.redis.hincrby(STATS_KEY, "waited", 1)
+            if time.monotonic() > deadline:
+                raise HoldInProgressError(f"Hold {key[:12]} is still being created by another worker")
+            time.sleep(0.5)
+
+    def _create(self, key: str, claim: bytes, create_fn):
+        try:
+            order = create_fn()
+        except Exception:
+            if self._release is None:
+                self._release = self.redis.register_script(_RELEASE_SCRIPT)
+            self._release(keys=[KEY_PREFIX + key], args=[claim])
+            self.redis.hincrby(STATS_KEY, "released", 1)
+            raise
+        pipe = self.redis.pipeline()
+        pipe.set(KEY_PREFIX + key, packb({"state": DONE, "order": order, "at": time.time()}), ex=self.ttl)
+        pipe.hincrby(STATS_KEY, "created", 1)
+        pipe.execute()
+        return order
+
+    def stats(self) -> dict:
+        """Returns order creations, suppressed duplicates and waits on in-flight holds."""
+        raw = {k.decode(): int(v) for k, v in self.redis.hgetall(STATS_KEY).items()}
+        created, suppressed = raw.get("created", 0), raw.get("suppressed", 0)
+        return {
+            "created": created,
+            "suppressed": suppressed,
+            "waited": raw.get("waited", 0),
+            "released": raw.get("released", 0),
+            "duplicate_ratio": suppressed / (created + suppressed) if created + suppressed else 0.0,
+        }
+
+
+hold_idempotency = HoldIdempotency()
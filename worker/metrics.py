@@ -0,0 +1,173 @@
+# worker/metrics.py
+# Prometheus metrics for the Celery workers.
+# Uses prometheus_client's multiprocess mode: every worker process (prefork
+# children included) writes samples to METRICS_MULTIPROC_DIR, and the first
+# worker on a host to bind METRICS_PORT serves the aggregate for all of them.
+# Clear the directory when (re)deploying so old samples are not re-exported.
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from core import config
+
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", config.METRICS_MULTIPROC_DIR)
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+from celery import signals  # noqa: E402
+from prometheus_client import CollectorRegistry, Counter, Histogram, start_http_server, multiprocess  # noqa: E402
+
+from worker.autoscale import priority_class, queue_wait_stats  # noqa: E402
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+QUEUE_WAIT = Histogram(
+    "celery_task_queue_wait_seconds", "Time between publishing a task and a worker starting it",
+    ["task"], buckets=LATENCY_BUCKETS,
+)
+CLASS_QUEUE_WAIT = Histogram(
+    "celery_priority_class_queue_wait_seconds", "Queue wait per priority class (see core/config.py)",
+    ["priority_class"], buckets=LATENCY_BUCKETS,
+)
+TASK_DURATION = Histogram(
+    "celery_task_duration_seconds", "Task run time", ["task", "state"], buckets=LATENCY_BUCKETS,
+)
+TASK_RETRIES = Counter("celery_task_retries_total", "Task retries", ["task"])
+RESULT_SIZE = Histogram(
+    "celery_task_result_bytes", "Serialized task result size", ["task"], buckets=SIZE_BUCKETS,
+)
+BOOKING_OUTCOMES = Counter(
+    "booking_outcomes_total", "Final search-and-hold outcomes", ["status"],
+)
+HOLD_DUPLICATES = Counter(
+    "hold_duplicates_suppressed_total", "Flight-order creations answered with an existing order",
+)
+AMADEUS_LATENCY = Histogram(
+    "amadeus_request_seconds", "Amadeus API call latency", ["endpoint", "outcome"], buckets=LATENCY_BUCKETS,
+)
+AMADEUS_RESPONSE_SIZE = Histogram(
+    "amadeus_response_bytes", "Amadeus API response body size", ["endpoint"], buckets=SIZE_BUCKETS,
+)
+RATE_LIMIT_WAIT = Histogram(
+    "amadeus_ratelimit_wait_seconds", "Time spent queued for an Amadeus rate-limit token",
+    ["endpoint"], buckets=LATENCY_BUCKETS,
+)
+
+# Tasks whose result is the final booking outcome
+OUTCOME_TASKS = {"worker.hold_offer", "worker.search_and_hold_flight"}
+
+_task_started = {}
+
+
+@contextmanager
+def observe_amadeus(endpoint: str):
+    """
+    Times one Amadeus call. The body may set sample["bytes"] to record the
+    response size.
+    """
+    sample = {}
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield sample
+        outcome = "ok"
+    finally:
+        AMADEUS_LATENCY.labels(endpoint, outcome).observe(time.perf_counter() - started)
+        if sample.get("bytes") is not None:
+            AMADEUS_RESPONSE_SIZE.labels(endpoint).observe(sample["bytes"])
+
+
+def observe_rate_limit_wait(endpoint: str, wait: float):
+    RATE_LIMIT_WAIT.labels(endpoint).observe(wait)
+
+
+def observe_hold_duplicate():
+    HOLD_DUPLICATES.inc()
+
+
+@signals.before_task_publish.connect
+def _stamp_publish_time(headers=None, **kwargs):
+    # Every publish is a new enqueue; retries re-send the original headers
+    if headers is not None:
+        headers["enqueued_at"] = time.time()
+
+
+def _timestamp(value):
+    """Epoch seconds from a Celery eta (ISO string or datetime), or None."""
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def queue_wait(request, now: float):
+    """
+    Seconds a task spent queued while it could have run: from publishing,
+    or from its eta / countdown if later (retries are published with one).
+    None if the task was not stamped.
+    """
+    enqueued_at = getattr(request, "enqueued_at", None) or (request.headers or {}).get("enqueued_at")
+    if not enqueued_at:
+        return None
+    try:
+        ready_at = max(float(enqueued_at), _timestamp(getattr(request, "eta", None)) or 0.0)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, now - ready_at)
+
+
+@signals.task_prerun.connect
+def _task_prerun(task_id=None, task=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+    wait = queue_wait(task.request, time.time())
+    if wait is not None:
+        QUEUE_WAIT.labels(task.name).observe(wait)
+        queue = (task.request.delivery_info or {}).get("routing_key") or "celery"
+        CLASS_QUEUE_WAIT.labels(priority_class(queue)).observe(wait)
+        try:
+            # Recent samples drive the autoscaler (worker/autoscale.py)
+            queue_wait_stats.record(queue, wait)
+        except Exception:
+            logging.debug("Could not record queue wait sample", exc_info=True)
+
+
+@signals.task_postrun.connect
+def _task_postrun(task_id=None, task=None, retval=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        TASK_DURATION.labels(task.name, state or "UNKNOWN").observe(time.perf_counter() - started)
+    if state == "SUCCESS":
+        try:
+            RESULT_SIZE.labels(task.name).observe(len(task.backend.encode(retval)))
+        except Exception:
+            pass
+        if task.name in OUTCOME_TASKS and isinstance(retval, dict):
+            BOOKING_OUTCOMES.labels(retval.get("status", "unknown")).inc()
+
+
+@signals.task_retry.connect
+def _task_retry(request=None, sender=None, **kwargs):
+    TASK_RETRIES.labels(sender.name if sender else "unknown").inc()
+
+
+@signals.worker_init.connect
+def _start_metrics_server(**kwargs):
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    try:
+        start_http_server(config.METRICS_PORT, registry=registry)
+        logging.info(f"Serving Prometheus metrics on :{config.METRICS_PORT}/metrics")
+    except OSError:
+        # Another worker on this host already serves the shared multiprocess directory
+        logging.info(f"Metrics port {config.METRICS_PORT} in use; another worker is exporting")
+
+
+@signals.worker_process_shutdown.connect
+def _mark_process_dead(pid=None, **kwargs):
+    multiprocess.mark_process_dead(pid or os.getpid())
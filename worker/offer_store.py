@@ -0,0 +1,56 @@
+# worker/offer_store.py
+# Content-addressed store for full Amadeus offer and order bodies.
+# Task results only carry slim projections plus a hash reference; the full
+# body is kept here once per distinct content and fetched when needed
+# (e.g. by the pricing stage, which must send the complete offer back).
+
+import hashlib
+import json
+
+from core import config
+from core.redis_client import get_redis
+from core.serialization import packb, unpackb
+
+KEY_PREFIX = "offer:blob:"
+
+
+def content_hash(document: dict) -> str:
+    """Returns a stable hash of a JSON document, independent of key order."""
+    canonical = json.dumps(document, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class OfferStore:
+    """Stores documents by content hash; identical documents are stored once."""
+
+    def __init__(self, ttl=config.OFFER_STORE_TTL, redis_client=None):
+        self.ttl = ttl
+        self._redis = redis_client
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis()
+        return self._redis
+
+    def put_many(self, documents: list) -> list:
+        """Stores documents and returns their hashes, in the same order."""
+        refs = [content_hash(document) for document in documents]
+        pipe = self.redis.pipeline()
+        for ref, document in zip(refs, documents):
+            # NX: already-stored content is not rewritten, only kept alive
+            pipe.set(KEY_PREFIX + ref, packb(document), ex=self.ttl, nx=True)
+            pipe.expire(KEY_PREFIX + ref, self.ttl)
+        pipe.execute()
+        return refs
+
+    def put(self, document: dict) -> str:
+        return self.put_many([document])[0]
+
+    def get(self, ref: str):
+        """Returns the stored document, or None if it has expired."""
+        raw = self.redis.get(KEY_PREFIX + ref)
+        return unpackb(raw) if raw is not None else None
+
+
+offer_store = OfferStore()
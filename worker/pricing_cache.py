@@ -0,0 +1,108 @@
+# worker/pricing_cache.py
+# Short-lived cache of Flight Offers Price responses.
+# Keyed by a hash of the fields that determine the fare (flights, fare
+# basis/class per segment, quoted price, travelers), so a changed offer
+# never hits a stale price. Records hit rate and pricing latency saved.
+
+import hashlib
+import json
+import time
+
+from core import config
+from core.redis_client import get_redis
+from core.serialization import packb, unpackb
+
+KEY_PREFIX = "pricing:cache:"
+STATS_KEY = "pricing:cache:stats"  # hash: hit / miss / miss_seconds / saved_seconds
+
+
+def fare_key(offer: dict) -> str:
+    """Returns a stable hash of the fare-relevant fields of a flight offer."""
+    segments = [
+        [
+            segment.get("carrierCode"),
+            segment.get("number"),
+            segment.get("departure", {}).get("iataCode"),
+            segment.get("departure", {}).get("at"),
+            segment.get("arrival", {}).get("iataCode"),
+            segment.get("arrival", {}).get("at"),
+        ]
+        for itinerary in offer.get("itineraries", [])
+        for segment in itinerary.get("segments", [])
+    ]
+    travelers = [
+        [
+            traveler.get("travelerType"),
+            [
+                [fare.get("segmentId"), fare.get("fareBasis"), fare.get("class"), fare.get("cabin")]
+                for fare in traveler.get("fareDetailsBySegment", [])
+            ],
+        ]
+        for traveler in offer.get("travelerPricings", [])
+    ]
+    price = offer.get("price", {})
+    fingerprint = [segments, travelers, price.get("grandTotal"), price.get("currency")]
+    return hashlib.sha256(json.dumps(fingerprint, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+class PricingCache:
+    """Caches priced offers for ttl seconds, keyed by fare_key()."""
+
+    def __init__(self, ttl=config.PRICING_CACHE_TTL, redis_client=None):
+        self.ttl = ttl
+        self._redis = redis_client
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis()
+        return self._redis
+
+    def get_or_price(self, offer: dict, price_fn) -> dict:
+        """
+        Returns the cached priced offer for offer, or calls price_fn(offer),
+        caches its result and returns it.
+        """
+        if self.ttl <= 0:
+            return price_fn(offer)
+
+        key = KEY_PREFIX + fare_key(offer)
+        raw = self.redis.get(key)
+        if raw is not None:
+            self._record_hit()
+            return unpackb(raw)
+
+        started = time.perf_counter()
+        priced = price_fn(offer)
+        elapsed = time.perf_counter() - started
+        pipe = self.redis.pipeline()
+        pipe.set(key, packb(priced), ex=self.ttl)
+        pipe.hincrby(STATS_KEY, "miss", 1)
+        pipe.hincrbyfloat(STATS_KEY, "miss_seconds", elapsed)
+        pipe.execute()
+        return priced
+
+    def _record_hit(self):
+        # Credit each hit with the average pricing call it avoided
+        stats = self.redis.hmget(STATS_KEY, "miss", "miss_seconds")
+        misses, miss_seconds = int(stats[0] or 0), float(stats[1] or 0)
+        pipe = self.redis.pipeline()
+        pipe.hincrby(STATS_KEY, "hit", 1)
+        if misses:
+            pipe.hincrbyfloat(STATS_KEY, "saved_seconds", miss_seconds / misses)
+        pipe.execute()
+
+    def stats(self) -> dict:
+        """Returns hit/miss counts, hit ratio and estimated pricing latency saved."""
+        raw = {k.decode(): float(v) for k, v in self.redis.hgetall(STATS_KEY).items()}
+        hits, misses = int(raw.get("hit", 0)), int(raw.get("miss", 0))
+        return {
+            "hit": hits,
+            "miss": misses,
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+            "avg_pricing_seconds": raw.get("miss_seconds", 0.0) / misses if misses else 0.0,
+            "saved_seconds": raw.get("saved_seconds", 0.0),
+        }
+
+
+pricing_cache = PricingCache()
@@ -0,0 +1,18 @@
+# worker/progress.py
+# Intermediate task states for the search -> price -> hold pipeline.
+# Stages store these as custom Celery states on the task id the UI polls,
+# so offers can be shown as soon as the search returns, before the hold.
+
+from celery_worker import celery
+
+OFFERS_FOUND = "OFFERS_FOUND"  # meta: {"offers": [...]}
+PRICE_CONFIRMED = "PRICE_CONFIRMED"  # meta: {"offers": [...], "priced_offer": {...}}
+
+PROGRESS_STATES = (OFFERS_FOUND, PRICE_CONFIRMED)
+
+
+def publish_progress(task_id, state: str, meta: dict):
+    """Stores an intermediate state for task_id in the result backend."""
+    if not task_id:
+        return
+    celery.backend.store_result(task_id, meta, state)
@@ -0,0 +1,110 @@
+# worker/ratelimit.py
+# Cluster-wide token-bucket rate limiting for Amadeus endpoints.
+# Each endpoint has its own bucket in Redis. Callers reserve a token
+# atomically and are told how long to wait for it; because reservations
+# are handed out in the order they reach Redis, waiting callers are served
+# first-come first-served across every worker process and host.
+
+import logging
+import time
+
+from core import config
+from core.redis_client import get_redis
+
+KEY_PREFIX = "ratelimit:amadeus:"
+STATS_PREFIX = "ratelimit:amadeus:stats:"
+
+# Reserves one token and returns the wait (seconds) until it is usable,
+# or -1 if the wait would exceed max_wait. Uses the Redis clock so that
+# hosts with skewed clocks share one consistent timeline.
+_RESERVE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local max_wait = tonumber(ARGV[3])
+local t = redis.call("TIME")
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - ts) * rate)
+local wait = 0
+if tokens < 1 then
+    wait = (1 - tokens) / rate
+end
+if wait > max_wait then
+    return "-1"
+end
+redis.call("HSET", KEYS[1], "tokens", tokens - 1, "ts", now)
+redis.call("EXPIRE", KEYS[1], math.ceil(burst / rate + max_wait) + 60)
+return tostring(wait)
+"""
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a caller would have to wait longer than max_wait for a token."""
+
+
+class TokenBucketLimiter:
+    """
+    Distributed token buckets keyed by endpoint name.
+
+    limits maps endpoint -> (requests per second, burst size).
+    """
+
+    def __init__(self, limits=None, max_wait=config.RATE_LIMIT_MAX_WAIT, redis_client=None):
+        self.limits = limits if limits is not None else config.RATE_LIMITS
+        self.max_wait = max_wait
+        self._redis = redis_client
+        self._reserve = None
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis()
+        return self._redis
+
+    def acquire(self, endpoint: str) -> float:
+        """
+        Blocks until a token for endpoint is available and returns the time
+        spent waiting, in seconds. Endpoints without a configured limit pass through.
+        """
+        if endpoint not in self.limits:
+            return 0.0
+        rate, burst = self.limits[endpoint]
+        if self._reserve is None:
+            self._reserve = self.redis.register_script(_RESERVE_SCRIPT)
+
+        wait = float(self._reserve(keys=[KEY_PREFIX + endpoint], args=[rate, burst, self.max_wait]))
+        if wait < 0:
+            self._record(endpoint, self.max_wait, rejected=True)
+            raise RateLimitExceeded(f"Rate limit queue for {endpoint} exceeds {self.max_wait}s")
+        if wait > 0:
+            logging.info(f"Rate limited on {endpoint}, waiting {wait:.3f}s")
+            time.sleep(wait)
+        self._record(endpoint, wait)
+        return wait
+
+    def _record(self, endpoint: str, wait: float, rejected: bool = False):
+        pipe = self.redis.pipeline()
+        key = STATS_PREFIX + endpoint
+        pipe.hincrby(key, "calls", 1)
+        pipe.hincrbyfloat(key, "wait_seconds_total", wait)
+        if wait > 0:
+            pipe.hincrby(key, "waited", 1)
+        if rejected:
+            pipe.hincrby(key, "rejected", 1)
+        pipe.execute()
+
+    def stats(self) -> dict:
+        """Returns per-endpoint call counts and queue-wait totals."""
+        stats = {}
+        for endpoint in self.limits:
+            raw = self.redis.hgetall(STATS_PREFIX + endpoint)
+            entry = {k.decode(): float(v) for k, v in raw.items()}
+            calls = entry.get("calls", 0)
+            entry["avg_wait_seconds"] = entry.get("wait_seconds_total", 0) / calls if calls else 0.0
+            stats[endpoint] = entry
+        return stats
+
+
+rate_limiter = TokenBucketLimiter()
@@ -0,0 +1,97 @@
+# worker/retry.py
+# Retry policy for Amadeus failures in Celery tasks.
+# Decides whether an error is worth retrying and how long to wait, so tasks
+# can reschedule themselves with self.retry(countdown=...) instead of
+# sleeping inside a worker slot.
+
+import random
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+import redis
+from amadeus import NetworkError, ResponseError
+
+from core import config
+from worker.idempotency import HoldInProgressError
+from worker.ratelimit import RateLimitExceeded
+from worker.singleflight import SingleFlightError
+from worker.transport import TransportError
+
+# Client errors that will fail the same way on every attempt
+NON_RETRYABLE_STATUSES = {400, 401, 403, 404, 422}
+
+# Errors without an HTTP status that a later attempt can get past: the
+# request never got an answer, or a shared resource was busy. Anything else
+# (validation, parsing, KeyError, TypeError, ...) is a bug or bad data and
+# fails the same way on every attempt.
+TRANSIENT_ERRORS = (
+    NetworkError,  # amadeus SDK: connection failures and timeouts
+    httpx.TimeoutException,  # worker/transport.py: connect/read/pool timeouts
+    httpx.NetworkError,  # worker/transport.py: connection refused, reset, DNS failures
+    ConnectionError,
+    TimeoutError,
+    redis.ConnectionError,
+    redis.TimeoutError,
+    RateLimitExceeded,
+    HoldInProgressError,
+)
+
+
+@dataclass
+class RetryDecision:
+    retry: bool
+    retry_after: Optional[float] = None  # server-requested delay, in seconds
+    reason: str = ""
+
+
+def backoff_countdown(retries: int, retry_after=None,
+                      base=config.RETRY_BACKOFF_BASE, cap=config.RETRY_BACKOFF_MAX) -> float:
+    """
+    Exponential backoff with full jitter for the given number of previous
+    retries. A server-supplied Retry-After is used as the lower bound.
+    """
+    countdown = random.uniform(0, min(cap, base * (2 ** retries)))
+    if retry_after is not None:
+        countdown = max(countdown, retry_after)
+    return round(countdown, 2)
+
+
+def _status_and_headers(exc):
+    if isinstance(exc, TransportError):
+        return exc.status_code, exc.headers
+    if isinstance(exc, ResponseError) and exc.response is not None:
+        return getattr(exc.response, "status_code", None), getattr(exc.response, "headers", None)
+    return None, None
+
+
+def _header(headers, name: str):
+    if not headers:
+        return None
+    items = headers.items() if hasattr(headers, "items") else headers
+    for key, value in items:
+        if key.lower() == name.lower():
+            return value
+    return None
+
+
+def classify(exc: Exception) -> RetryDecision:
+    """Maps an exception raised during a task to a RetryDecision."""
+    if isinstance(exc, TRANSIENT_ERRORS):
+        return RetryDecision(True, reason=type(exc).__name__)
+    if isinstance(exc, SingleFlightError):
+        # Another worker's call failed; retry if that failure was transient
+        return RetryDecision(exc.retryable, reason="single_flight")
+    status, headers = _status_and_headers(exc)
+    if status is None:
+        return RetryDecision(False, reason=type(exc).__name__)
+    if status == 429:
+        retry_after = _header(headers, "Retry-After")
+        try:
+            retry_after = float(retry_after) if retry_after is not None else None
+        except ValueError:
+            retry_after = None
+        return RetryDecision(True, retry_after, reason="rate_limited")
+    if status in NON_RETRYABLE_STATUSES:
+        return RetryDecision(False, reason=f"http_{status}")
+    return RetryDecision(True, reason=f"http_{status}")
@@ -0,0 +1,179 @@
+# worker/singleflight.py
+# Cross-process single-flight for identical Amadeus searches.
+# The first worker to claim a key (the leader) runs the call; every other
+# worker waiting on the same key receives the leader's result over a Redis
+# pub/sub channel instead of making its own round trip.
+#
+# The leader renews its lock while the call runs (rate-limit waits included),
+# so the lock only lapses if the leader dies. Followers wait for the result
+# as long as the lock is held; one of them takes over only after a crash.
+
+import json
+import logging
+import threading
+import time
+import uuid
+
+from core import config
+from core.redis_client import get_redis
+
+LOCK_PREFIX = "search:flight:lock:"
+RESULT_PREFIX = "search:flight:result:"
+CHANNEL_PREFIX = "search:flight:done:"
+
+# Deletes the lock only if it is still owned by the caller
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+# Extends the lock only if it is still owned by the caller
+_RENEW_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("expire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class SingleFlightError(Exception):
+    """
+    Raised to followers when the leader's call failed, or when no result
+    arrived within max_wait. retryable says whether a later attempt can
+    succeed (see worker/retry.py).
+    """
+
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls sharing a key across processes and hosts.
+
+    lock_timeout is the lock's TTL; a live leader renews it every third of
+    that, so it only bounds how long a crashed leader blocks the key before
+    a waiting follower takes over. max_wait bounds how long a follower waits
+    in total (the leader's rate-limit wait plus the call, by default).
+    result_ttl keeps the published result readable for followers that
+    subscribe just after the leader finished.
+    """
+
+    def __init__(
+        self,
+        lock_timeout=config.SINGLEFLIGHT_LOCK_TIMEOUT,
+        result_ttl=config.SINGLEFLIGHT_RESULT_TTL,
+        max_wait=config.RATE_LIMIT_MAX_WAIT + config.TRANSPORT_TIMEOUT + config.SINGLEFLIGHT_LOCK_TIMEOUT,
+        redis_client=None,
+    ):
+        self.lock_timeout = lock_timeout
+        self.result_ttl = result_ttl
+        self.max_wait = max_wait
+        self._redis = redis_client
+        self._release = None
+        self._renew = None
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis()
+        return self._redis
+
+    def do(self, key: str, fn):
+        """
+        Runs fn() once per key across all workers and returns its result.
+        fn must return a JSON-serializable value.
+        """
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            token = uuid.uuid4().hex
+            if self.redis.set(LOCK_PREFIX + key, token, nx=True, ex=self.lock_timeout):
+                return self._lead(key, token, fn)
+
+            found, value = self._follow(key, deadline)
+            if found:
+                return value
+            if time.monotonic() >= deadline:
+                # Never call Amadeus alongside a live leader; the task retries later
+                raise SingleFlightError(f"no single-flight result for {key} within {self.max_wait:.0f}s", True)
+            # The lock expired without a result, so the leader crashed: take over
+            logging.info(f"Single-flight leader for {key} disappeared, retrying")
+
+    def _lead(self, key: str, token: str, fn):
+        from worker.retry import classify
+
+        self.redis.delete(RESULT_PREFIX + key)  # discard a previous round's result
+        stop = threading.Event()
+        renewer = threading.Thread(
+            target=self._keep_lock, args=(key, token, stop), name="single-flight-renew", daemon=True
+        )
+        renewer.start()
+        try:
+            value = fn()
+        except Exception as ex:
+            self._publish(key, {"error": str(ex), "retryable": classify(ex).retry})
+            raise
+        else:
+            self._publish(key, {"value": value})
+            return value
+        finally:
+            stop.set()
+            renewer.join()
+            if self._release is None:
+                self._release = self.redis.register_script(_RELEASE_SCRIPT)
+            self._release(keys=[LOCK_PREFIX + key], args=[token])
+
+    def _keep_lock(self, key: str, token: str, stop: threading.Event):
+        """Renews the leader's lock every third of lock_timeout until stop is set."""
+        if self._renew is None:
+            self._renew = self.redis.register_script(_RENEW_SCRIPT)
+        while not stop.wait(self.lock_timeout / 3):
+            try:
+                if not self._renew(keys=[LOCK_PREFIX + key], args=[token, self.lock_timeout]):
+                    logging.warning(f"Single-flight lock for {key} was lost")
+                    return
+            except Exception:
+                logging.exception(f"Could not renew the single-flight lock for {key}")
+
+    def _publish(self, key: str, message: dict):
+        payload = json.dumps(message, separators=(",", ":"))
+        pipe = self.redis.pipeline()
+        pipe.set(RESULT_PREFIX + key, payload, ex=self.result_ttl)
+        pipe.publish(CHANNEL_PREFIX + key, payload)
+        pipe.execute()
+
+    def _follow(self, key: str, deadline: float):
+        """
+        Waits for the leader's result while its lock is held. Returns
+        (True, value) when one arrives, or (False, None) if the lock lapses
+        without a result or the deadline passes first.
+        """
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(CHANNEL_PREFIX + key)
+        try:
+            # The leader may have finished before we subscribed
+            raw = self.redis.get(RESULT_PREFIX + key)
+            while raw is None and time.monotonic() < deadline:
+                message = pubsub.get_message(timeout=min(1.0, max(0.0, deadline - time.monotonic())))
+                if message is not None:
+                    raw = message["data"]
+                elif not self.redis.exists(LOCK_PREFIX + key):
+                    raw = self.redis.get(RESULT_PREFIX + key)
+                    if raw is None:
+                        return False, None
+        finally:
+            pubsub.close()
+
+        if raw is None:
+            return False, None
+        message = json.loads(raw)
+        if "error" in message:
+            raise SingleFlightError(message["error"], message.get("retryable", False))
+        return True, message["value"]
+
+
+single_flight = SingleFlight()
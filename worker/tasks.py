@@ -1,15 +1,58 @@
 # worker.py (or celery_worker.py)
 import os
 import logging
+import math
 import time
+from urllib.parse import urlparse
 from amadeus import Client, ResponseError
+from celery import chord, uuid
+from celery.exceptions import Retry
 
 from celery_worker import celery
-from core.models import FlightSearchRequest
-from core.config import AMADEUS_CLIENT_ID, AMADEUS_CLIENT_SECRET
+from core import config
+from core.models import FlightSearchRequest, FlexibleSearchRequest
+from core.redis_client import get_redis
+from core.config import AMADEUS_CLIENT_ID, AMADEUS_CLIENT_SECRET, AMADEUS_TRANSPORT
+from worker.cache import search_cache, HIT, STALE
+from worker.singleflight import single_flight
+from worker.transport import BASE_URLS, TransportError, base_url, get_transport, run_async
+from worker.auth import SharedAccessToken, token_provider
+from worker.retry import backoff_countdown, classify
+from worker.ratelimit import RateLimitExceeded, rate_limiter
+from worker.fanout import merge_offers, offer_price
+from worker.progress import OFFERS_FOUND, PRICE_CONFIRMED, publish_progress
+from worker.offer_store import offer_store
+from worker.compact import REF_KEY, project_offer, project_order
+from worker.metrics import observe_amadeus, observe_hold_duplicate, observe_rate_limit_wait
+from worker.pricing_cache import pricing_cache
+from worker.idempotency import hold_idempotency, hold_key
+from worker.holds import hold_registry
+from worker.fare_watch import fare_watch
+from worker.history import OFFERS, OUTCOMES, search_fields, search_history
+
+_amadeus = None
+
+
+def get_amadeus() -> Client:
+    """
+    Returns the process's Amadeus SDK client, creating it on first use so
+    that importing this module (every worker and prefork child) stays cheap.
+    """
+    global _amadeus
+    if _amadeus is None:
+        # Same host as the token and async transport (amadeus.environment, or
+        # the amadeus.base_url override, e.g. benchmarks/fake_amadeus.py)
+        environment = config.AMADEUS_ENVIRONMENT if config.AMADEUS_ENVIRONMENT in BASE_URLS else "test"
+        base = urlparse(base_url(config.AMADEUS_ENVIRONMENT))
+        client = Client(
+            client_id=AMADEUS_CLIENT_ID, client_secret=AMADEUS_CLIENT_SECRET, hostname=environment,
+            host=base.hostname, port=base.port or (443 if base.scheme == "https" else 80), ssl=base.scheme == "https",
+        )
+        # Share one OAuth token (kept in Redis) across all processes instead of one per Client
+        client.access_token = SharedAccessToken(token_provider)
+        _amadeus = client
+    return _amadeus
 
-# Setup Amadeus client
-amadeus = Client(client_id=AMADEUS_CLIENT_ID, client_secret=AMADEUS_CLIENT_SECRET)
 
 TRAVELER_INFO = [
     {
@@ -70,169 +113,622 @@ def echo_task(message):
     return message
 
 
-@celery.task(bind=True, name="worker.search_and_hold_flight")
-def search_and_hold_flight(self, search_data: dict):
+def call_amadeus(endpoint: str, sync_call, async_call):
+    """
+    Makes one Amadeus call through the endpoint's rate limiter, with metrics,
+    using the configured transport. sync_call() returns an SDK response;
+    async_call(sample) returns a transport coroutine.
+    """
+    observe_rate_limit_wait(endpoint, rate_limiter.acquire(endpoint))
+    with observe_amadeus(endpoint) as sample:
+        if AMADEUS_TRANSPORT == "async":
+            return run_async(async_call(sample))
+        response = sync_call()
+        sample["bytes"] = len(response.body or "")
+        return response.data
+
+
+def search_flight_offers(search_request: FlightSearchRequest) -> list:
+    """
+    Calls the Amadeus Flight Offers Search API and returns the raw offers.
+    """
+    params = dict(
+        originLocationCode=search_request.from_location,
+        destinationLocationCode=search_request.to_location,
+        departureDate=search_request.departure_date,
+        adults=search_request.num_passengers,
+        travelClass=search_request.seat_class.upper(),  # ECONOMY, BUSINESS etc.
+        # nonStop=True,
+        currencyCode="USD",
+        # A larger page lets core/ranking.py pick a better hold candidate
+        max=config.SEARCH_MAX_OFFERS,
+    )
+    return call_amadeus(
+        "flight_offers_search",
+        lambda: get_amadeus().shopping.flight_offers_search.get(**params),
+        lambda sample: get_transport().search_flight_offers(sample=sample, **params),
+    )
+
+
+def price_flight_offer(selected_offer: dict) -> dict:
+    """
+    Confirms the price of an offer via the Flight Offers Price API and
+    returns the priced flight offer.
+    """
+    pricing_data = call_amadeus(
+        "pricing",
+        lambda: get_amadeus().shopping.flight_offers.pricing.post(selected_offer),
+        lambda sample: get_transport().price_flight_offer(selected_offer, sample=sample),
+    )
+    return pricing_data["flightOffers"][0]
+
+
+def cached_search_flight_offers(search_request: FlightSearchRequest) -> list:
+    """
+    Returns offers from the search cache when possible, falling back to Amadeus.
+    Stale entries are returned immediately and refreshed in the background.
+    """
+    try:
+        offers, state = search_cache.get(search_request)
+    except Exception:
+        logging.exception("Search cache unavailable, querying Amadeus directly")
+        return search_flight_offers(search_request)
+
+    if state == HIT:
+        logging.info(f"Search cache hit for {search_request}")
+        return offers
+    if state == STALE:
+        logging.info(f"Search cache stale for {search_request}, scheduling refresh")
+        if search_cache.claim_refresh(search_request):
+            refresh_search_cache.delay(search_request.model_dump())
+        return offers
+
+    def fetch_and_cache():
+        fresh_offers = search_flight_offers(search_request)
+        if fresh_offers:
+            search_cache.set(search_request, fresh_offers)
+        return fresh_offers
+
+    # Only one worker queries Amadeus for a given search; the rest share its result
+    return single_flight.do(search_request.cache_key(), fetch_and_cache)
+
+
+@celery.task(name="worker.refresh_search_cache")
+def refresh_search_cache(search_data: dict):
+    """Re-runs a search against Amadeus and stores the fresh offers in the cache."""
+    search_request = FlightSearchRequest(**search_data)
+    offers = search_flight_offers(search_request)
+    if offers:
+        search_cache.set(search_request, offers)
+    return len(offers or [])
+
+
+def rank_page(slim_offers: list, limit: int) -> tuple:
+    """
+    Scores slim offers with core/ranking.py and returns the best limit of
+    them, best first, with their normalized table (plus a "score" column).
+    """
+    # pandas is imported on first use (or preloaded, see celery_worker.py), not by every worker
+    from core.normalize import normalize_offers, to_columns
+    from core.ranking import rank_offers
+
+    ranked = rank_offers(normalize_offers(slim_offers)).head(limit)
+    by_ref = {offer[REF_KEY]: offer for offer in slim_offers}
+    table = to_columns(ranked)
+    table["score"] = ranked["score"].tolist()
+    return [by_ref[ref] for ref in table["offer_ref"]], table
+
+
+def history_search(search_request: FlightSearchRequest) -> dict:
+    """Route/date/request fields of a search for the search history (worker/history.py)."""
+    return search_fields(search_request.model_dump(), search_request.cache_key())
+
+
+def search_context(search_data: dict) -> dict:
+    """
+    The context a search stage failure is reported with: just the search's
+    history fields, or nothing if search_data is not a valid search.
+    """
+    try:
+        return {"search": history_search(FlightSearchRequest(**search_data))}
+    except ValueError:
+        return {}
+
+
+def search_stage(search_data: dict) -> dict:
+    """
+    First pipeline stage: finds offers for a search.
+    Returns {"status": "searched", "offers": [...]} or {"status": "not_found"}.
+    """
     search_request = FlightSearchRequest(**search_data)
     logging.info(f"Starting flight search for {search_request}")
+    search = history_search(search_request)
+    offers = cached_search_flight_offers(search_request)
+    if not offers:
+        logging.info("No flights found")
+        search_history.record_outcome(search, "not_found")
+        return {"status": "not_found"}
+    # Results and stage messages carry slim projections; full bodies stay in the offer store
+    refs = offer_store.put_many(offers)
+    slim_offers, table = rank_page(
+        [project_offer(offer, ref) for offer, ref in zip(offers, refs)], config.RANKING_PAGE_SIZE
+    )
+    if not slim_offers:
+        logging.info("No usable flights found")
+        search_history.record_outcome(search, "not_found", offers_found=len(offers))
+        return {"status": "not_found"}
+    search_history.record_search(search, table)
+    search_history.record_outcome(
+        search, "searched", offers_found=len(offers),
+        best_price=min((price for price in table["price"] if price is not None), default=None),
+    )
+    return {
+        "status": "searched",
+        # Best first: price_stage holds offers[0]
+        "offers": slim_offers,
+        # Normalized once here so the UI only has to render it
+        "table": table,
+        "search": search,
+    }
 
-    max_attempts = 1
-    delay_seconds = 10
 
-    for attempt in range(1, max_attempts + 1):
-        try:
-            logging.info(f"Attempt {attempt} to search flights via Amadeus...")
-            response = amadeus.shopping.flight_offers_search.get(
-                originLocationCode=search_request.from_location,
-                destinationLocationCode=search_request.to_location,
-                departureDate=search_request.departure_date,
-                adults=search_request.num_passengers,
-                travelClass=search_request.seat_class.upper(),  # ECONOMY, BUSINESS etc.
-                # nonStop=True,
-                currencyCode="USD",
-                max=5,
-            )
+def load_full_offer(projection: dict) -> dict:
+    """Fetches the full Amadeus body behind a slim projection."""
+    document = offer_store.get(projection[REF_KEY])
+    if document is None:
+        raise LookupError(f"Offer {projection.get('id')} expired from the offer store")
+    return document
 
-            offers = response.data
 
-            if not offers:
-                logging.info("No flights found, retrying after delay...")
-                time.sleep(delay_seconds)
-                continue
+def price_stage(context: dict) -> dict:
+    """Second pipeline stage: confirms the price of the selected offer."""
+    if context.get("status") != "searched":
+        return context
+    selected_offer = load_full_offer(context["offers"][0])
+    # get flight offer price (reusing a very recent price for the identical fare)
+    flight_offer_price_data = pricing_cache.get_or_price(selected_offer, price_flight_offer)
+    priced_ref = offer_store.put(flight_offer_price_data)
+    return {
+        **context,
+        "status": "priced",
+        "priced_offer": project_offer(flight_offer_price_data, priced_ref),
+    }
 
-            selected_offer = offers[0]
-            # get flight offer price
-            offer_price_response = amadeus.shopping.flight_offers.pricing.post(
-                selected_offer
-            )
-            # Create a hold using Amadeus booking API
-            flight_offer_price_data = offer_price_response.data["flightOffers"][0]
-            print("## flight_offer_price_data", flight_offer_price_data)
-            booking_response = hold_flight_offer(flight_offer_price_data)
-            print(
-                "## booking response",
-                booking_response,
-            )
 
-            if "error" in booking_response:
-                print("## got error", dir(booking_response))
-                return {
-                    "status": "hold_failed",
-                    "offers": offers,
-                    "error": booking_response["error"],
-                }
+def hold_stage(context: dict, submission_id: str) -> dict:
+    """
+    Last pipeline stage: holds the priced offer and builds the task result
+    consumed by streamlit_app/poll.py. submission_id identifies the search
+    submission for hold idempotency: retries of one submission share it.
+    """
+    if context.get("status") != "priced":
+        return context
+    offers = context["offers"]
+    # Create a hold using Amadeus booking API
+    booking_response = hold_flight_offer(load_full_offer(context["priced_offer"]), submission_id)
 
-            hold_reference = f"AMADEUS_HOLD_{self.request.id}"
+    if "error" in booking_response:
+        logging.warning(f"Hold for submission {submission_id} failed: {booking_response['error']}")
+        if context.get("search"):
+            search_history.record_outcome(context["search"], "hold_failed", offers_found=len(offers))
+        return {
+            "status": "hold_failed",
+            "offers": offers,
+            "table": context.get("table"),
+            "error": booking_response["error"],
+        }
 
-            # todo: create hold request for selected_offer using amadeus
+    # Track the hold until it lapses (refresh_holds); a hold returned again
+    # for the same submission keeps the deadline it was registered with
+    hold_registry.register(booking_response)
 
-            result = {
-                "status": "held",
-                "offers": offers,
-                "hold_details": booking_response,
-            }
+    if context.get("search"):
+        held_price = offer_price(context["priced_offer"])
+        search_history.record_outcome(
+            context["search"], "held", offers_found=len(offers),
+            held_price=held_price if held_price != float("inf") else None,
+            order_id=booking_response.get("id"),
+        )
 
-            logging.info(f"Flight held: {result}")
-            return result
+    result = {
+        "status": "held",
+        "offers": offers,
+        "table": context.get("table"),
+        "hold_details": project_order(booking_response, offer_store.put(booking_response)),
+    }
 
-        except ResponseError as err:
-            logging.error(f"Amadeus error: {err}")
-            time.sleep(delay_seconds)
-        except Exception as ex:
-            logging.exception("Unexpected error during flight search")
-            time.sleep(delay_seconds)
+    logging.info(f"Flight held: {result}")
+    return result
+
+
+def _retry_or_give_up(task, ex: Exception, stage: str, context: dict = None) -> dict:
+    """
+    Reschedules task through Celery when the error is retryable and retries
+    remain; otherwise returns the stage's terminal result: "hold_failed" for
+    the hold stage, "failed" for search and pricing, with the reason and any
+    offers already found. Giving up is recorded as a "failed" outcome in the
+    search history when context has the search.
+    """
+    decision = classify(ex)
+    if isinstance(ex, (ResponseError, TransportError)):
+        logging.error(f"Amadeus error ({decision.reason}): {ex}")
+    else:
+        logging.exception("Unexpected error during flight search")
 
-    # Final fallback
-    result = {"status": "not_found"}
+    if decision.retry and task.request.retries < task.max_retries:
+        countdown = backoff_countdown(task.request.retries, decision.retry_after)
+        logging.info(f"Retrying {task.name} in {countdown}s ({decision.reason})")
+        # Frees the worker slot; Celery redelivers the task after the countdown
+        raise task.retry(exc=ex, countdown=countdown)
+
+    result = {
+        "status": "hold_failed" if stage == "hold" else "failed",
+        "stage": stage,
+        "error": f"{decision.reason}: {ex}",
+    }
+    if context and context.get("offers"):
+        result.update(offers=context["offers"], table=context.get("table"))
+    if context and context.get("search"):
+        search_history.record_outcome(
+            context["search"], "failed", offers_found=len(context.get("offers") or []), stage=stage,
+        )
     return result
 
 
-def hold_flight_offer(flight_offer_price_data: dict):
+@celery.task(bind=True, name="worker.search_offers", max_retries=config.TASK_MAX_RETRIES)
+def search_offers(self, search_data: dict, progress_id: str = None):
+    try:
+        context = search_stage(search_data)
+    except Exception as ex:
+        return _retry_or_give_up(self, ex, "search", search_context(search_data))
+    if context["status"] == "not_found" and self.request.retries < config.EMPTY_RESULT_RETRIES:
+        logging.info("No flights found, rescheduling search...")
+        raise self.retry(countdown=backoff_countdown(self.request.retries))
+    if context["status"] == "searched":
+        publish_progress(
+            progress_id, OFFERS_FOUND, {"offers": context["offers"], "table": context["table"]}
+        )
+    return {**context, "progress_id": progress_id}
+
+
+@celery.task(bind=True, name="worker.price_offer", max_retries=config.TASK_MAX_RETRIES)
+def price_offer(self, context: dict):
+    try:
+        context = price_stage(context)
+    except Exception as ex:
+        return _retry_or_give_up(self, ex, "pricing", context)
+    if context["status"] == "priced":
+        publish_progress(
+            context.get("progress_id"),
+            PRICE_CONFIRMED,
+            {"offers": context["offers"], "table": context["table"], "priced_offer": context["priced_offer"]},
+        )
+    return context
+
+
+@celery.task(bind=True, name="worker.hold_offer", max_retries=config.TASK_MAX_RETRIES)
+def hold_offer(self, context: dict, submission_id: str = None):
+    if context.get("status") == "priced":
+        # task_track_started replaced the PRICE_CONFIRMED meta with STARTED; restore it
+        self.update_state(
+            state=PRICE_CONFIRMED,
+            meta={"offers": context["offers"], "table": context["table"], "priced_offer": context["priced_offer"]},
+        )
+    try:
+        # The form's submission token, else this task's id (kept across retries)
+        return hold_stage(context, submission_id or self.request.id)
+    except Exception as ex:
+        return _retry_or_give_up(self, ex, "hold", context)
+
+
+def _queue_options(priority: str) -> dict:
     """
-    Uses Amadeus Flight Orders API to simulate hold with delayed ticketing.
+    Signature options for a priority class. Interactive work follows
+    task_routes (one queue per stage); batch work runs entirely on "batch".
+    """
+    if priority == "interactive":
+        return {}
+    if priority not in config.PRIORITY_CLASSES:
+        raise ValueError(f"Unknown priority class: {priority}")
+    return {"queue": config.PRIORITY_CLASSES[priority][0]}
+
+
+def submit_search_and_hold(search_data: dict, priority: str = "interactive", submission_id: str = None):
+    """
+    Runs search -> price -> hold as a chain of tasks, each on its own queue
+    (see task_routes in celery_worker.py). The returned AsyncResult is the
+    hold stage's, whose result has the same shape as search_and_hold_flight.
+    Earlier stages report OFFERS_FOUND / PRICE_CONFIRMED on that same id.
+    priority="batch" keeps background searches off the interactive queues.
+    submission_id is the caller's idempotency token: chains submitted with
+    the same token share one hold. Without it, each chain holds its own.
+    """
+    hold_task_id = uuid()
+    options = _queue_options(priority)
+    pipeline = (
+        search_offers.s(search_data, progress_id=hold_task_id).set(**options)
+        | price_offer.s().set(**options)
+        | hold_offer.s(submission_id=submission_id).set(task_id=hold_task_id, **options)
+    )
+    return pipeline.apply_async()
+
+
+@celery.task(name="worker.merge_search_results")
+def merge_search_results(contexts: list, top_k: int):
+    """Chord callback: merges sub-search results into one ranked, deduplicated page."""
+    offers, table = rank_page(merge_offers([context.get("offers") for context in contexts], None), top_k)
+    if not offers:
+        return {"status": "not_found"}
+    return {
+        "status": "searched",
+        "offers": offers,
+        "table": table,
+        "searches": len(contexts),
+    }
+
+
+def submit_flexible_search(search_data: dict, priority: str = "interactive"):
+    """
+    Expands a FlexibleSearchRequest into one search per date/airport
+    combination, runs them in parallel on the search queue and merges them
+    with merge_search_results. Sub-searches go through the normal search
+    path, so they share the search cache, single-flight and rate limits.
+    """
+    flexible_request = FlexibleSearchRequest(**search_data)
+    sub_requests = flexible_request.expand()
+    if len(sub_requests) > config.FANOUT_MAX_SEARCHES:
+        raise ValueError(
+            f"Flexible search expands to {len(sub_requests)} searches "
+            f"(limit {config.FANOUT_MAX_SEARCHES})"
+        )
+    options = _queue_options(priority)
+    header = [search_offers.s(sub_request.model_dump()).set(**options) for sub_request in sub_requests]
+    return chord(header)(merge_search_results.s(flexible_request.top_k).set(**options))
+
+
+@celery.task(
+    bind=True,
+    name="worker.search_and_hold_flight",
+    max_retries=config.TASK_MAX_RETRIES,
+)
+def search_and_hold_flight(self, search_data: dict, submission_id: str = None):
+    """
+    Single-task version of the search -> price -> hold pipeline.
+    submission_id works as in submit_search_and_hold.
     """
+    stage, context = "search", None
     try:
-        response = amadeus.post(
-            "/v1/booking/flight-orders",
-            {
-                "data": {
-                    "type": "flight-order",
-                    "flightOffers": [flight_offer_price_data],
-                    "travelers": [
-                        {
-                            "id": "1",
-                            "dateOfBirth": "1982-01-16",
-                            "name": {"firstName": "JORGE", "lastName": "GONZALES"},
-                            "gender": "MALE",
-                            "contact": {
-                                "emailAddress": "jorge.gonzales833@telefonica.es",
-                                "phones": [
-                                    {
-                                        "deviceType": "MOBILE",
-                                        "countryCallingCode": "34",
-                                        "number": "480080076",
-                                    }
-                                ],
-                            },
-                            "documents": [
-                                {
-                                    "documentType": "PASSPORT",
-                                    "birthPlace": "Madrid",
-                                    "issuanceLocation": "Madrid",
-                                    "issuanceDate": "2015-04-14",
-                                    "number": "00000000",
-                                    "expiryDate": "2025-06-14",
-                                    "issuanceCountry": "ES",
-                                    "validityCountry": "ES",
-                                    "nationality": "ES",
-                                    "holder": True,
-                                }
-                            ],
-                        }
-                    ],
-                    "remarks": {
-                        "general": [
+        logging.info(f"Attempt {self.request.retries + 1} to search flights via Amadeus...")
+        context = search_stage(search_data)
+        if context["status"] == "not_found" and self.request.retries < config.EMPTY_RESULT_RETRIES:
+            logging.info("No flights found, rescheduling search...")
+            raise self.retry(countdown=backoff_countdown(self.request.retries))
+        if context["status"] == "searched":
+            self.update_state(
+                state=OFFERS_FOUND, meta={"offers": context["offers"], "table": context["table"]}
+            )
+        stage = "pricing"
+        context = price_stage(context)
+        if context["status"] == "priced":
+            self.update_state(
+                state=PRICE_CONFIRMED,
+                meta={"offers": context["offers"], "table": context["table"], "priced_offer": context["priced_offer"]},
+            )
+        stage = "hold"
+        # Celery keeps the task id across retries, so without a token only they share a hold
+        return hold_stage(context, submission_id or self.request.id)
+    except Retry:
+        raise
+    except Exception as ex:
+        return _retry_or_give_up(self, ex, stage, context or search_context(search_data))
+
+
+def get_flight_order(order_id: str) -> dict:
+    """Retrieves a flight order via the Flight Order Management API."""
+    return call_amadeus(
+        "flight_orders_get",
+        lambda: get_amadeus().booking.flight_order(order_id).get(),
+        lambda sample: get_transport().get_flight_order(order_id, sample=sample),
+    )
+
+
+@celery.task(name="worker.refresh_holds")
+def refresh_holds():
+    """
+    Beat task: re-checks the status of the holds that are due, nearest
+    expiry first, and fires near-expiry / expired events.
+    """
+    refreshed = 0
+    for order_id in hold_registry.due(config.HOLD_REFRESH_BATCH):
+        try:
+            order = get_flight_order(order_id)
+        except RateLimitExceeded:
+            # Out of quota for this tick; the leased holds come back after the lease
+            break
+        except (ResponseError, TransportError) as ex:
+            decision = classify(ex)
+            if decision.reason == "http_404":
+                hold_registry.record_status(order_id, None)
+            else:
+                logging.warning(f"Hold {order_id} status check failed ({decision.reason})")
+                hold_registry.postpone(order_id, backoff_countdown(0, decision.retry_after))
+            continue
+        hold_registry.record_status(order_id, order)
+        refreshed += 1
+    events = hold_registry.fire_expiry_events()
+    return {"refreshed": refreshed, "events": events}
+
+
+@celery.task(name="worker.schedule_fare_watches")
+def schedule_fare_watches():
+    """
+    Beat task: dispatches the fare-watch searches that are due, within this
+    tick's share of FARE_WATCH_SEARCHES_PER_HOUR.
+    """
+    budget = math.ceil(config.FARE_WATCH_SEARCHES_PER_HOUR * config.FARE_WATCH_TICK / 3600)
+    keys = fare_watch.claim_due(budget)
+    for key in keys:
+        run_fare_watch.delay(key)
+    return len(keys)
+
+
+@celery.task(bind=True, name="worker.run_fare_watch", max_retries=config.TASK_MAX_RETRIES)
+def run_fare_watch(self, key: str):
+    """Searches one watched route/date and records the price changes."""
+    search_data = fare_watch.search_data(key)
+    if search_data is None:
+        return None  # unwatched since it was dispatched
+    try:
+        # Through the search cache and single-flight, shared with interactive searches
+        offers = cached_search_flight_offers(FlightSearchRequest(**search_data))
+    except Exception as ex:
+        decision = classify(ex)
+        if decision.retry and self.request.retries < self.max_retries:
+            raise self.retry(exc=ex, countdown=backoff_countdown(self.request.retries, decision.retry_after))
+        logging.error(f"Fare watch {key} search failed ({decision.reason}): {ex}")
+        return None
+    diff = fare_watch.record(key, offers)
+    return {"min_price": diff["min_price"], "changed": len(diff["added"]) + len(diff["changed"]) + len(diff["removed"])}
+
+
+@celery.task(name="worker.flush_search_history")
+def flush_search_history():
+    """Beat task: writes buffered search history records to Parquet."""
+    written = 0
+    # Drain a backlog in several files rather than one huge batch
+    for _ in range(10):
+        flushed = search_history.flush()
+        written += flushed
+        if flushed < config.HISTORY_FLUSH_BATCH:
+            break
+    return written
+
+
+BEAT_HEARTBEAT_KEY = "beat:heartbeat"
+
+
+@celery.task(name="worker.beat_heartbeat")
+def beat_heartbeat():
+    """
+    Beat task: records when beat last got a task through the broker to a
+    worker. run.py's readiness probe for beat reads it.
+    """
+    get_redis().set(BEAT_HEARTBEAT_KEY, time.time(), ex=int(config.BEAT_HEARTBEAT_INTERVAL * 10) + 1)
+
+
+@celery.task(name="worker.compact_search_history")
+def compact_search_history():
+    """Beat task: merges small Parquet files in each history partition."""
+    merged = 0
+    for kind in (OFFERS, OUTCOMES):
+        for day in search_history.partitions(kind):
+            merged += search_history.compact(kind, day)
+    return merged
+
+
+def build_flight_order(flight_offer_price_data: dict) -> dict:
+    """
+    Builds the Flight Orders API request body for a priced offer,
+    holding it with delayed ticketing.
+    """
+    return {
+        "data": {
+            "type": "flight-order",
+            "flightOffers": [flight_offer_price_data],
+            "travelers": [
+                {
+                    "id": "1",
+                    "dateOfBirth": "1982-01-16",
+                    "name": {"firstName": "JORGE", "lastName": "GONZALES"},
+                    "gender": "MALE",
+                    "contact": {
+                        "emailAddress": "jorge.gonzales833@telefonica.es",
+                        "phones": [
                             {
-                                "subType": "GENERAL_MISCELLANEOUS",
-                                "text": "ONLINE BOOKING FROM INCREIBLE VIAJES",
+                                "deviceType": "MOBILE",
+                                "countryCallingCode": "34",
+                                "number": "480080076",
                             }
-                        ]
+                        ],
                     },
-                    "ticketingAgreement": {"option": "DELAY_TO_CANCEL", "delay": "6D"},
-                    "contacts": [
+                    "documents": [
                         {
-                            "addresseeName": {
-                                "firstName": "PABLO",
-                                "lastName": "RODRIGUEZ",
-                            },
-                            "companyName": "INCREIBLE VIAJES",
-                            "purpose": "STANDARD",
-                            "phones": [
-                                {
-                                    "deviceType": "LANDLINE",
-                                    "countryCallingCode": "34",
-                                    "number": "480080071",
-                                },
-                                {
-                                    "deviceType": "MOBILE",
-                                    "countryCallingCode": "33",
-                                    "number": "480080072",
-                                },
-                            ],
-                            "emailAddress": "support@increibleviajes.es",
-                            "address": {
-                                "lines": ["Calle Prado, 16"],
-                                "postalCode": "28014",
-                                "cityName": "Madrid",
-                                "countryCode": "ES",
-                            },
+                            "documentType": "PASSPORT",
+                            "birthPlace": "Madrid",
+                            "issuanceLocation": "Madrid",
+                            "issuanceDate": "2015-04-14",
+                            "number": "00000000",
+                            "expiryDate": "2025-06-14",
+                            "issuanceCountry": "ES",
+                            "validityCountry": "ES",
+                            "nationality": "ES",
+                            "holder": True,
                         }
                     ],
                 }
+            ],
+            "remarks": {
+                "general": [
+                    {
+                        "subType": "GENERAL_MISCELLANEOUS",
+                        "text": "ONLINE BOOKING FROM INCREIBLE VIAJES",
+                    }
+                ]
             },
-        )
+            "ticketingAgreement": {"option": "DELAY_TO_CANCEL", "delay": "6D"},
+            "contacts": [
+                {
+                    "addresseeName": {
+                        "firstName": "PABLO",
+                        "lastName": "RODRIGUEZ",
+                    },
+                    "companyName": "INCREIBLE VIAJES",
+                    "purpose": "STANDARD",
+                    "phones": [
+                        {
+                            "deviceType": "LANDLINE",
+                            "countryCallingCode": "34",
+                            "number": "480080071",
+                        },
+                        {
+                            "deviceType": "MOBILE",
+                            "countryCallingCode": "33",
+                            "number": "480080072",
+                        },
+                    ],
+                    "emailAddress": "support@increibleviajes.es",
+                    "address": {
+                        "lines": ["Calle Prado, 16"],
+                        "postalCode": "28014",
+                        "cityName": "Madrid",
+                        "countryCode": "ES",
+                    },
+                }
+            ],
+        }
+    }
+
+
+def hold_flight_offer(flight_offer_price_data: dict, submission_id: str):
+    """
+    Uses Amadeus Flight Orders API to simulate hold with delayed ticketing.
+    Retries of the same submission (same fare and travelers) return the
+    order created the first time instead of booking again.
+    """
+    try:
+        body = build_flight_order(flight_offer_price_data)
         # response = amadeus.booking.flight_orders.post(flight_offer, TRAVELER_INFO)
-        print("### status", dir(response))
-        return response.data
-    except ResponseError as e:
+        order, duplicate = hold_idempotency.do(
+            hold_key(body, submission_id),
+            lambda: call_amadeus(
+                "flight_orders",
+                lambda: get_amadeus().post("/v1/booking/flight-orders", body),
+                lambda sample: get_transport().create_flight_order(body, sample=sample),
+            ),
+        )
+        if duplicate:
+            observe_hold_duplicate()
+        return order
+    except (ResponseError, TransportError) as e:
         logging.error(f"Failed to hold flight: {e}")
         raise e
@@ -0,0 +1,191 @@
+# worker/transport.py
+# Asynchronous, connection-pooled HTTP transport for the Amadeus APIs.
+# One httpx.AsyncClient (keep-alive pool, HTTP/2 when the server offers it)
+# and one event loop are shared by every task thread in a worker process,
+# so many searches can be in flight at once instead of one per process.
+#
+# Enable with `[amadeus] transport = "async"` in secrets. The stage workers
+# started by run.py then use the threads pool (see stage_worker_command in
+# celery_worker.py), e.g.:
+#   celery -A celery_worker worker -Q search --pool=threads --concurrency=64
+
+import asyncio
+import threading
+import time
+
+import httpx
+
+from core import config
+
+BASE_URLS = {
+    "test": "https://test.api.amadeus.com",
+    "production": "https://api.amadeus.com",
+}
+
+
+def base_url(environment: str = config.AMADEUS_ENVIRONMENT) -> str:
+    """Returns the API root, honouring the amadeus.base_url override."""
+    return config.AMADEUS_BASE_URL or BASE_URLS.get(environment, BASE_URLS["test"])
+
+
+class TransportError(Exception):
+    """Raised for non-2xx responses from Amadeus."""
+
+    def __init__(self, status_code: int, body, headers=None):
+        super().__init__(f"Amadeus returned HTTP {status_code}: {body}")
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+
+class AsyncAmadeusTransport:
+    """
+    Minimal asyncio client for the Amadeus endpoints used by the worker:
+    OAuth token, flight-offers search, pricing and flight-orders.
+    """
+
+    def __init__(
+        self,
+        client_id=config.AMADEUS_CLIENT_ID,
+        client_secret=config.AMADEUS_CLIENT_SECRET,
+        environment=config.AMADEUS_ENVIRONMENT,
+        max_connections=config.TRANSPORT_MAX_CONNECTIONS,
+        timeout=config.TRANSPORT_TIMEOUT,
+        token_provider=None,
+    ):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.base_url = base_url(environment)
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.token_provider = token_provider
+        self._client = None
+        self._token = None
+        self._token_expires_at = 0.0
+        self._token_lock = None
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            try:
+                import h2  # noqa: F401  (HTTP/2 support is optional)
+                http2 = True
+            except ImportError:
+                http2 = False
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=http2,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+            self._token_lock = asyncio.Lock()
+        return self._client
+
+    async def access_token(self) -> str:
+        """Returns a valid OAuth token, fetching a new one shortly before expiry."""
+        client = self._http()
+        if self.token_provider is not None:
+            token = self.token_provider.cached_token()
+            if token is None:
+                token = await asyncio.to_thread(self.token_provider.get_token)
+            return token
+        if self._token and time.time() < self._token_expires_at:
+            return self._token
+        async with self._token_lock:
+            if self._token and time.time() < self._token_expires_at:
+                return self._token
+            response = await client.post(
+                "/v1/security/oauth2/token",
+                data={
+                    "grant_type": "client_credentials",
+                    "client_id": self.client_id,
+                    "client_secret": self.client_secret,
+                },
+            )
+            if response.status_code != 200:
+                raise TransportError(response.status_code, response.text, response.headers)
+            payload = response.json()
+            self._token = payload["access_token"]
+            # Refresh a little early so in-flight requests never carry an expired token
+            self._token_expires_at = time.time() + int(payload.get("expires_in", 1799)) - 60
+            return self._token
+
+    async def request(self, method: str, path: str, params=None, json=None, sample=None) -> dict:
+        """
+        Sends an authenticated request and returns the decoded JSON body.
+        If sample is a dict, the response size is stored in sample["bytes"].
+        """
+        client = self._http()
+        headers = {"Authorization": f"Bearer {await self.access_token()}"}
+        response = await client.request(method, path, params=params, json=json, headers=headers)
+        if sample is not None:
+            sample["bytes"] = len(response.content)
+        if response.status_code >= 400:
+            try:
+                body = response.json()
+            except ValueError:
+                body = response.text
+            raise TransportError(response.status_code, body, response.headers)
+        return response.json()
+
+    async def search_flight_offers(self, sample=None, **params) -> list:
+        payload = await self.request("GET", "/v2/shopping/flight-offers", params=params, sample=sample)
+        return payload.get("data", [])
+
+    async def price_flight_offer(self, flight_offer: dict, sample=None) -> dict:
+        payload = await self.request(
+            "POST",
+            "/v1/shopping/flight-offers/pricing",
+            json={"data": {"type": "flight-offers-pricing", "flightOffers": [flight_offer]}},
+            sample=sample,
+        )
+        return payload["data"]
+
+    async def create_flight_order(self, body: dict, sample=None) -> dict:
+        payload = await self.request("POST", "/v1/booking/flight-orders", json=body, sample=sample)
+        return payload["data"]
+
+    async def get_flight_order(self, order_id: str, sample=None) -> dict:
+        payload = await self.request("GET", f"/v1/booking/flight-orders/{order_id}", sample=sample)
+        return payload["data"]
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_loop = None
+_loop_lock = threading.Lock()
+_transport = None
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """Starts (once per process) an event loop on a daemon thread."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="amadeus-transport", daemon=True).start()
+            _loop = loop
+    return _loop
+
+
+def get_transport() -> AsyncAmadeusTransport:
+    global _transport
+    if _transport is None:
+        from worker.auth import token_provider
+        _transport = AsyncAmadeusTransport(token_provider=token_provider)
+    return _transport
+
+
+def run_async(coro):
+    """
+    Runs a coroutine on the shared transport loop and blocks the calling thread
+    until it finishes. Many task threads can wait at once while their requests
+    share one connection pool.
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, _background_loop())
+    return future.result()